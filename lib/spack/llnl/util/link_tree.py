@@ -10,15 +10,30 @@
 import os
 import shutil
 import filecmp
+import multiprocessing.pool
 
 from llnl.util.filesystem import traverse_tree, mkdirp, touch
 import llnl.util.tty as tty
 
-__all__ = ['LinkTree']
+__all__ = ['LinkTree', 'MergePlan']
 
 empty_file_name = '.spack-empty'
 
 
+def _list_dir(path):
+    """Entries of a directory, as (name, is a directory, is a symbolic link)
+    tuples. Links to directories are directories."""
+    if hasattr(os, 'scandir'):
+        return [(e.name, e.is_dir(), e.is_symlink())
+                for e in os.scandir(path)]
+
+    entries = []
+    for name in os.listdir(path):
+        entry = os.path.join(path, name)
+        entries.append((name, os.path.isdir(entry), os.path.islink(entry)))
+    return entries
+
+
 def remove_link(src, dest):
     if not os.path.islink(dest):
         raise ValueError("%s is not a link tree!" % dest)
@@ -131,28 +146,18 @@ def merge(self, dest_root, ignore_conflicts=False, ignore=None,
             (default False)
 
         """
-        if ignore is None:
-            ignore = lambda x: False
+        plan = MergePlan()
+        plan.add_tree(self._root, dest_root, ignore)
 
-        conflict = self.find_conflict(
-            dest_root, ignore=ignore, ignore_file_conflicts=ignore_conflicts)
-        if conflict:
-            raise MergeConflictError(conflict)
+        conflicts = plan.conflicts
+        if not ignore_conflicts:
+            conflicts = conflicts + plan.existing
+        if conflicts:
+            raise MergeConflictError(conflicts[0])
 
-        self.merge_directories(dest_root, ignore)
-        existing = []
-        for src, dst in self.get_file_map(dest_root, ignore).items():
-            if os.path.exists(dst):
-                existing.append(dst)
-            elif relative:
-                abs_src = os.path.abspath(src)
-                dst_dir = os.path.dirname(os.path.abspath(dst))
-                rel = os.path.relpath(abs_src, dst_dir)
-                link(rel, dst)
-            else:
-                link(src, dst)
-
-        for c in existing:
+        plan.execute(link=link, relative=relative)
+
+        for c in plan.existing:
             tty.warn("Could not merge: %s" % c)
 
     def unmerge(self, dest_root, ignore=None, remove_file=remove_link):
@@ -168,6 +173,180 @@ def unmerge(self, dest_root, ignore=None, remove_file=remove_link):
         self.unmerge_directories(dest_root, ignore)
 
 
+class MergePlan(object):
+    """Directories and links to create to merge source trees into
+    destination trees.
+
+    Each source tree added to the plan is read in a single traversal, and
+    each directory of the destination is listed at most once, so that the
+    conflicts between all the trees of the plan and the destination are
+    found before anything is created. The plan is then executed with a
+    pool of threads.
+    """
+
+    #: Number of threads creating the directories and links of a plan
+    threads = 16
+
+    #: Plans creating fewer directories and links are executed serially
+    min_parallel = 256
+
+    def __init__(self):
+        #: Directories to create, parents first
+        self.directories = []
+
+        #: Markers of the empty directories of the destination, so that
+        #: they are not removed on unmerge
+        self.markers = []
+
+        #: Links to create, from their destination to their source
+        self.links = {}
+
+        #: Conflicts between directories and files
+        self.conflicts = []
+
+        #: Files of the destination which already exist, and are not linked
+        self.existing = []
+
+        # Destination paths created by the plan -> whether they are
+        # directories
+        self._planned = {}
+
+        # Directories of the destination -> {name: is a directory} of their
+        # entries, or None if they do not exist
+        self._listings = {}
+
+    def _entries(self, directory):
+        if directory not in self._listings:
+            try:
+                self._listings[directory] = dict(
+                    (name, is_dir) for name, is_dir, _ in _list_dir(directory))
+            except OSError:
+                self._listings[directory] = None
+        return self._listings[directory]
+
+    def _dest_type(self, path, list_parent=True):
+        """True if path is, or will be, a directory of the destination,
+        False if it is a file and None if it does not exist."""
+        if path in self._planned:
+            return self._planned[path]
+        if not list_parent:
+            return os.path.isdir(path) if os.path.lexists(path) else None
+        entries = self._entries(os.path.dirname(path))
+        return entries.get(os.path.basename(path)) if entries else None
+
+    def _add_directory(self, dest, list_parent=True):
+        dest_type = self._dest_type(dest, list_parent)
+        if dest_type is None:
+            self._planned[dest] = True
+            self.directories.append(dest)
+        elif dest_type is False:
+            self.conflicts.append("File blocks directory: %s" % dest)
+        elif dest not in self._planned:
+            self._planned[dest] = True
+            if self._entries(dest) == {}:
+                self.markers.append(os.path.join(dest, empty_file_name))
+
+    def _add_file(self, src, dest, link):
+        dest_type = self._dest_type(dest)
+        if dest_type is True:
+            self.conflicts.append("Directory blocks directory: %s" % dest)
+        elif not link:
+            return
+        elif dest_type is False:
+            self.existing.append(dest)
+        else:
+            self._planned[dest] = False
+            self.links[dest] = src
+
+    def add_tree(self, source_root, dest_root, ignore=None, link=True):
+        """Plan the merge of a source tree into a destination tree.
+
+        Args:
+            source_root (str): root of the tree to merge
+            dest_root (str): root of the destination of the tree
+            ignore (callable): called with paths relative to source_root,
+                returns True for the files and directories to leave out
+            link (bool): whether to plan the links to the files of the
+                tree, or only its directories
+
+        Returns:
+            (dict) map of the files of the source tree to their path in
+                the destination tree, as ``LinkTree.get_file_map()``
+        """
+        ignore = ignore or (lambda f: False)
+        dest_root = os.path.normpath(dest_root)
+
+        merge_map = {}
+        if ignore(''):
+            return merge_map
+
+        # the parent of the destination may be large, and is not listed
+        self._add_directory(dest_root, list_parent=False)
+        stack = ['']
+        while stack:
+            rel_path = stack.pop()
+            src_dir = os.path.join(source_root, rel_path)
+            dest_dir = os.path.join(dest_root, rel_path) \
+                if rel_path else dest_root
+
+            for name, is_dir, is_link in _list_dir(src_dir):
+                rel_child = os.path.join(rel_path, name)
+                if ignore(rel_child):
+                    continue
+
+                src = os.path.join(src_dir, name)
+                dest = os.path.join(dest_dir, name)
+                if is_dir and not is_link:
+                    self._add_directory(dest)
+                    stack.append(rel_child)
+                elif is_dir:
+                    # links to directories are not followed, and only their
+                    # directory is created in the destination
+                    self._add_directory(dest)
+                else:
+                    merge_map[src] = dest
+                    self._add_file(src, dest, link)
+
+        return merge_map
+
+    def _map(self, function, items):
+        if len(items) < self.min_parallel:
+            for item in items:
+                function(item)
+            return
+
+        pool = multiprocessing.pool.ThreadPool(self.threads)
+        try:
+            pool.map(function, items,
+                     chunksize=max(1, len(items) // (4 * self.threads)))
+        finally:
+            pool.terminate()
+            pool.join()
+
+    def execute(self, link=os.symlink, relative=False):
+        """Create the directories and the links of the plan.
+
+        Args:
+            link (callable): function to create links with
+            relative (bool): create symlinks relative to their destination
+        """
+        # directories are created depth by depth, after their parents
+        by_depth = {}
+        for directory in self.directories:
+            by_depth.setdefault(directory.count(os.sep), []).append(directory)
+        for depth in sorted(by_depth):
+            self._map(mkdirp, by_depth[depth])
+        self._map(touch, self.markers)
+
+        def make_link(item):
+            dest, src = item
+            if relative:
+                src = os.path.relpath(os.path.abspath(src),
+                                      os.path.dirname(os.path.abspath(dest)))
+            link(src, dest)
+        self._map(make_link, list(self.links.items()))
+
+
 class MergeConflictError(Exception):
 
     def __init__(self, path):
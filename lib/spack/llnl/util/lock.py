@@ -6,6 +6,7 @@
 import os
 import fcntl
 import errno
+import signal
 import time
 import socket
 from datetime import datetime
@@ -15,7 +16,7 @@
 
 
 __all__ = ['Lock', 'LockTransaction', 'WriteTransaction', 'ReadTransaction',
-           'LockError', 'LockTimeoutError',
+           'LockStats', 'LockError', 'LockTimeoutError',
            'LockPermissionError', 'LockROFileError', 'CantCreateLockError']
 
 #: Mapping of supported locks to description
@@ -26,6 +27,94 @@
 true_fn = lambda: True
 
 
+#: Timeouts (in seconds) below which locks are not waited for in the kernel,
+#: as the timers interrupting the wait have a limited resolution
+min_blocking_timeout = 1e-2
+
+
+class _LockAlarm(Exception):
+    """Raised by the alarm interrupting a blocking wait for a lock."""
+
+
+def _raise_lock_alarm(signum, frame):
+    raise _LockAlarm()
+
+
+class LockStats(object):
+    """Counters of the uses of a lock (a byte range of a lock file) by a
+    process. Times are in seconds.
+
+    Acquisitions count the locks taken while the process held no lock on
+    the byte range; upgrades and downgrades the changes of the type of a
+    held lock. Wait times include the waits for upgrades and downgrades,
+    and the hold time runs from the acquisition of the lock to its
+    release.
+    """
+
+    #: Names of the counters
+    counters = ('read_acquisitions', 'write_acquisitions', 'upgrades',
+                'downgrades', 'timeouts', 'wait_time', 'max_wait_time',
+                'hold_time', 'max_hold_time')
+
+    def __init__(self, desc=''):
+        self.desc = desc
+        for name in self.counters:
+            setattr(self, name, 0)
+
+    @property
+    def acquisitions(self):
+        return self.read_acquisitions + self.write_acquisitions
+
+    def record_wait(self, wait_time):
+        self.wait_time += wait_time
+        self.max_wait_time = max(self.max_wait_time, wait_time)
+
+    def record_hold(self, hold_time):
+        self.hold_time += hold_time
+        self.max_hold_time = max(self.max_hold_time, hold_time)
+
+    def merge(self, other):
+        """Add the counters of another ``LockStats`` to these."""
+        for name in self.counters:
+            if name.startswith('max_'):
+                value = max(getattr(self, name), getattr(other, name))
+            else:
+                value = getattr(self, name) + getattr(other, name)
+            setattr(self, name, value)
+        self.desc = self.desc or other.desc
+
+    def to_dict(self):
+        d = dict((name, getattr(self, name)) for name in self.counters)
+        d['desc'] = self.desc
+        return d
+
+    @staticmethod
+    def from_dict(d):
+        stats = LockStats(d.get('desc', ''))
+        for name in LockStats.counters:
+            setattr(stats, name, d.get(name, 0))
+        return stats
+
+
+#: Counters of the locks taken by this process, keyed by the path of the
+#: lock file and the byte range (start, length) of the lock
+lock_stats = {}
+
+
+def get_lock_stats(path, start=0, length=0, desc=''):
+    """The ``LockStats`` of a byte range of a lock file in this process."""
+    key = (os.path.abspath(path), start, length)
+    stats = lock_stats.get(key)
+    if stats is None:
+        stats = lock_stats[key] = LockStats(desc)
+    return stats
+
+
+def reset_lock_stats():
+    """Discard the counters of the locks taken so far by this process."""
+    lock_stats.clear()
+
+
 def _attempts_str(wait_time, nattempts):
     # Don't print anything if we succeeded on the first try
     if nattempts <= 1:
@@ -47,10 +136,16 @@ class Lock(object):
     processes and not for managing contention between threads in a process: the
     functions of this object are not thread-safe. A process also must not
     maintain multiple locks on the same file.
+
+    Contended locks are waited for in the kernel, with a blocking ``lockf()``
+    interrupted by ``SIGALRM`` when the lock times out (see
+    ``_blocking_lock()``). Locks are polled instead when this is not
+    possible, e.g. in threads other than the main thread or on filesystems
+    that do not support blocking locks.
     """
 
     def __init__(self, path, start=0, length=0, default_timeout=None,
-                 debug=False, desc=''):
+                 debug=False, desc='', blocking=True):
         """Construct a new lock on the file at ``path``.
 
         By default, the lock applies to the whole file.  Optionally,
@@ -71,6 +166,8 @@ def __init__(self, path, start=0, length=0, default_timeout=None,
             debug (bool): debug mode specific to locking
             desc (str): optional debug message lock description, which is
                 helpful for distinguishing between different Spack locks.
+            blocking (bool): whether to wait for contended locks in the
+                kernel, or only by polling them
         """
         self.path = path
         self._file = None
@@ -96,6 +193,12 @@ def __init__(self, path, start=0, length=0, default_timeout=None,
         self.pid = self.old_pid = None
         self.host = self.old_host = None
 
+        # wait for contended locks in the kernel
+        self.blocking = blocking
+
+        # time at which the POSIX lock was taken, for the lock statistics
+        self._acquired_at = None
+
     @staticmethod
     def _poll_interval_generator(_wait_times=None):
         """This implements a backoff scheme for polling a contended resource
@@ -137,12 +240,17 @@ def __str__(self):
     def _lock(self, op, timeout=None):
         """This takes a lock using POSIX locks (``fcntl.lockf``).
 
-        The lock is implemented as a spin lock using a nonblocking call
-        to ``lockf()``.
+        The lock is first attempted with a nonblocking call to ``lockf()``.
+        If it is held by another process, it is waited for with a blocking
+        call (see ``_blocking_lock()``) or, if that is not possible, it is
+        polled with nonblocking calls.
 
         If the lock times out, it raises a ``LockError``. If the lock is
         successfully acquired, the total wait time and the number of attempts
         is returned.
+
+        Acquisitions, waits and timeouts are counted in the ``LockStats``
+        of the lock.
         """
         assert op in lock_type
 
@@ -177,9 +285,43 @@ def _lock(self, op, timeout=None):
         tty.debug("{0} locking [{1}:{2}]: timeout {3} sec"
                   .format(lock_type[op], self._start, self._length, timeout))
 
-        poll_intervals = iter(Lock._poll_interval_generator())
+        stats = get_lock_stats(self.path, self._start, self._length,
+                               self.desc.strip())
+        try:
+            wait_time, nattempts = self._wait_for_lock(op, timeout)
+        except LockTimeoutError:
+            stats.timeouts += 1
+            raise
+
+        stats.record_wait(wait_time)
+        if self._reads == 0 and self._writes == 0:
+            self._acquired_at = time.time()
+            if op == fcntl.LOCK_EX:
+                stats.write_acquisitions += 1
+            else:
+                stats.read_acquisitions += 1
+        elif op == fcntl.LOCK_EX:
+            stats.upgrades += 1
+        else:
+            stats.downgrades += 1
+
+        return wait_time, nattempts
+
+    def _wait_for_lock(self, op, timeout):
+        """Takes the POSIX lock on the open lock file, waiting for it at
+        most ``timeout`` seconds, and returns the wait time and the number
+        of attempts."""
         start_time = time.time()
-        num_attempts = 0
+        num_attempts = 1
+        if self._poll_lock(op):
+            return time.time() - start_time, num_attempts
+
+        if self.blocking and self._blocking_lock(op, timeout):
+            num_attempts += 1
+            return time.time() - start_time, num_attempts
+
+        poll_intervals = iter(Lock._poll_interval_generator())
+        time.sleep(next(poll_intervals))
         while (not timeout) or (time.time() - start_time) < timeout:
             num_attempts += 1
             if self._poll_lock(op):
@@ -207,19 +349,7 @@ def _poll_lock(self, op):
             # Try to get the lock (will raise if not available.)
             fcntl.lockf(self._file, op | fcntl.LOCK_NB,
                         self._length, self._start, os.SEEK_SET)
-
-            # help for debugging distributed locking
-            if self.debug:
-                # All locks read the owner PID and host
-                self._read_debug_data()
-                tty.debug('{0} locked {1} [{2}:{3}] (owner={4})'
-                          .format(lock_type[op], self.path,
-                                  self._start, self._length, self.pid))
-
-                # Exclusive locks write their PID/host
-                if op == fcntl.LOCK_EX:
-                    self._write_debug_data()
-
+            self._locked(op)
             return True
 
         except IOError as e:
@@ -229,6 +359,78 @@ def _poll_lock(self, op):
 
         return False
 
+    def _blocking_lock(self, op, timeout):
+        """Wait for the lock in the kernel, with a blocking ``lockf()``.
+
+        The wait is interrupted by a ``SIGALRM`` timer when the lock times
+        out, so this is only possible in the main thread, and if no other
+        timer is set. Return whether the lock was acquired: if not, it is
+        polled instead.
+
+        Raises ``LockTimeoutError`` if the lock times out.
+        """
+        if timeout and timeout < min_blocking_timeout:
+            return False
+
+        try:
+            old_handler = signal.signal(signal.SIGALRM, _raise_lock_alarm)
+        except ValueError:
+            # Signal handlers can only be set in the main thread
+            return False
+
+        try:
+            if old_handler not in (signal.SIG_DFL, signal.SIG_IGN, None) or \
+                    signal.getitimer(signal.ITIMER_REAL)[0]:
+                return False
+
+            try:
+                if timeout:
+                    signal.setitimer(signal.ITIMER_REAL, timeout)
+                try:
+                    fcntl.lockf(self._file, op,
+                                self._length, self._start, os.SEEK_SET)
+                finally:
+                    signal.setitimer(signal.ITIMER_REAL, 0)
+
+            except _LockAlarm:
+                # The lock may have been acquired right before the alarm:
+                # locking again succeeds if this process holds it.
+                if self._poll_lock(op):
+                    return True
+                raise LockTimeoutError("Timed out waiting for a {0} lock."
+                                       .format(lock_type[op]))
+
+            except IOError as e:
+                # EDEADLK == another process waits to upgrade its lock,
+                # ENOLCK == no blocking locks on this filesystem, EINTR ==
+                # interrupted by another signal (python 2): poll instead
+                if e.errno not in (errno.EDEADLK, errno.ENOLCK, errno.EINTR,
+                                   errno.EAGAIN, errno.EACCES):
+                    raise
+                tty.debug('Polling {0} lock on {1}: {2}'.format(
+                    lock_type[op], self.path, str(e)))
+                return False
+
+        finally:
+            signal.signal(signal.SIGALRM, old_handler)
+
+        self._locked(op)
+        return True
+
+    def _locked(self, op):
+        """Record the owner of a lock that was just acquired."""
+        # help for debugging distributed locking
+        if self.debug:
+            # All locks read the owner PID and host
+            self._read_debug_data()
+            tty.debug('{0} locked {1} [{2}:{3}] (owner={4})'
+                      .format(lock_type[op], self.path,
+                              self._start, self._length, self.pid))
+
+            # Exclusive locks write their PID/host
+            if op == fcntl.LOCK_EX:
+                self._write_debug_data()
+
     def _ensure_parent_directory(self):
         parent = os.path.dirname(self.path)
 
@@ -281,6 +483,11 @@ def _unlock(self):
         """
         fcntl.lockf(self._file, fcntl.LOCK_UN,
                     self._length, self._start, os.SEEK_SET)
+        if self._acquired_at is not None:
+            stats = get_lock_stats(self.path, self._start, self._length,
+                                   self.desc.strip())
+            stats.record_hold(time.time() - self._acquired_at)
+            self._acquired_at = None
         self._file.close()
         self._file = None
         self._reads = 0
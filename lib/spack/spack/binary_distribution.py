@@ -4,6 +4,7 @@
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
 import codecs
+import io
 import os
 import re
 import tarfile
@@ -11,7 +12,11 @@
 import tempfile
 import hashlib
 import glob
+import gzip
+import multiprocessing
+import multiprocessing.pool
 import platform
+import time
 
 from contextlib import closing
 import ruamel.yaml as yaml
@@ -24,10 +29,15 @@
 from llnl.util.filesystem import mkdirp
 
 import spack.cmd
+import spack.caches
 import spack.config as config
+import spack.fetch_pipeline
 import spack.fetch_strategy as fs
+import spack.util.compression
+import spack.util.file_type
 import spack.util.gpg
 import spack.relocate as relocate
+import spack.util.spack_json as sjson
 import spack.util.spack_yaml as syaml
 import spack.mirror
 import spack.util.url as url_util
@@ -55,6 +65,30 @@
 
 BUILD_CACHE_INDEX_ENTRY_TEMPLATE = '  <li><a href="{path}">{path}</a></li>'
 
+#: Name of the compressed index of the specs in a build cache
+_index_file_name = 'index.json.gz'
+
+#: Name of the file with the sha256 checksum of the uncompressed index
+_index_hash_file_name = 'index.json.hash'
+
+#: Version of the format of the index
+_index_version = 1
+
+#: Formats the install prefix of a spec can be compressed with, in build
+#: caches, mapped to the extension of its tarball
+_compression_extensions = {
+    'gzip': '.tar.gz',
+    'xz': '.tar.xz',
+    'zstd': '.tar.zst',
+}
+
+
+class BuildCacheError(spack.error.SpackError):
+    """
+    Raised when build caches cannot be created or installed.
+    """
+    pass
+
 
 class NoOverwriteException(spack.error.SpackError):
     """
@@ -146,10 +180,10 @@ def read_buildinfo_file(prefix):
     return buildinfo
 
 
-def write_buildinfo_file(spec, workdir, rel=False):
+def get_buildinfo_dict(spec, rel=False):
     """
-    Create a cache file containing information
-    required for the relocation
+    Return the information required for the relocation of the
+    installation of a spec
     """
     prefix = spec.prefix
     text_to_relocate = []
@@ -162,32 +196,39 @@ def write_buildinfo_file(spec, workdir, rel=False):
     for d in deps:
         prefix_to_hash[str(d.prefix)] = d.dag_hash()
     # Do this at during tarball creation to save time when tarball unpacked.
-    # Used by make_package_relative to determine binaries to change.
+    # Used to make the binaries relative when the tarball is created, and
+    # by relocate_package to determine the files to change.
+    path_names = []
     for root, dirs, files in os.walk(prefix, topdown=True):
         dirs[:] = [d for d in dirs if d not in blacklist]
-        for filename in files:
-            path_name = os.path.join(root, filename)
-            m_type, m_subtype = relocate.mime_type(path_name)
-            if os.path.islink(path_name):
-                link = os.readlink(path_name)
-                if os.path.isabs(link):
-                    # Relocate absolute links into the spack tree
-                    if link.startswith(spack.store.layout.root):
-                        rel_path_name = os.path.relpath(path_name, prefix)
-                        link_to_relocate.append(rel_path_name)
-                    else:
-                        msg = 'Absolute link %s to %s ' % (path_name, link)
-                        msg += 'outside of prefix %s ' % prefix
-                        msg += 'should not be relocated.'
-                        tty.warn(msg)
-
-            if relocate.needs_binary_relocation(m_type, m_subtype):
-                if not filename.endswith('.o'):
+        path_names.extend(os.path.join(root, f) for f in files)
+
+    # Classify all the files at once, reading them concurrently
+    mime_types = spack.util.file_type.mime_types(path_names)
+
+    for path_name in path_names:
+        filename = os.path.basename(path_name)
+        m_type, m_subtype = mime_types[path_name]
+        if os.path.islink(path_name):
+            link = os.readlink(path_name)
+            if os.path.isabs(link):
+                # Relocate absolute links into the spack tree
+                if link.startswith(spack.store.layout.root):
                     rel_path_name = os.path.relpath(path_name, prefix)
-                    binary_to_relocate.append(rel_path_name)
-            if relocate.needs_text_relocation(m_type, m_subtype):
+                    link_to_relocate.append(rel_path_name)
+                else:
+                    msg = 'Absolute link %s to %s ' % (path_name, link)
+                    msg += 'outside of prefix %s ' % prefix
+                    msg += 'should not be relocated.'
+                    tty.warn(msg)
+
+        if relocate.needs_binary_relocation(m_type, m_subtype):
+            if not filename.endswith('.o'):
                 rel_path_name = os.path.relpath(path_name, prefix)
-                text_to_relocate.append(rel_path_name)
+                binary_to_relocate.append(rel_path_name)
+        if relocate.needs_text_relocation(m_type, m_subtype):
+            rel_path_name = os.path.relpath(path_name, prefix)
+            text_to_relocate.append(rel_path_name)
 
     # Create buildinfo data and write it to disk
     buildinfo = {}
@@ -200,9 +241,7 @@ def write_buildinfo_file(spec, workdir, rel=False):
     buildinfo['relocate_binaries'] = binary_to_relocate
     buildinfo['relocate_links'] = link_to_relocate
     buildinfo['prefix_to_hash'] = prefix_to_hash
-    filename = buildinfo_file_name(workdir)
-    with open(filename, 'w') as outfile:
-        outfile.write(syaml.dump(buildinfo, default_flow_style=True))
+    return buildinfo
 
 
 def tarball_directory_name(spec):
@@ -279,21 +318,206 @@ def sign_tarball(key, force, specfile_path):
     Gpg.sign(key, specfile_path, '%s.asc' % specfile_path)
 
 
-def generate_package_index(cache_prefix):
-    """Create the build cache index page.
+class _HashingWriter(object):
+    """Write-only file object that computes the sha256 checksum and the
+    size of the data written through it."""
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.hasher = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self.hasher.update(data)
+        self.size += len(data)
+        self.fileobj.write(data)
+
+
+def _write_streamed_archive(outfile, arcname, write_data):
+    """Write an uncompressed tar archive with a single member, streaming
+    its data straight into the archive.
+
+    The header of the member is written first with a size of zero, and
+    rewritten once ``write_data(fileobj)`` has written all the data of the
+    member to ``fileobj``. In the GNU format, the size of the header does
+    not depend on the size of the member. More members can be appended to
+    the archive afterwards, in ``'a'`` mode.
+
+    Args:
+        outfile: file object of the archive, open for writing and seeking
+        arcname (str): name of the member in the archive
+        write_data (callable): function writing the data of the member
+
+    Returns:
+        (str) the sha256 checksum of the data of the member
+    """
+    info = tarfile.TarInfo(arcname)
+    info.mode = 0o644
+    info.mtime = time.time()
+    header_offset = outfile.tell()
+    outfile.write(info.tobuf(tarfile.GNU_FORMAT))
+
+    writer = _HashingWriter(outfile)
+    write_data(writer)
+
+    info.size = writer.size
+    remainder = info.size % tarfile.BLOCKSIZE
+    if remainder:
+        outfile.write(tarfile.NUL * (tarfile.BLOCKSIZE - remainder))
+    outfile.write(tarfile.NUL * (2 * tarfile.BLOCKSIZE))
+    outfile.seek(header_offset)
+    outfile.write(info.tobuf(tarfile.GNU_FORMAT))
+    return writer.hasher.hexdigest()
+
+
+def _make_binary_relative(spec, cur_path, orig_path, old_layout_root):
+    """Make the paths in the binary ``cur_path``, a copy of ``orig_path``,
+    relative to ``orig_path``."""
+    if (spec.architecture.platform == 'darwin' or
+        spec.architecture.platform == 'test' and
+            platform.system().lower() == 'darwin'):
+        relocate.make_macho_binaries_relative([cur_path], [orig_path],
+                                              old_layout_root)
+    if (spec.architecture.platform == 'linux' or
+        spec.architecture.platform == 'test' and
+            platform.system().lower() == 'linux'):
+        relocate.make_elf_binaries_relative([cur_path], [orig_path],
+                                            old_layout_root)
+
+
+def _write_prefix_tarball(fileobj, spec, buildinfo, rel, allow_root,
+                          scratch, compression='gzip', threads=None):
+    """Write the install prefix of a spec as a compressed tarball.
+
+    The tarball is written in a single pass over the prefix, which is
+    left untouched. The buildinfo file is added in place of the one in
+    the prefix, if any. With ``rel``, absolute links into the install
+    tree are made relative, and so are the paths in binaries: each of
+    them is copied to the ``scratch`` directory to be modified, and
+    removed once added to the tarball. The tarball is compressed with
+    ``threads`` threads, in the given format (see
+    ``spack.util.compression.compressed_stream``).
+    """
+    prefix = str(spec.prefix)
+    topdir = os.path.basename(prefix)
+    buildinfo_path = os.path.relpath(buildinfo_file_name(prefix), prefix)
+    binaries = set(buildinfo['relocate_binaries'] if rel else [])
+    links = set(buildinfo['relocate_links'] if rel else [])
+
+    with spack.util.compression.compressed_stream(
+            fileobj, compression, threads) as stream:
+        with closing(tarfile.open(fileobj=stream, mode='w|')) as tar:
+            stack = ['']
+            while stack:
+                rel_path = stack.pop()
+                if rel_path == buildinfo_path:
+                    continue
+
+                path, arcname = prefix, topdir
+                if rel_path:
+                    path = os.path.join(prefix, rel_path)
+                    arcname = os.path.join(topdir, rel_path)
+
+                info = tar.gettarinfo(path, arcname)
+                if info is None:
+                    # sockets cannot be archived
+                    continue
+
+                if info.isdir():
+                    tar.addfile(info)
+                    stack.extend(os.path.join(rel_path, name) for name in
+                                 sorted(os.listdir(path), reverse=True))
+                elif info.issym() and rel_path in links:
+                    info.linkname = os.path.relpath(
+                        info.linkname, os.path.dirname(path))
+                    tar.addfile(info)
+                elif info.isreg() and rel_path in binaries:
+                    copy = os.path.join(scratch, rel_path)
+                    mkdirp(os.path.dirname(copy))
+                    shutil.copyfile(path, copy)
+                    _make_binary_relative(
+                        spec, copy, path, buildinfo['buildpath'])
+                    relocate.check_files_relocatable([copy], allow_root)
+                    info.size = os.path.getsize(copy)
+                    with open(copy, 'rb') as f:
+                        tar.addfile(info, f)
+                    os.remove(copy)
+                elif info.isreg():
+                    with open(path, 'rb') as f:
+                        tar.addfile(info, f)
+                else:
+                    tar.addfile(info)
+
+            data = syaml.dump(
+                buildinfo, default_flow_style=True).encode('utf-8')
+            info = tarfile.TarInfo(os.path.join(topdir, buildinfo_path))
+            info.size = len(data)
+            info.mode = 0o644
+            info.mtime = time.time()
+            tar.addfile(info, io.BytesIO(data))
+
+
+def _spec_dict_hash(spec_dict):
+    """DAG hash of the spec in a dictionary read from a spec.yaml file."""
+    root = spec_dict['spec'][0]
+    dag_hash = root[next(iter(root))].get('hash')
+    return dag_hash or Spec.from_dict(spec_dict).dag_hash()
+
+
+def _read_spec_file(url):
+    """Read a spec.yaml file from a build cache, or return None if it cannot
+    be read."""
+    try:
+        _, _, spec_file = web_util.read_from_url(url)
+        return syaml.load(codecs.getreader('utf-8')(spec_file).read())
+    except (URLError, web_util.SpackWebError, yaml.YAMLError) as e:
+        tty.warn('Cannot read {0}'.format(url_util.format(url)), str(e))
+        return None
+
+
+def _read_index(index_url):
+    """Download and decompress the index of a build cache.
+
+    Returns:
+        (tuple) the sha256 checksum of the uncompressed index, and the index
+    """
+    _, _, index_file = web_util.read_from_url(index_url)
+    with closing(gzip.GzipFile(fileobj=io.BytesIO(index_file.read()))) as f:
+        data = f.read()
+    index = sjson.load(data.decode('utf-8'))
+    if index.get('buildcache', {}).get('version') != _index_version:
+        raise ValueError('unsupported version of the index')
+    return hashlib.sha256(data).hexdigest(), index['buildcache']
+
+
+def generate_package_index(cache_prefix, updated=None):
+    """Create the build cache index page and the index of its specs.
 
     Creates (or replaces) the "index.html" page at the location given in
     cache_prefix.  This page contains a link for each binary package (*.yaml)
     and public key (*.key) under cache_prefix.
+
+    Also creates (or replaces) the index of the specs in the build cache, a
+    compressed JSON file with the spec, the full hash, the buildinfo and the
+    checksum of each binary package, keyed by its DAG hash, and the sha256
+    checksum of the (uncompressed) index, which clients check to know if
+    their copy of the index is up to date.
+
+    Args:
+        cache_prefix (str): URL of the build cache
+        updated (list or None): names of the spec files added or replaced
+            since the index was last generated. If given, the entries of the
+            current index are reused for all the other spec files, which are
+            not read again.
     """
     tmpdir = tempfile.mkdtemp()
     try:
         index_html_path = os.path.join(tmpdir, 'index.html')
-        file_list = (
+        file_list = [
             entry
             for entry in web_util.list_url(cache_prefix)
             if (entry.endswith('.yaml')
-                or entry.endswith('.key')))
+                or entry.endswith('.key'))]
 
         with open(index_html_path, 'w') as f:
             f.write(BUILD_CACHE_INDEX_TEMPLATE.format(
@@ -307,26 +531,102 @@ def generate_package_index(cache_prefix):
             url_util.join(cache_prefix, 'index.html'),
             keep_original=False,
             extra_args={'ContentType': 'text/html'})
+
+        spec_files = set(f for f in file_list if f.endswith('.spec.yaml'))
+
+        specs = {}
+        if updated is not None:
+            try:
+                _, index = _read_index(
+                    url_util.join(cache_prefix, _index_file_name))
+            except (URLError, web_util.SpackWebError, IOError,
+                    ValueError) as e:
+                tty.debug('Cannot reuse the build cache index: ' + str(e))
+            else:
+                specs = dict(
+                    (dag_hash, entry)
+                    for dag_hash, entry in index['specs'].items()
+                    if entry['spec_file'] in spec_files and
+                    entry['spec_file'] not in updated)
+
+        # read the spec files that are not in the index concurrently
+        to_read = sorted(spec_files - set(
+            entry['spec_file'] for entry in specs.values()))
+        urls = [url_util.join(cache_prefix, f) for f in to_read]
+        if len(urls) > 1:
+            tp = multiprocessing.pool.ThreadPool(
+                min(len(urls), spack.fetch_pipeline.default_jobs()))
+            try:
+                spec_dicts = tp.map(_read_spec_file, urls)
+            finally:
+                tp.close()
+                tp.join()
+        else:
+            spec_dicts = [_read_spec_file(url) for url in urls]
+
+        for spec_file, spec_dict in zip(to_read, spec_dicts):
+            if spec_dict:
+                spec_dict['spec_file'] = spec_file
+                specs[_spec_dict_hash(spec_dict)] = spec_dict
+
+        index = syaml.syaml_dict([('buildcache', syaml.syaml_dict([
+            ('version', _index_version),
+            ('specs', syaml.syaml_dict(sorted(specs.items()))),
+            ('full_hashes', syaml.syaml_dict(sorted(
+                (entry['full_hash'], dag_hash)
+                for dag_hash, entry in specs.items()
+                if 'full_hash' in entry)))
+        ]))])
+        data = sjson.dump(index).encode('utf-8')
+
+        # upload the index before its checksum, so that clients seeing the
+        # new checksum find the new index
+        index_path = os.path.join(tmpdir, _index_file_name)
+        with open(index_path, 'wb') as f:
+            with closing(gzip.GzipFile(
+                    fileobj=f, mode='wb', filename='', mtime=0)) as gz:
+                gz.write(data)
+        hash_path = os.path.join(tmpdir, _index_hash_file_name)
+        with open(hash_path, 'w') as f:
+            f.write(hashlib.sha256(data).hexdigest())
+
+        for path, content_type in ((index_path, 'application/gzip'),
+                                   (hash_path, 'text/plain')):
+            web_util.push_to_url(
+                path,
+                url_util.join(cache_prefix, os.path.basename(path)),
+                keep_original=False,
+                extra_args={'ContentType': content_type})
     finally:
         shutil.rmtree(tmpdir)
 
+    # the indexes read so far may be out of date
+    _mirror_indexes.clear()
+
 
 def build_tarball(spec, outdir, force=False, rel=False, unsigned=False,
-                  allow_root=False, key=None, regenerate_index=False):
+                  allow_root=False, key=None, regenerate_index=False,
+                  compression=None, threads=None):
     """
     Build a tarball from given spec and put it into the directory structure
     used at the mirror (following <tarball_directory_name>).
+
+    The install prefix is compressed in the given format (default: the
+    ``config:binary_compression`` setting) with ``threads`` threads
+    (default: one per CPU).
     """
     if not spec.concrete:
         raise ValueError('spec must be concrete to build tarball')
 
+    compression = compression or config.get(
+        'config:binary_compression', 'gzip')
+
     # set up some paths
     tmpdir = tempfile.mkdtemp()
     cache_prefix = build_cache_prefix(tmpdir)
 
-    tarfile_name = tarball_name(spec, '.tar.gz')
+    tarfile_name = tarball_name(spec, _compression_extensions[compression])
     tarfile_dir = os.path.join(cache_prefix, tarball_directory_name(spec))
-    tarfile_path = os.path.join(tarfile_dir, tarfile_name)
     spackfile_path = os.path.join(
         cache_prefix, tarball_path_name(spec, '.spack'))
 
@@ -357,51 +657,26 @@ def build_tarball(spec, outdir, force=False, rel=False, unsigned=False,
         else:
             raise NoOverwriteException(url_util.format(remote_specfile_path))
 
-    # make a copy of the install directory to work with
-    workdir = os.path.join(tmpdir, os.path.basename(spec.prefix))
-    # install_tree copies hardlinks
-    # create a temporary tarfile from prefix and exract it to workdir
-    # tarfile preserves hardlinks
-    temp_tarfile_name = tarball_name(spec, '.tar')
-    temp_tarfile_path = os.path.join(tarfile_dir, temp_tarfile_name)
-    with closing(tarfile.open(temp_tarfile_path, 'w')) as tar:
-        tar.add(name='%s' % spec.prefix,
-                arcname='.')
-    with closing(tarfile.open(temp_tarfile_path, 'r')) as tar:
-        tar.extractall(workdir)
-    os.remove(temp_tarfile_path)
-
-    # create info for later relocation and create tar
-    write_buildinfo_file(spec, workdir, rel)
-
-    # optionally make the paths in the binaries relative to each other
-    # in the spack install tree before creating tarball
-    if rel:
-        try:
-            make_package_relative(workdir, spec, allow_root)
-        except Exception as e:
-            shutil.rmtree(workdir)
-            shutil.rmtree(tarfile_dir)
-            shutil.rmtree(tmpdir)
-            tty.die(e)
-    else:
-        try:
-            check_package_relocatable(workdir, spec, allow_root)
-        except Exception as e:
-            shutil.rmtree(workdir)
-            shutil.rmtree(tarfile_dir)
-            shutil.rmtree(tmpdir)
-            tty.die(e)
+    buildinfo = get_buildinfo_dict(spec, rel)
 
-    # create gzip compressed tarball of the install prefix
-    with closing(tarfile.open(tarfile_path, 'w:gz')) as tar:
-        tar.add(name='%s' % workdir,
-                arcname='%s' % os.path.basename(spec.prefix))
-    # remove copy of install directory
-    shutil.rmtree(workdir)
-
-    # get the sha256 checksum of the tarball
-    checksum = checksum_tarball(tarfile_path)
+    # the prefix is streamed into the .spack archive in a single pass, with
+    # the paths in the binaries optionally made relative to each other on
+    # the way: only the binaries being modified are copied, one at a time
+    try:
+        if not rel:
+            relocate.check_files_relocatable(
+                [os.path.join(spec.prefix, f)
+                 for f in buildinfo['relocate_binaries']], allow_root)
+
+        scratch = os.path.join(tmpdir, 'relocate')
+        with open(spackfile_path, 'wb') as spackfile:
+            checksum = _write_streamed_archive(
+                spackfile, tarfile_name, lambda f: _write_prefix_tarball(
+                    f, spec, buildinfo, rel, allow_root, scratch,
+                    compression, threads))
+    except Exception as e:
+        shutil.rmtree(tmpdir)
+        tty.die(e)
 
     # add sha256 checksum to spec.yaml
     with open(spec_file, 'r') as inputfile:
@@ -417,6 +692,7 @@ def build_tarball(spec, outdir, force=False, rel=False, unsigned=False,
     buildinfo['relative_prefix'] = os.path.relpath(
         spec.prefix, spack.store.layout.root)
     buildinfo['relative_rpaths'] = rel
+    buildinfo['compression'] = compression
     spec_dict['buildinfo'] = buildinfo
     spec_dict['full_hash'] = spec.full_hash()
 
@@ -432,16 +708,16 @@ def build_tarball(spec, outdir, force=False, rel=False, unsigned=False,
     # sign the tarball and spec file with gpg
     if not unsigned:
         sign_tarball(key, force, specfile_path)
-    # put tarball, spec and signature files in .spack archive
-    with closing(tarfile.open(spackfile_path, 'w')) as tar:
-        tar.add(name=tarfile_path, arcname='%s' % tarfile_name)
+    # append spec and signature files to the .spack archive, after the
+    # tarball of the prefix
+    with closing(tarfile.open(spackfile_path, 'a',
+                              format=tarfile.GNU_FORMAT)) as tar:
         tar.add(name=specfile_path, arcname='%s' % specfile_name)
         if not unsigned:
             tar.add(name='%s.asc' % specfile_path,
                     arcname='%s.asc' % specfile_name)
 
     # cleanup file moved to archive
-    os.remove(tarfile_path)
     if not unsigned:
         os.remove('%s.asc' % specfile_path)
 
@@ -458,13 +734,93 @@ def build_tarball(spec, outdir, force=False, rel=False, unsigned=False,
         # found
         if regenerate_index:
             generate_package_index(url_util.join(
-                outdir, os.path.relpath(cache_prefix, tmpdir)))
+                outdir, os.path.relpath(cache_prefix, tmpdir)),
+                updated=[specfile_name])
     finally:
         shutil.rmtree(tmpdir)
 
     return None
 
 
+def _spec_from_dict(spec_dict):
+    spec = Spec.from_dict(spec_dict)
+    spec._mark_concrete()
+    return spec
+
+
+def _build_tarball_in_pool(args):
+    """Build a tarball in a worker of a pool, returning the error message
+    if it fails."""
+    spec_dict, outdir, kwargs = args
+    try:
+        build_tarball(_spec_from_dict(spec_dict), outdir, **kwargs)
+    except (Exception, SystemExit) as e:
+        # errors passed to tty.die() were already printed
+        return str(e) if isinstance(e, Exception) else 'see above'
+    return None
+
+
+def build_tarballs(specs, outdir, force=False, rel=False, unsigned=False,
+                   allow_root=False, key=None, regenerate_index=False,
+                   jobs=None, compression=None):
+    """
+    Build the tarballs of many specs (see ``build_tarball``), with a pool of
+    processes that compress, sign and push them concurrently.
+
+    The index of the build cache is regenerated once, after all the
+    tarballs are built.
+
+    Args:
+        specs (list): concrete, installed specs
+        outdir (str): URL of the mirror where tarballs are pushed
+        jobs (int or None): number of processes building tarballs at the
+            same time (default: one per CPU)
+        compression (str or None): format of the tarballs (default: the
+            ``config:binary_compression`` setting)
+    """
+    specs = list(specs)
+    cpus = multiprocessing.cpu_count()
+    jobs = min(jobs or cpus, len(specs))
+    # the CPUs are shared by the processes compressing tarballs
+    kwargs = {'force': force, 'rel': rel, 'unsigned': unsigned,
+              'allow_root': allow_root, 'key': key,
+              'compression': compression,
+              'threads': max(1, cpus // max(1, jobs))}
+
+    if jobs <= 1:
+        built = specs
+        for spec in specs:
+            build_tarball(spec, outdir, **kwargs)
+    else:
+        tty.msg('Creating build caches of {0} specs with {1} processes'.format(
+            len(specs), jobs))
+        pool = web_util.NonDaemonPool(processes=jobs)
+        try:
+            errors = pool.map(
+                _build_tarball_in_pool,
+                [(spec.to_dict(), outdir, kwargs) for spec in specs],
+                chunksize=1)
+        finally:
+            pool.terminate()
+            pool.join()
+
+        built = [spec for spec, error in zip(specs, errors) if not error]
+        for spec, error in zip(specs, errors):
+            if error:
+                tty.error('Could not create the build cache of {0}: {1}'
+                          .format(spec.cformat('{name}{@version}{/hash:7}'),
+                                  error))
+
+    if regenerate_index and built:
+        generate_package_index(
+            url_util.join(outdir, _build_cache_relative_path),
+            updated=[tarball_name(spec, '.spec.yaml') for spec in built])
+
+    if len(built) < len(specs):
+        raise BuildCacheError('Could not create the build caches of '
+                              '{0} specs'.format(len(specs) - len(built)))
+
+
 def download_tarball(spec):
     """
     Download binary tarball for given package into stage area
@@ -483,6 +839,7 @@ def download_tarball(spec):
         # stage the tarball into standard place
         stage = Stage(url, name="build_cache", keep=True)
         try:
+            stage.create()
             stage.fetch()
             return stage.save_filename
         except fs.FetchError:
@@ -491,50 +848,6 @@ def download_tarball(spec):
     return None
 
 
-def make_package_relative(workdir, spec, allow_root):
-    """
-    Change paths in binaries to relative paths. Change absolute symlinks
-    to relative symlinks.
-    """
-    prefix = spec.prefix
-    buildinfo = read_buildinfo_file(workdir)
-    old_layout_root = buildinfo['buildpath']
-    orig_path_names = list()
-    cur_path_names = list()
-    for filename in buildinfo['relocate_binaries']:
-        orig_path_names.append(os.path.join(prefix, filename))
-        cur_path_names.append(os.path.join(workdir, filename))
-    if (spec.architecture.platform == 'darwin' or
-        spec.architecture.platform == 'test' and
-            platform.system().lower() == 'darwin'):
-        relocate.make_macho_binaries_relative(cur_path_names, orig_path_names,
-                                              old_layout_root)
-    if (spec.architecture.platform == 'linux' or
-        spec.architecture.platform == 'test' and
-            platform.system().lower() == 'linux'):
-        relocate.make_elf_binaries_relative(cur_path_names, orig_path_names,
-                                            old_layout_root)
-    relocate.check_files_relocatable(cur_path_names, allow_root)
-    orig_path_names = list()
-    cur_path_names = list()
-    for linkname in buildinfo.get('relocate_links', []):
-        orig_path_names.append(os.path.join(prefix, linkname))
-        cur_path_names.append(os.path.join(workdir, linkname))
-    relocate.make_link_relative(cur_path_names, orig_path_names)
-
-
-def check_package_relocatable(workdir, spec, allow_root):
-    """
-    Check if package binaries are relocatable.
-    Change links to placeholder links.
-    """
-    buildinfo = read_buildinfo_file(workdir)
-    cur_path_names = list()
-    for filename in buildinfo['relocate_binaries']:
-        cur_path_names.append(os.path.join(workdir, filename))
-    relocate.check_files_relocatable(cur_path_names, allow_root)
-
-
 def relocate_package(spec, allow_root):
     """
     Relocate the given package
@@ -658,17 +971,11 @@ def extract_tarball(spec, filename, allow_root=False, unsigned=False,
     stagepath = os.path.dirname(filename)
     spackfile_name = tarball_name(spec, '.spack')
     spackfile_path = os.path.join(stagepath, spackfile_name)
-    tarfile_name = tarball_name(spec, '.tar.gz')
-    tarfile_path = os.path.join(tmpdir, tarfile_name)
     specfile_name = tarball_name(spec, '.spec.yaml')
     specfile_path = os.path.join(tmpdir, specfile_name)
 
     with closing(tarfile.open(spackfile_path, 'r')) as tar:
         tar.extractall(tmpdir)
-    # some buildcache tarfiles use bzip2 compression
-    if not os.path.exists(tarfile_path):
-        tarfile_name = tarball_name(spec, '.tar.bz2')
-        tarfile_path = os.path.join(tmpdir, tarfile_name)
     if not unsigned:
         if os.path.exists('%s.asc' % specfile_path):
             try:
@@ -683,14 +990,33 @@ def extract_tarball(spec, filename, allow_root=False, unsigned=False,
                 "Package spec file failed signature verification.\n"
                 "Use spack buildcache keys to download "
                 "and install a key for verification from the mirror.")
-    # get the sha256 checksum of the tarball
-    checksum = checksum_tarball(tarfile_path)
 
-    # get the sha256 checksum recorded at creation
     spec_dict = {}
     with open(specfile_path, 'r') as inputfile:
         content = inputfile.read()
         spec_dict = syaml.load(content)
+
+    # the compression of the tarball is recorded since it can be chosen,
+    # older tarballs were compressed with gzip or, for some, bzip2
+    compression = spec_dict.get('buildinfo', {}).get('compression')
+    if compression and compression not in _compression_extensions:
+        shutil.rmtree(tmpdir)
+        raise BuildCacheError(
+            'Package tarball is compressed in an unknown format: {0}.\n'
+            'It cannot be installed.'.format(compression))
+    elif compression:
+        tarfile_name = tarball_name(
+            spec, _compression_extensions[compression])
+    else:
+        tarfile_name = tarball_name(spec, '.tar.gz')
+        if not os.path.exists(os.path.join(tmpdir, tarfile_name)):
+            tarfile_name = tarball_name(spec, '.tar.bz2')
+    tarfile_path = os.path.join(tmpdir, tarfile_name)
+
+    # get the sha256 checksum of the tarball
+    checksum = checksum_tarball(tarfile_path)
+
+    # get the sha256 checksum recorded at creation
     bchecksum = spec_dict['binary_cache_checksum']
 
     # if the checksums don't match don't install
@@ -721,8 +1047,14 @@ def extract_tarball(spec, filename, allow_root=False, unsigned=False,
 #        raise NewLayoutException(msg)
 
     # extract the tarball in a temp directory
-    with closing(tarfile.open(tarfile_path, 'r')) as tar:
-        tar.extractall(path=tmpdir)
+    if compression:
+        with spack.util.compression.decompressed_stream(
+                tarfile_path, compression) as stream:
+            with closing(tarfile.open(fileobj=stream, mode='r|')) as tar:
+                tar.extractall(path=tmpdir)
+    else:
+        with closing(tarfile.open(tarfile_path, 'r')) as tar:
+            tar.extractall(path=tmpdir)
     # get the parent directory of the file .spack/binary_distribution
     # this should the directory unpacked from the tarball whose
     # name is unknown because the prefix naming is unknown
@@ -763,9 +1095,153 @@ def extract_tarball(spec, filename, allow_root=False, unsigned=False,
             os.remove(filename)
 
 
+def _extract_tarball_in_pool(args):
+    """Download and extract a tarball in a worker of a pool, returning the
+    error message if it fails."""
+    spec_dict, allow_root, unsigned, force = args
+    spec = _spec_from_dict(spec_dict)
+    try:
+        tarball = download_tarball(spec)
+        if not tarball:
+            return 'download of binary cache file failed'
+        extract_tarball(spec, tarball, allow_root, unsigned, force)
+    except (Exception, SystemExit) as e:
+        # errors passed to tty.die() were already printed
+        return str(e) if isinstance(e, Exception) else 'see above'
+    return None
+
+
+def extract_tarballs(specs, allow_root=False, unsigned=False, force=False,
+                     jobs=None):
+    """
+    Download and extract the tarballs of many specs with a pool of processes.
+
+    The tarball of a spec is extracted and relocated only once all its link
+    and run dependencies among ``specs`` are installed: specs that do not
+    depend on each other are installed concurrently. Specs are yielded as
+    they are installed, in the calling process, which is where the database
+    must be updated.
+
+    Args:
+        specs (list): concrete specs to be installed from build caches
+        jobs (int or None): number of processes extracting tarballs at the
+            same time (default: one per CPU)
+
+    Yields:
+        (tuple) each spec, and the error message if it could not be
+            installed (either because its tarball could not be installed,
+            or because one of its dependencies was not)
+    """
+    pending = list(specs)
+    hashes = set(spec.dag_hash() for spec in pending)
+    jobs = jobs or multiprocessing.cpu_count()
+    deptype = ('link', 'run')
+
+    pool = web_util.NonDaemonPool(processes=min(jobs, len(pending) or 1))
+    try:
+        failed, done = set(), set()
+        while pending:
+            ready, waiting = [], []
+            for spec in pending:
+                deps = set(d.dag_hash() for d in spec.traverse(
+                    root=False, deptype=deptype)) & hashes
+                if deps & failed:
+                    failed.add(spec.dag_hash())
+                    yield spec, 'a dependency could not be installed'
+                elif deps <= done:
+                    ready.append(spec)
+                else:
+                    waiting.append(spec)
+            pending = waiting
+
+            args = [(spec.to_dict(), allow_root, unsigned, force)
+                    for spec in ready]
+            results = pool.imap(_extract_tarball_in_pool, args, chunksize=1)
+            for spec, error in zip(ready, results):
+                (failed if error else done).add(spec.dag_hash())
+                yield spec, error
+    finally:
+        pool.terminate()
+        pool.join()
+
+
 # Internal cache for downloaded specs
 _cached_specs = set()
 
+# Internal cache for the indexes of the build caches of mirrors
+_mirror_indexes = {}
+
+
+def get_mirror_index(mirror_url, force=False):
+    """Return the index of the specs in the build cache of a mirror, or None
+    if the mirror has no such index.
+
+    The index is downloaded once, and kept in the misc cache until the
+    checksum published with it changes.
+
+    Args:
+        mirror_url (str): URL of the mirror
+        force (bool): check the checksum of the index again, even if the
+            index was already read by this process
+
+    Returns:
+        (dict or None) the entries of the index keyed by DAG hash
+            (``specs``), and the DAG hashes keyed by full hash
+            (``full_hashes``)
+    """
+    if not force and mirror_url in _mirror_indexes:
+        return _mirror_indexes[mirror_url]
+
+    cache_prefix = url_util.join(mirror_url, _build_cache_relative_path)
+    hash_url = url_util.join(cache_prefix, _index_hash_file_name)
+    try:
+        _, _, hash_file = web_util.read_from_url(hash_url)
+        index_hash = codecs.getreader('utf-8')(hash_file).read().strip()
+    except (URLError, web_util.SpackWebError, IOError) as e:
+        tty.debug('No build cache index at {0}: {1}'.format(
+            url_util.format(cache_prefix), str(e)))
+        _mirror_indexes[mirror_url] = None
+        return None
+
+    cache = spack.caches.misc_cache
+    cache_key = os.path.join('build_cache', '{0}.json'.format(
+        hashlib.sha256(mirror_url.encode('utf-8')).hexdigest()))
+
+    cached = None
+    if cache.init_entry(cache_key):
+        with cache.read_transaction(cache_key) as f:
+            try:
+                cached = sjson.load(f)
+            except ValueError:
+                pass
+
+    if cached and cached.get('hash') == index_hash:
+        index = cached['index']
+    else:
+        tty.debug('Downloading the build cache index of {0}'.format(
+            url_util.format(cache_prefix)))
+        try:
+            index_hash, index = _read_index(
+                url_util.join(cache_prefix, _index_file_name))
+        except (URLError, web_util.SpackWebError, IOError,
+                ValueError) as e:
+            tty.warn('Cannot read the build cache index of {0}'.format(
+                url_util.format(cache_prefix)), str(e))
+            index = None
+        else:
+            cache.init_entry(cache_key)
+            with cache.write_transaction(cache_key) as (old, new):
+                sjson.dump({'hash': index_hash, 'index': index}, new)
+
+    _mirror_indexes[mirror_url] = index
+    return index
+
+
+def _spec_from_index(entry):
+    spec = Spec.from_dict(entry)
+    spec._mark_concrete()
+    return spec
+
 
 def try_download_specs(urls=None, force=False):
     '''
@@ -815,6 +1291,15 @@ def get_spec(spec=None, force=False):
         fetch_url_build_cache = url_util.join(
             mirror.fetch_url, _build_cache_relative_path)
 
+        # look the spec up directly in the index of the mirror, if any.
+        # The index may not list specs pushed since it was generated, so
+        # they are still looked for in their own spec.yaml file.
+        index = get_mirror_index(mirror.fetch_url, force=force)
+        entry = index['specs'].get(spec.dag_hash()) if index else None
+        if entry:
+            _cached_specs.add(_spec_from_index(entry))
+            continue
+
         mirror_dir = url_util.local_file_path(fetch_url_build_cache)
         if mirror_dir:
             tty.msg("Finding buildcaches in %s" % mirror_dir)
@@ -852,17 +1337,29 @@ def get_specs(force=False, allarch=False):
         fetch_url_build_cache = url_util.join(
             mirror.fetch_url, _build_cache_relative_path)
 
+        index = get_mirror_index(mirror.fetch_url, force=force)
+        indexed = set()
+        if index is not None:
+            tty.msg("Reading the buildcache index of %s" %
+                    url_util.format(fetch_url_build_cache))
+            for entry in index['specs'].values():
+                indexed.add(entry['spec_file'])
+                if arch_re.search(entry['spec_file']):
+                    _cached_specs.add(_spec_from_index(entry))
+
         mirror_dir = url_util.local_file_path(fetch_url_build_cache)
         if mirror_dir:
+            # Listing a local mirror is cheap, and finds the specs that were
+            # pushed without updating its index
             tty.msg("Finding buildcaches in %s" % mirror_dir)
             if os.path.exists(mirror_dir):
                 files = os.listdir(mirror_dir)
                 for file in files:
                     m = arch_re.search(file)
-                    if m:
+                    if m and file not in indexed:
                         link = url_util.join(fetch_url_build_cache, file)
                         urls.add(link)
-        else:
+        elif index is None:
             tty.msg("Finding buildcaches at %s" %
                     url_util.format(fetch_url_build_cache))
             p, links = web_util.spider(
@@ -942,9 +1439,14 @@ def needs_rebuild(spec, mirror_url, rebuild_on_errors=False):
         pkg_name, pkg_version, pkg_hash, pkg_full_hash))
     tty.debug(spec.tree())
 
-    # Try to retrieve the .spec.yaml directly, based on the known
-    # format of the name, in order to determine if the package
-    # needs to be rebuilt.
+    # Look the spec up in the index of the mirror, if there is one
+    index = get_mirror_index(mirror_url)
+    if index is not None and pkg_full_hash in index['full_hashes']:
+        return False
+
+    # Otherwise, try to retrieve the .spec.yaml directly, based on the
+    # known format of the name, in order to determine if the package
+    # needs to be rebuilt. The index may be older than the spec.yaml.
     cache_prefix = build_cache_prefix(mirror_url)
     spec_yaml_file_name = tarball_name(spec, '.spec.yaml')
     file_path = os.path.join(cache_prefix, spec_yaml_file_name)
@@ -769,7 +769,7 @@ def modifications_from_dependencies(spec, context):
     return env
 
 
-def fork(pkg, function, dirty, fake):
+def fork(pkg, function, dirty, fake, jobs=None):
     """Fork a child process to do part of a spack build.
 
     Args:
@@ -781,6 +781,9 @@ def fork(pkg, function, dirty, fake):
         dirty (bool): If True, do NOT clean the environment before
             building.
         fake (bool): If True, skip package setup b/c it's not a real build
+        jobs (int or None): If set, override ``config:build_jobs`` in the
+            child process (e.g., to share a job budget between concurrent
+            builds)
 
     Usage::
 
@@ -807,6 +810,12 @@ def child_process(child_pipe, input_stream):
         if input_stream is not None:
             sys.stdin = input_stream
 
+        # The child has its own copy of the configuration, so the override
+        # does not leak into the parent or any sibling build. It is kept in
+        # memory, as the configuration files are shared with all of them.
+        if jobs is not None:
+            spack.config.set('config:build_jobs', jobs, scope='command_line')
+
         try:
             if not fake:
                 setup_package(pkg, dirty=dirty)
@@ -61,7 +61,18 @@ def store(self, fetcher, relative_dest):
         # normally be cached (e.g. the current tip of an hg/git branch)
         dst = os.path.join(self.root, relative_dest)
         mkdirp(os.path.dirname(dst))
-        fetcher.archive(dst)
+
+        # An interrupted archive must not be taken for a complete one when
+        # the mirror is updated again, so it is only moved in place once
+        # done (the temporary name keeps the extension of the archive)
+        tmp = os.path.join(
+            os.path.dirname(dst), '.tmp-' + os.path.basename(dst))
+        try:
+            fetcher.archive(tmp)
+            os.rename(tmp, dst)
+        finally:
+            if os.path.lexists(tmp):
+                os.remove(tmp)
 
     def symlink(self, mirror_ref):
         """Symlink a human readible path in our mirror to the actual
@@ -3,6 +3,7 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
+import multiprocessing
 import os
 import shutil
 import sys
@@ -81,6 +82,14 @@ def setup_parser(subparser):
                               ' its dependencies. Alternatively, one can'
                               ' decide to build a cache for only the package'
                               ' or only the dependencies'))
+    create.add_argument('--compression', default=None,
+                        choices=['gzip', 'xz', 'zstd'],
+                        help="compression of the tarballs (default: "
+                             "config:binary_compression, or gzip)")
+    create.add_argument('-j', '--jobs', type=int, default=None,
+                        metavar='N',
+                        help="create up to N tarballs at a time "
+                             "(default: one per CPU)")
     arguments.add_common_arguments(create, ['specs'])
     create.set_defaults(func=createtarball)
 
@@ -99,6 +108,10 @@ def setup_parser(subparser):
                          help="install specs from other architectures" +
                               " instead of default platform and OS")
 
+    install.add_argument('-j', '--jobs', type=int, default=None,
+                         metavar='N',
+                         help="install up to N specs at a time (default: "
+                              "one per CPU for several specs, otherwise 1)")
     arguments.add_common_arguments(install, ['specs'])
     install.set_defaults(func=installtarball)
 
@@ -325,7 +338,7 @@ def match_downloaded_specs(pkgs, allow_multiple_matches=False, force=False,
 
 def _createtarball(env, spec_yaml, packages, add_spec, add_deps,
                    output_location, key, force, rel, unsigned, allow_root,
-                   no_rebuild_index):
+                   no_rebuild_index, jobs=1, compression=None):
     if spec_yaml:
         packages = set()
         with open(spec_yaml, 'r') as fd:
@@ -392,15 +405,23 @@ def _createtarball(env, spec_yaml, packages, add_spec, add_deps,
 
     tty.debug('writing tarballs to %s/build_cache' % outdir)
 
-    for spec in specs:
-        tty.debug('creating binary cache file for package %s ' % spec.format())
-        bindist.build_tarball(spec, outdir, force, rel,
-                              unsigned, allow_root, signkey,
-                              not no_rebuild_index)
+    try:
+        bindist.build_tarballs(specs, outdir, force, rel, unsigned,
+                               allow_root, signkey, not no_rebuild_index,
+                               jobs=jobs, compression=compression)
+    except bindist.BuildCacheError as e:
+        tty.die(e)
+
+
+def _check_jobs(args):
+    if args.jobs is not None and args.jobs < 1:
+        tty.die('invalid value for argument "--jobs" '
+                '[expected a positive integer, got "{0}"]'.format(args.jobs))
 
 
 def createtarball(args):
     """create a binary package from an existing install"""
+    _check_jobs(args)
 
     # restrict matching to current environment if one is active
     env = ev.get_env(args, 'buildcache create')
@@ -445,11 +466,13 @@ def createtarball(args):
 
     _createtarball(env, args.spec_yaml, args.specs, add_spec, add_deps,
                    output_location, args.key, args.force, args.rel,
-                   args.unsigned, args.allow_root, args.no_rebuild_index)
+                   args.unsigned, args.allow_root, args.no_rebuild_index,
+                   args.jobs, args.compression)
 
 
 def installtarball(args):
     """install from a binary package"""
+    _check_jobs(args)
     if not args.specs:
         tty.die("build cache file installation requires" +
                 " at least one package spec argument")
@@ -457,8 +480,53 @@ def installtarball(args):
     matches = match_downloaded_specs(pkgs, args.multiple, args.force,
                                      args.otherarch)
 
+    # A single spec is installed as it always was, with its dependencies
+    # one at a time, unless more jobs are requested
+    jobs = args.jobs
+    if jobs is None:
+        jobs = multiprocessing.cpu_count() if len(matches) > 1 else 1
+    if jobs <= 1:
+        for match in matches:
+            install_tarball(match, args)
+        return
+
+    # Collect the specs to install, dependencies first, like
+    # install_tarball() would install them
+    specs, visited = [], set()
+
+    def collect(spec):
+        if spec.dag_hash() in visited:
+            return
+        visited.add(spec.dag_hash())
+        if spec.external or spec.virtual:
+            tty.warn("Skipping external or virtual package %s" %
+                     spec.format())
+            return
+        for d in spec.dependencies(deptype=('link', 'run')):
+            collect(d)
+        if spec.package.installed and not args.force:
+            tty.warn("Package for spec %s already installed." %
+                     spec.format())
+        else:
+            specs.append(spec)
+
     for match in matches:
-        install_tarball(match, args)
+        collect(match)
+
+    failed = 0
+    for spec, error in bindist.extract_tarballs(
+            specs, args.allow_root, args.unsigned, args.force, jobs):
+        if error:
+            tty.error('Could not install buildcache for spec %s: %s' %
+                      (spec.format(), error))
+            failed += 1
+        else:
+            tty.msg('Installed buildcache for spec %s' % spec.format())
+            spack.hooks.post_install(spec)
+            spack.store.db.add(spec, spack.store.layout)
+
+    if failed:
+        tty.die('Could not install buildcaches for %d specs' % failed)
 
 
 def install_tarball(spec, args):
@@ -261,6 +261,13 @@ def jobs():
         help='explicitly set number of parallel jobs')
 
 
+@arg
+def fetch_jobs():
+    return Args(
+        '--fetch-jobs', type=int, default=None, metavar='N',
+        help='download the sources of up to N packages at a time')
+
+
 @arg
 def install_status():
     return Args(
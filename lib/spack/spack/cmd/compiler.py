@@ -10,6 +10,7 @@
 from six import iteritems
 
 import llnl.util.tty as tty
+import spack.compiler
 import spack.compilers
 import spack.config
 import spack.spec
@@ -59,6 +60,15 @@ def setup_parser(subparser):
         default=spack.config.default_list_scope(),
         help="configuration scope to read from")
 
+    # Cache
+    cache_parser = sp.add_parser(
+        'cache', help='manage the cache of compiler versions and link paths')
+    cache_sp = cache_parser.add_subparsers(
+        metavar='CACHE_COMMAND', dest='cache_command')
+    cache_sp.add_parser(
+        'clear', help='remove all the cached compiler probing results')
+    setup_parser.cache_parser = cache_parser
+
     # Info
     info_parser = sp.add_parser('info', help='show compiler paths')
     info_parser.add_argument('compiler_spec')
@@ -184,11 +194,21 @@ def compiler_list(args):
         colify(reversed(sorted(c.spec for c in compilers)))
 
 
+def compiler_cache(args):
+    """Manage the cached results of probing compiler executables."""
+    if args.cache_command == 'clear':
+        spack.compiler.probe_cache.clear()
+        tty.msg('Cleared the compiler cache')
+    else:
+        setup_parser.cache_parser.print_help()
+
+
 def compiler(parser, args):
     action = {'add': compiler_find,
               'find': compiler_find,
               'remove': compiler_remove,
               'rm': compiler_remove,
               'info': compiler_info,
-              'list': compiler_list}
+              'list': compiler_list,
+              'cache': compiler_cache}
     action[args.compiler_command](args)
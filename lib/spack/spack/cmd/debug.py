@@ -16,6 +16,7 @@
 
 import spack.architecture as architecture
 import spack.paths
+import spack.util.lock
 from spack.main import get_version
 from spack.util.executable import which
 
@@ -30,6 +31,29 @@ def setup_parser(subparser):
                   help="create a tarball of Spack's installation metadata")
     sp.add_parser('report', help='print information useful for bug reports')
 
+    locks = sp.add_parser(
+        'locks', help='summarize the lock statistics of Spack processes')
+    locks.add_argument(
+        '-n', '--top', type=int, default=20,
+        help='number of locks to show (default 20, 0 for all)')
+    locks.add_argument(
+        '-s', '--sort', choices=sorted(_lock_sort_keys), default='wait',
+        help='order of the locks, hottest first (default wait)')
+    locks.add_argument(
+        'paths', nargs='*',
+        help='lock statistics files or directories '
+             '(default: config:lock_stats_dir)')
+
+
+#: Counters the locks can be sorted by in ``spack debug locks``
+_lock_sort_keys = {
+    'wait': lambda s: s.wait_time,
+    'max-wait': lambda s: s.max_wait_time,
+    'hold': lambda s: s.hold_time,
+    'acquisitions': lambda s: s.acquisitions,
+    'timeouts': lambda s: s.timeouts,
+}
+
 
 def _debug_tarball_suffix():
     now = datetime.now()
@@ -73,6 +97,8 @@ def create_db_tarball(args):
     wd = os.path.dirname(str(spack.store.root))
     with working_dir(wd):
         files = [spack.store.db._index_path]
+        if os.path.exists(spack.store.db._journal_path):
+            files.append(spack.store.db._journal_path)
         files += glob('%s/*/*/*/.spack/spec.yaml' % base)
         files = [os.path.relpath(f) for f in files]
 
@@ -91,9 +117,47 @@ def report(args):
         architecture.platform(), 'frontend', 'frontend'))
 
 
+def locks(args):
+    paths = args.paths
+    if not paths:
+        directory = spack.util.lock.lock_stats_dir()
+        if not directory:
+            tty.die('No lock statistics to read.',
+                    'Set config:lock_stats_dir to record them, or pass '
+                    'the files to read.')
+        paths = [directory]
+
+    nprocs, stats = spack.util.lock.read_lock_stats(paths)
+    if not stats:
+        tty.msg('No locks were taken by the {0} processes read.'
+                .format(nprocs))
+        return
+
+    key = _lock_sort_keys[args.sort]
+    hottest = sorted(stats.items(), key=lambda item: key(item[1]),
+                     reverse=True)
+    if args.top > 0:
+        hottest = hottest[:args.top]
+
+    tty.msg('Locks taken by {0} processes'.format(nprocs))
+    header = ('WAIT', 'MAX WAIT', 'HOLD', 'READS', 'WRITES', 'UPGRADES',
+              'TIMEOUTS', 'LOCK')
+    fmt = '{0:>10} {1:>10} {2:>10} {3:>7} {4:>7} {5:>8} {6:>8}  {7}'
+    print(fmt.format(*header))
+    for (path, start, length), s in hottest:
+        lock = '{0}[{1}:{2}]'.format(path, start, length)
+        if s.desc:
+            lock += ' ' + s.desc
+        print(fmt.format(
+            '%.3fs' % s.wait_time, '%.3fs' % s.max_wait_time,
+            '%.3fs' % s.hold_time, s.read_acquisitions,
+            s.write_acquisitions, s.upgrades, s.timeouts, lock))
+
+
 def debug(parser, args):
     action = {
         'create-db-tarball': create_db_tarball,
         'report': report,
+        'locks': locks,
     }
     action[args.debug_command](args)
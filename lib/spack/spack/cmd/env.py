@@ -288,12 +288,14 @@ def env_list(args):
 
 class ViewAction(object):
     regenerate = 'regenerate'
+    repair = 'repair'
     enable = 'enable'
     disable = 'disable'
 
     @staticmethod
     def actions():
-        return [ViewAction.regenerate, ViewAction.enable, ViewAction.disable]
+        return [ViewAction.regenerate, ViewAction.repair, ViewAction.enable,
+                ViewAction.disable]
 
 
 #
@@ -316,6 +318,8 @@ def env_view(args):
     if env:
         if args.action == ViewAction.regenerate:
             env.regenerate_views()
+        elif args.action == ViewAction.repair:
+            env.regenerate_views(repair=True)
         elif args.action == ViewAction.enable:
             if args.view_path:
                 view_path = args.view_path
@@ -8,6 +8,7 @@
 import spack.cmd
 import spack.cmd.common.arguments as arguments
 import spack.config
+import spack.fetch_pipeline
 import spack.repo
 
 description = "fetch archives for packages"
@@ -16,7 +17,7 @@
 
 
 def setup_parser(subparser):
-    arguments.add_common_arguments(subparser, ['no_checksum'])
+    arguments.add_common_arguments(subparser, ['no_checksum', 'fetch_jobs'])
     subparser.add_argument(
         '-m', '--missing', action='store_true',
         help="fetch only missing (not yet installed) dependencies")
@@ -33,6 +34,11 @@ def fetch(parser, args):
     if args.no_checksum:
         spack.config.set('config:checksum', False, scope='command_line')
 
+    if args.fetch_jobs is not None:
+        spack.config.set('config:fetch_jobs', args.fetch_jobs,
+                         scope='command_line')
+
+    packages = []
     specs = spack.cmd.parse_specs(args.specs, concretize=True)
     for spec in specs:
         if args.missing or args.dependencies:
@@ -47,7 +53,12 @@ def fetch(parser, args):
                 if package.spec.external:
                     continue
 
-                package.do_fetch()
+                packages.append(package)
+
+        packages.append(spack.repo.get(spec))
 
-        package = spack.repo.get(spec)
+    # Download as many sources as possible concurrently up front: fetching
+    # each package below then only needs the patches and what is left
+    spack.fetch_pipeline.fetch_packages(packages)
+    for package in packages:
         package.do_fetch()
@@ -44,6 +44,7 @@ def update_kwargs_from_args(args, kwargs):
         'explicit': True,  # Always true for install command
         'stop_at': args.until,
         'unsigned': args.unsigned,
+        'concurrent_builds': args.concurrent_builds,
     })
 
     kwargs.update({
@@ -75,6 +76,9 @@ def setup_parser(subparser):
         '-u', '--until', type=str, dest='until', default=None,
         help="phase to stop after when installing (default None)")
     arguments.add_common_arguments(subparser, ['jobs'])
+    subparser.add_argument(
+        '--concurrent-builds', type=int, default=1, metavar='N',
+        help="build up to N packages at a time (sharing the build jobs)")
     subparser.add_argument(
         '--overwrite', action='store_true',
         help="reinstall an existing spec, even if it has dependents")
@@ -109,7 +113,7 @@ def setup_parser(subparser):
     subparser.add_argument(
         '--source', action='store_true', dest='install_source',
         help="install source files in prefix")
-    arguments.add_common_arguments(subparser, ['no_checksum'])
+    arguments.add_common_arguments(subparser, ['no_checksum', 'fetch_jobs'])
     subparser.add_argument(
         '-v', '--verbose', action='store_true',
         help="display verbose build output while installing")
@@ -263,6 +267,10 @@ def install(parser, args, **kwargs):
         parser.print_help()
         return
 
+    if args.fetch_jobs is not None:
+        spack.config.set('config:fetch_jobs', args.fetch_jobs,
+                         scope='command_line')
+
     if not args.spec and not args.specfiles:
         # if there are no args but an active environment or spack.yaml file
         # then install the packages from it.
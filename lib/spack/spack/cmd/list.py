@@ -85,9 +85,9 @@ def match(p, f):
                 if f.match(p):
                     return True
 
-                pkg = spack.repo.get(p)
-                if pkg.__doc__:
-                    return f.match(pkg.__doc__)
+                pkg = spack.repo.path.package_metadata(p)
+                if pkg.description:
+                    return f.match(pkg.description)
                 return False
         else:
             def match(p, f):
@@ -134,7 +134,7 @@ def get_dependencies(pkg):
 @formatter
 def version_json(pkg_names, out):
     """Print all packages with their latest versions."""
-    pkgs = [spack.repo.get(name) for name in pkg_names]
+    pkgs = [spack.repo.path.package_metadata(name) for name in pkg_names]
 
     out.write('[\n')
 
@@ -173,7 +173,7 @@ def html(pkg_names, out):
     """
 
     # Read in all packages
-    pkgs = [spack.repo.get(name) for name in pkg_names]
+    pkgs = [spack.repo.path.package_metadata(name) for name in pkg_names]
 
     # Start at 2 because the title of the page from Sphinx is id1.
     span_id = 2
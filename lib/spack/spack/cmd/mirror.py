@@ -56,7 +56,7 @@ def setup_parser(subparser):
         '-n', '--versions-per-spec',
         help="the number of versions to fetch for each spec, choose 'all' to"
              " retrieve all versions of each package")
-    arguments.add_common_arguments(create_parser, ['specs'])
+    arguments.add_common_arguments(create_parser, ['fetch_jobs', 'specs'])
 
     # used to construct scope arguments below
     scopes = spack.config.scopes()
@@ -312,7 +312,8 @@ def mirror_create(args):
 
     # Actually do the work to create the mirror
     present, mirrored, error = spack.mirror.create(
-        directory, mirror_specs, args.skip_unstable_versions)
+        directory, mirror_specs, args.skip_unstable_versions,
+        jobs=args.fetch_jobs)
     p, m, e = len(present), len(mirrored), len(error)
 
     verb = "updated" if existed else "created"
@@ -38,6 +38,11 @@ def setup_parser(subparser):
         help='generate modules for packages installed upstream',
         action='store_true'
     )
+    refresh_parser.add_argument(
+        '-j', '--jobs', type=int, default=None, metavar='N',
+        help='render module files with up to N processes '
+             '(default: one per CPU)'
+    )
     arguments.add_common_arguments(
         refresh_parser, ['constraint', 'yes_to_all']
     )
@@ -239,6 +244,9 @@ def refresh(module_type, specs, args):
     """Regenerates the module files for every spec in specs and every module
     type in module types.
     """
+    if args.jobs is not None and args.jobs < 1:
+        tty.die('invalid value for argument "--jobs" '
+                '[expected a positive integer, got "{0}"]'.format(args.jobs))
 
     # Prompt a message to the user about what is going to change
     if not specs:
@@ -298,14 +306,15 @@ def refresh(module_type, specs, args):
     if os.path.isdir(module_type_root) and args.delete_tree:
         shutil.rmtree(module_type_root, ignore_errors=False)
     filesystem.mkdirp(module_type_root)
-    for x in writers:
-        try:
-            x.write(overwrite=True)
-        except Exception as e:
-            tty.debug(e)
-            msg = 'Could not write module file [{0}]'
-            tty.warn(msg.format(x.layout.filename))
-            tty.warn('\t--> {0} <--'.format(str(e)))
+    written, unchanged, errors = spack.modules.common.write_module_files(
+        writers, jobs=args.jobs)
+    for x, error in errors:
+        msg = 'Could not write module file [{0}]'
+        tty.warn(msg.format(x.layout.filename))
+        tty.warn('\t--> {0} <--'.format(error))
+    if unchanged:
+        tty.msg('{0} module files were already up to date'.format(
+            len(unchanged)))
 
 
 #: Dictionary populated with the list of sub-commands.
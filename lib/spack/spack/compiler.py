@@ -3,12 +3,14 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
+import hashlib
 import os
 import platform
 import re
 import itertools
 import shutil
 import tempfile
+import threading
 
 import llnl.util.lang
 from llnl.util.filesystem import (
@@ -20,6 +22,7 @@
 import spack.architecture
 import spack.util.executable
 import spack.util.module_cmd
+import spack.util.spack_json as sjson
 import spack.compilers
 from spack.util.environment import filter_system_paths
 
@@ -32,18 +35,121 @@ def _verify_executables(*paths):
             raise CompilerAccessError(path)
 
 
+class CompilerProbeCache(object):
+    """Results of probing compiler executables, stored in the misc cache.
+
+    Results are stored by executable path and probe name (e.g., the
+    argument passed to the compiler), along with the mtime, size and inode
+    of the executable.  They are discarded once the executable changes.
+    """
+
+    def __init__(self, cache_key='compilers/probes.json', cache=None):
+        self.cache_key = cache_key
+        # File cache the results are stored in (default: the misc cache)
+        self.cache = cache
+        # Probes run concurrently when detecting compilers, and the file
+        # cache locks are not meant to be shared among threads
+        self._lock = threading.Lock()
+        self._entries = None
+
+    @staticmethod
+    def _fingerprint(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return [st.st_mtime, st.st_size, st.st_ino]
+
+    def _misc_cache(self):
+        if self.cache is not None:
+            return self.cache
+        import spack.caches  # avoid circular import
+        return spack.caches.misc_cache
+
+    def _read(self, cache):
+        if not cache.init_entry(self.cache_key):
+            return {}
+        with cache.read_transaction(self.cache_key) as f:
+            try:
+                entries = sjson.load(f)
+            except ValueError:
+                entries = None
+        return entries if isinstance(entries, dict) else {}
+
+    def get(self, path, probe):
+        """Return the cached result of a probe of the executable at
+        ``path``, or None if there is none for its current version."""
+        fingerprint = self._fingerprint(path)
+        if fingerprint is None:
+            return None
+
+        with self._lock:
+            if self._entries is None:
+                self._entries = self._read(self._misc_cache())
+            entry = self._entries.get(path)
+
+        if entry is None or entry['fingerprint'] != fingerprint:
+            return None
+        return entry['probes'].get(probe)
+
+    def set(self, path, probe, result):
+        """Store the result of a probe of the executable at ``path``."""
+        fingerprint = self._fingerprint(path)
+        if fingerprint is None:
+            return
+
+        cache = self._misc_cache()
+        with self._lock:
+            cache.init_entry(self.cache_key)
+            with cache.write_transaction(self.cache_key) as (old, new):
+                # Merge with what other processes may have stored meanwhile
+                entries = {}
+                if old:
+                    try:
+                        entries = sjson.load(old)
+                    except ValueError:
+                        pass
+
+                entry = entries.get(path)
+                if entry is None or entry['fingerprint'] != fingerprint:
+                    entry = {'fingerprint': fingerprint, 'probes': {}}
+                    entries[path] = entry
+                entry['probes'][probe] = result
+                sjson.dump(entries, new)
+            self._entries = entries
+
+    def clear(self):
+        """Remove all the cached results."""
+        cache = self._misc_cache()
+        with self._lock:
+            cache.init_entry(self.cache_key)
+            with cache.write_transaction(self.cache_key) as (old, new):
+                sjson.dump({}, new)
+            self._entries = {}
+
+
+#: Cache of the results of probing compiler executables
+probe_cache = CompilerProbeCache()
+
+
 @llnl.util.lang.memoized
 def get_compiler_version_output(compiler_path, version_arg, ignore_errors=()):
     """Invokes the compiler at a given path passing a single
     version argument and returns the output.
 
+    The output is cached until the compiler executable changes.
+
     Args:
         compiler_path (path): path of the compiler to be invoked
         version_arg (str): the argument used to extract version information
     """
-    compiler = spack.util.executable.Executable(compiler_path)
-    output = compiler(
-        version_arg, output=str, error=str, ignore_errors=ignore_errors)
+    probe = 'version {0}'.format(version_arg)
+    output = probe_cache.get(compiler_path, probe)
+    if output is None:
+        compiler = spack.util.executable.Executable(compiler_path)
+        output = compiler(
+            version_arg, output=str, error=str, ignore_errors=ignore_errors)
+        probe_cache.set(compiler_path, probe, output)
     return output
 
 
@@ -299,7 +405,8 @@ def implicit_rpaths(self):
 
         exe_paths = [
             x for x in [self.cc, self.cxx, self.fc, self.f77] if x]
-        link_dirs = self._get_compiler_link_paths(exe_paths)
+        link_dirs = self._get_compiler_link_paths(
+            exe_paths, self._probe_context())
 
         all_required_libs = (
             list(self.required_libs) + Compiler._all_compiler_rpath_libraries)
@@ -313,8 +420,19 @@ def required_libs(self):
         # By default every compiler returns the empty list
         return []
 
+    def _probe_context(self):
+        """Key of the modules and environment of the compiler, which the
+        results of probing its executables depend on (e.g., the Cray
+        compiler wrappers are the same for all the PrgEnv modules).
+        """
+        if not self.modules and not self.environment:
+            return None
+        context = sjson.dump(
+            {'modules': self.modules, 'environment': self.environment})
+        return hashlib.sha1(context.encode('utf-8')).hexdigest()
+
     @classmethod
-    def _get_compiler_link_paths(cls, paths):
+    def _get_compiler_link_paths(cls, paths, context=None):
         first_compiler = next((c for c in paths if c), None)
         if not first_compiler:
             return []
@@ -323,6 +441,13 @@ def _get_compiler_link_paths(cls, paths):
             # are used by the compiler
             return []
 
+        probe = 'link_dirs {0}'.format(cls.verbose_flag())
+        if context:
+            probe += ' {0}'.format(context)
+        link_dirs = probe_cache.get(first_compiler, probe)
+        if link_dirs is not None:
+            return link_dirs
+
         try:
             tmpdir = tempfile.mkdtemp(prefix='spack-implicit-link-info')
             fout = os.path.join(tmpdir, 'output')
@@ -336,7 +461,9 @@ def _get_compiler_link_paths(cls, paths):
             output = str(compiler_exe(cls.verbose_flag(), fin, '-o', fout,
                                       output=str, error=str))  # str for py2
 
-            return _parse_non_system_link_dirs(output)
+            link_dirs = _parse_non_system_link_dirs(output)
+            probe_cache.set(first_compiler, probe, link_dirs)
+            return link_dirs
         except spack.util.executable.ProcessError as pe:
             tty.debug('ProcessError: Command exited with non-zero status: ' +
                       pe.long_message)
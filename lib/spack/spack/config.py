@@ -30,13 +30,19 @@
 
 """
 
+import collections
 import copy
+import hashlib
+import json
 import os
 import re
 import sys
+import tempfile
+import time
 import multiprocessing
 from contextlib import contextmanager
 from six import iteritems
+from six.moves import cPickle
 from ordereddict_backport import OrderedDict
 
 import ruamel.yaml as yaml
@@ -113,6 +119,13 @@
 #: Base name for the (internal) overrides scope.
 overrides_base_name = 'overrides-'
 
+#: Directory where the data of configuration files is stored once parsed
+#: and validated, so that unchanged files are not read again. This is the
+#: default location of the misc cache, which cannot be used as its location
+#: is itself configurable. Set to None to always read configuration files.
+config_cache_path = os.path.join(
+    spack.paths.user_config_path, 'cache', 'config')
+
 
 def first_existing(dictionary, keys):
     """Get the value of the first key in keys that is in the dictionary."""
@@ -342,6 +355,17 @@ def __init__(self, *scopes):
 
         """
         self.scopes = OrderedDict()
+
+        #: Merged sections returned by ``get_config()``, keyed by section
+        #: and scope name (None for all the scopes), with the scopes they
+        #: were merged from
+        self._merged_sections = {}
+
+        #: Number of calls to ``get_config()`` answered from the cache of
+        #: merged sections, and of calls that merged a section, by section
+        self.cache_hits = collections.defaultdict(int)
+        self.cache_misses = collections.defaultdict(int)
+
         for scope in scopes:
             self.push_scope(scope)
 
@@ -358,14 +382,36 @@ def push_scope(self, scope):
         self.scopes[scope.name] = scope
         if cmd_line_scope:
             self.scopes['command_line'] = cmd_line_scope
+        self._clear_merged_sections(scope=scope.name)
 
     def pop_scope(self):
         """Remove the highest precedence scope and return it."""
         name, scope = self.scopes.popitem(last=True)
+        self._clear_merged_sections(scope=name)
         return scope
 
     def remove_scope(self, scope_name):
-        return self.scopes.pop(scope_name)
+        scope = self.scopes.pop(scope_name)
+        self._clear_merged_sections(scope=scope_name)
+        return scope
+
+    def _clear_merged_sections(self, section=None, scope=None):
+        """Remove merged sections from the cache of ``get_config()``.
+
+        Args:
+            section (str or None): section to be removed, or None for all
+                the sections
+            scope (str or None): name of the scope whose data changed, or
+                None for all the scopes. Sections merged from all the
+                scopes are always removed.
+        """
+        for key in list(self._merged_sections):
+            key_section, key_scope = key
+            if section is not None and key_section != section:
+                continue
+            if scope is not None and key_scope not in (None, scope):
+                continue
+            del self._merged_sections[key]
 
     @property
     def file_scopes(self):
@@ -421,6 +467,7 @@ def clear_caches(self):
         This will cause files to be re-read upon the next request."""
         for scope in self.scopes.values():
             scope.clear()
+        self._clear_merged_sections()
 
     def update_config(self, section, update_data, scope=None):
         """Update the configuration file for a particular scope.
@@ -437,6 +484,7 @@ def update_config(self, section, update_data, scope=None):
 
         # read only the requested section's data.
         scope.sections[section] = {section: update_data}
+        self._clear_merged_sections(section, scope.name)
         scope.write_section(section)
 
     def get_config(self, section, scope=None):
@@ -462,14 +510,40 @@ def get_config(self, section, scope=None):
              }
            }
 
+        Merged sections are cached until the scopes they come from, or the
+        data of the section in those scopes, are modified or replaced, so
+        only the first two levels of the section returned are copies:
+        deeper values must not be modified.
         """
         _validate_section_name(section)
 
         if scope is None:
             scopes = self.scopes.values()
         else:
-            scopes = [self._validate_scope(scope)]
+            scope = self._validate_scope(scope).name
+            scopes = [self.scopes[scope]]
+
+        # scopes may be replaced in self.scopes, and their data replaced or
+        # cleared, so the cached sections are checked against the scopes
+        # and the data they were merged from
+        key = (section, scope)
+        cached_sources, data = self._merged_sections.get(key, ((), None))
+        sources = _section_sources(section, scopes)
+        if len(cached_sources) == len(sources) and all(
+                x is y for x, y in zip(cached_sources, sources)):
+            self.cache_hits[section] += 1
+        else:
+            self.cache_misses[section] += 1
+            data = self._merge_section(section, scopes)
 
+            # scopes that did not keep the data they read are read again
+            sources = _section_sources(section, scopes)
+            if not any(x is _missing_section for x in sources):
+                self._merged_sections[key] = (sources, data)
+        return _copy_section(data)
+
+    def _merge_section(self, section, scopes):
+        """Merge the data of a section in a list of scopes."""
         merged_section = syaml.syaml_dict()
         for scope in scopes:
             # read potentially cached data from the scope.
@@ -724,12 +798,25 @@ def _read_config_file(filename, schema):
         raise ConfigFileError("Config file is not readable: %s" % filename)
 
     try:
+        # Data is cached for a given version of the file and of the schema
+        sinfo = os.stat(filename)
+        signature = (sinfo.st_mtime, sinfo.st_size, _schema_hash(schema),
+                     str(spack.spack_version))
+        cached = _read_cached_config(filename, signature)
+        if cached is not None:
+            return cached[0]
+
         tty.debug("Reading config file %s" % filename)
         with open(filename) as f:
             data = syaml.load_config(f)
 
         if data:
             validate(data, schema)
+
+        # The file could be modified again without a change of its mtime,
+        # within the resolution of the filesystem
+        if time.time() - sinfo.st_mtime > 2:
+            _write_cached_config(filename, signature, data)
         return data
 
     except MarkedYAMLError as e:
@@ -741,6 +828,83 @@ def _read_config_file(filename, schema):
             "Error reading configuration file %s: %s" % (filename, str(e)))
 
 
+#: Hashes of the schemas used to validate configuration files, by id
+_schema_hashes = {}
+
+
+def _schema_hash(schema):
+    """Hash of a schema, to invalidate cached data when it changes."""
+    if id(schema) not in _schema_hashes:
+        text = json.dumps(schema, sort_keys=True, default=str)
+        _schema_hashes[id(schema)] = hashlib.sha1(
+            text.encode('utf-8')).hexdigest()
+    return _schema_hashes[id(schema)]
+
+
+def _config_cache_file(filename):
+    """Path of the cached data of a configuration file."""
+    # pickles are not exchanged between python 2 and 3
+    name = '{0}-py{1}.pickle'.format(
+        hashlib.sha1(os.path.abspath(filename).encode('utf-8')).hexdigest(),
+        sys.version_info[0])
+    return os.path.join(config_cache_path, name)
+
+
+def _read_cached_config(filename, signature):
+    """Read the data of a configuration file from the cache.
+
+    Args:
+        filename (str): path of the configuration file
+        signature (tuple): properties of the file and of its schema that
+            the cached data must match
+
+    Returns:
+        (tuple or None) a tuple with the data of the file, or None if it
+            is not cached
+    """
+    if not config_cache_path:
+        return None
+
+    cache_file = _config_cache_file(filename)
+    try:
+        with open(cache_file, 'rb') as f:
+            cached_signature, data = cPickle.load(f)
+    except (IOError, OSError):
+        return None
+    except Exception as e:
+        # corrupt entry, or written by an incompatible version of Spack
+        tty.debug('Ignoring cached configuration {0}: {1}'.format(
+            cache_file, str(e)))
+        return None
+
+    if cached_signature != signature:
+        return None
+    return (data,)
+
+
+def _write_cached_config(filename, signature, data):
+    """Store the validated data of a configuration file in the cache."""
+    if not config_cache_path:
+        return
+
+    # Entries are replaced atomically, and read without locks (locks are
+    # themselves configurable)
+    cache_file = _config_cache_file(filename)
+    try:
+        mkdirp(config_cache_path)
+        fd, tmp = tempfile.mkstemp(dir=config_cache_path, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                cPickle.dump((signature, data), f, 2)
+            os.rename(tmp, cache_file)
+        except BaseException:
+            os.remove(tmp)
+            raise
+    except (IOError, OSError, cPickle.PicklingError) as e:
+        tty.debug('Cannot cache configuration {0}: {1}'.format(
+            filename, str(e)))
+
+
 def _override(string):
     """Test if a spack YAML string is an override.
 
@@ -772,6 +936,30 @@ def _mark_internal(data, name):
     return d
 
 
+#: Placeholder for sections that a scope has not read
+_missing_section = object()
+
+
+def _section_sources(section, scopes):
+    """Scopes and the data of a section in each of them, which sections
+    merged from them are valid for."""
+    sources = []
+    for scope in scopes:
+        sources.append(scope)
+        sources.append(scope.sections.get(section, _missing_section))
+    return tuple(sources)
+
+
+def _copy_section(data):
+    """Copy of the first two levels of a configuration section."""
+    data = copy.copy(data)
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if isinstance(value, (dict, list)):
+                data[key] = copy.copy(value)
+    return data
+
+
 def _merge_yaml(dest, source):
     """Merges source into dest; entries in source take precedence over dest.
 
@@ -20,8 +20,11 @@
 filesystem.
 """
 
+import bisect
 import contextlib
 import datetime
+import functools
+import json
 import os
 import socket
 import sys
@@ -45,7 +48,7 @@
 from spack.error import SpackError
 from spack.filesystem_view import YamlFilesystemView
 from spack.util.crypto import bit_length
-from spack.version import Version
+from spack.version import Version, VersionList
 
 # TODO: Provide an API automatically retyring a build after detecting and
 # TODO: clearing a failure.
@@ -56,7 +59,7 @@
 # DB version.  This is stuck in the DB file to track changes in format.
 # Increment by one when the database format changes.
 # Versions before 5 were not integers.
-_db_version = Version('5')
+_db_version = Version('6')
 
 # For any version combinations here, skip reindex when upgrading.
 # Reindexing can take considerable time and is not always necessary.
@@ -66,7 +69,11 @@
     # only difference is that v5 can contain "deprecated_for"
     # fields.  So, skip the reindex for this transition. The new
     # version is saved to disk the first time the DB is written.
-    (Version('0.9.3'), Version('5')),
+    (Version('0.9.3'), Version('6')),
+    # v6 records installs and uninstalls in a journal next to the index,
+    # which older versions would ignore. Indexes of older versions have
+    # no journal, so they are read as they are.
+    (Version('5'), Version('6')),
 ]
 
 # Default timeout for spack database locks in seconds or None (no timeout).
@@ -86,12 +93,25 @@
 # Types of dependencies tracked by the database
 _tracked_deps = ('link', 'run')
 
+# The journal is compacted into a new snapshot of the index when it would
+# hold more entries than this fraction of the number of records.
+_journal_max_ratio = 0.5
+
 
 def _now():
     """Returns the time since the epoch"""
     return time.time()
 
 
+def _timestamp(date):
+    """Returns the time since the epoch of a local datetime, or None if it
+    cannot be represented as such"""
+    try:
+        return time.mktime(date.timetuple()) + date.microsecond / 1e6
+    except (OverflowError, ValueError):
+        return None
+
+
 def _autospec(function):
     """Decorator that automatically converts the argument of a single-arg
        function to a Spec."""
@@ -169,7 +189,7 @@ def __init__(
             installation_time=None,
             deprecated_for=None
     ):
-        self.spec = spec
+        self._spec = spec
         self.path = str(path) if path else None
         self.installed = bool(installed)
         self.ref_count = ref_count
@@ -177,6 +197,37 @@ def __init__(
         self.installation_time = installation_time or _now()
         self.deprecated_for = deprecated_for
 
+        # For records read lazily, the node dict of the spec and a function
+        # constructing the spec from it on first access
+        self._spec_dict = None
+        self._spec_loader = None
+
+    @property
+    def spec(self):
+        if self._spec is None and self._spec_loader is not None:
+            self._spec_loader(self)
+        return self._spec
+
+    @spec.setter
+    def spec(self, spec):
+        self._spec = spec
+        self._spec_dict = None
+        self._spec_loader = None
+
+    def node_summary(self):
+        """Return the name, concrete version and compiler name of the spec,
+        without constructing it for records read lazily."""
+        if self._spec is None and self._spec_dict is not None:
+            name = next(iter(self._spec_dict))
+            node = self._spec_dict[name]
+            version = Version(node['version']) if 'version' in node else None
+            compiler = node.get('compiler', {}).get('name')
+            return name, version, compiler
+
+        spec = self.spec
+        compiler = spec.compiler.name if spec.compiler else None
+        return spec.name, spec.versions.concrete, compiler
+
     def install_type_matches(self, installed):
         installed = InstallStatuses.canonicalize(installed)
         if self.installed:
@@ -187,8 +238,13 @@ def install_type_matches(self, installed):
             return InstallStatuses.MISSING in installed
 
     def to_dict(self):
+        if self._spec is None and self._spec_dict is not None:
+            spec_dict = self._spec_dict
+        else:
+            spec_dict = self.spec.to_node_dict()
+
         rec_dict = {
-            'spec': self.spec.to_node_dict(),
+            'spec': spec_dict,
             'path': self.path,
             'installed': self.installed,
             'ref_count': self.ref_count,
@@ -210,6 +266,169 @@ def from_dict(cls, spec, dictionary):
 
         return InstallRecord(spec, **d)
 
+    @classmethod
+    def lazy_from_dict(cls, dictionary, spec_loader):
+        """Create a record whose spec is constructed by calling
+        ``spec_loader`` with the record the first time it is accessed."""
+        record = cls.from_dict(None, dictionary)
+        record._spec_dict = dictionary['spec']
+        record._spec_loader = spec_loader
+        return record
+
+
+class InstallRecordIndex(object):
+    """Secondary indexes over the install records of a Database.
+
+    Queries for abstract specs use these to narrow down the records they
+    have to check with ``Spec.satisfies()``, which is by far the most
+    expensive part of a query on a large store.
+
+    Only immutable properties of the records are indexed, plus the
+    explicit flag, which must be updated through ``add()`` whenever it
+    changes.  All the indexes map to DAG hashes of records.
+
+    Attributes:
+        by_name (dict): package name to set of hashes
+        by_version (dict): version to set of hashes
+        by_compiler (dict): compiler name to set of hashes
+        explicit (set): hashes of explicitly installed specs
+        by_time (list): sorted (installation time, hash) tuples
+        hashes (list): sorted hashes
+    """
+
+    def __init__(self, records=None):
+        self.by_name = {}
+        self.by_version = {}
+        self.by_compiler = {}
+        self.explicit = set()
+        self.by_time = []
+        self.hashes = []
+
+        # Keep track of what was indexed for each hash, so that records
+        # can be re-added or removed even after they changed
+        self._indexed = {}
+
+        for key, rec in (records or {}).items():
+            self.add(key, rec)
+
+    def __len__(self):
+        return len(self._indexed)
+
+    def add(self, key, rec):
+        """Index a record, or update its entry if already indexed."""
+        if key in self._indexed:
+            self.remove(key)
+
+        name, version, compiler = rec.node_summary()
+        entry = (name, version, compiler, rec.installation_time)
+        self._indexed[key] = entry
+
+        self.by_name.setdefault(name, set()).add(key)
+        self.by_version.setdefault(version, set()).add(key)
+        self.by_compiler.setdefault(compiler, set()).add(key)
+        if rec.explicit:
+            self.explicit.add(key)
+        bisect.insort(self.by_time, (rec.installation_time, key))
+        bisect.insort(self.hashes, key)
+
+    def remove(self, key):
+        """Remove a record from the indexes, if present."""
+        entry = self._indexed.pop(key, None)
+        if entry is None:
+            return
+
+        name, version, compiler, installation_time = entry
+        for index, value in ((self.by_name, name),
+                             (self.by_version, version),
+                             (self.by_compiler, compiler)):
+            index[value].discard(key)
+            if not index[value]:
+                del index[value]
+        self.explicit.discard(key)
+
+        i = bisect.bisect_left(self.by_time, (installation_time, key))
+        del self.by_time[i]
+        del self.hashes[bisect.bisect_left(self.hashes, key)]
+
+    def hashes_with_prefix(self, prefix):
+        """Return the indexed hashes starting with a prefix."""
+        start = bisect.bisect_left(self.hashes, prefix)
+        end = start
+        while end < len(self.hashes) and \
+                self.hashes[end].startswith(prefix):
+            end += 1
+        return self.hashes[start:end]
+
+    def _matching_versions(self, versions):
+        keys = set()
+        for version, version_keys in self.by_version.items():
+            if version is None or VersionList([version]).satisfies(
+                    versions, strict=True):
+                keys.update(version_keys)
+        return keys
+
+    def _installed_between(self, start_time, end_time):
+        # Queries compare dates, not timestamps: leave some slack for the
+        # conversion, as the caller checks the actual dates anyway
+        lo, hi = 0, len(self.by_time)
+        if start_time is not None:
+            lo = bisect.bisect_left(self.by_time, (start_time - 1,))
+        if end_time is not None:
+            hi = bisect.bisect_left(self.by_time, (end_time + 1,))
+        return set(key for _, key in self.by_time[lo:hi])
+
+    def candidates(self, query_spec=any, explicit=any,
+                   start_time=None, end_time=None):
+        """Return the hashes of the records that may match a query.
+
+        The result is a superset of the actual matches: the caller is
+        still expected to check each candidate against the query.
+
+        Args:
+            query_spec (Spec or any): abstract spec queried for
+            explicit (bool or any): explicit flag queried for
+            start_time (float or None): earliest installation time
+            end_time (float or None): latest installation time
+
+        Returns:
+            (set or None) candidate hashes, or None if the query cannot
+                be narrowed down with the indexes
+        """
+        selections = []
+
+        # A concrete provider can satisfy a virtual spec, so only the
+        # specs of actual packages are narrowed down by name, version
+        # and compiler.
+        if query_spec is not any and not query_spec.virtual:
+            if query_spec.name:
+                selections.append(self.by_name.get(query_spec.name, set()))
+            elif query_spec.versions != VersionList([':']):
+                # With a name, the other indexes are faster to intersect
+                # than to compare each distinct version in the database
+                selections.append(
+                    self._matching_versions(query_spec.versions))
+
+            if query_spec.compiler:
+                selections.append(
+                    self.by_compiler.get(query_spec.compiler.name, set()))
+
+        if explicit is True:
+            selections.append(self.explicit)
+
+        if start_time is not None or end_time is not None:
+            selections.append(self._installed_between(start_time, end_time))
+
+        if not selections:
+            return None
+
+        selections.sort(key=len)
+        keys = set(selections[0])
+        for selection in selections[1:]:
+            keys &= selection
+        if explicit is False:
+            keys -= self.explicit
+        return keys
+
 
 class ForbiddenLockError(SpackError):
     """Raised when an upstream DB attempts to acquire a lock"""
@@ -301,6 +520,7 @@ def __init__(self, root, db_dir=None, upstream_dbs=None,
         # Set up layout of database files within the db dir
         self._index_path = os.path.join(self._db_dir, 'index.json')
         self._verifier_path = os.path.join(self._db_dir, 'index_verifier')
+        self._journal_path = os.path.join(self._db_dir, 'index.journal')
         self._lock_path = os.path.join(self._db_dir, 'lock')
 
         # This is for other classes to use to lock prefix directories.
@@ -344,6 +564,17 @@ def __init__(self, root, db_dir=None, upstream_dbs=None,
                                 default_timeout=self.db_lock_timeout,
                                 desc='database')
         self._data = {}
+        self._index = InstallRecordIndex()
+
+        # Id of the journal that applies to the snapshot of the index in
+        # memory, with the offset and number of entries replayed so far
+        self._journal_id = None
+        self._journal_offset = 0
+        self._journal_entries = 0
+
+        # Hashes of the records changed in the current write transaction,
+        # or None if the whole index has to be written
+        self._dirty = None
 
         self.upstream_dbs = list(upstream_dbs) if upstream_dbs else []
 
@@ -569,6 +800,8 @@ def _write_to_file(self, stream):
                 'version': str(_db_version)
             }
         }
+        if self._journal_id:
+            database['database']['journal'] = self._journal_id
 
         try:
             sjson.dump(database, stream)
@@ -612,6 +845,26 @@ def query_by_spec_hash(self, hash_key, data=None):
                 return True, db._data[hash_key]
         return False, None
 
+    def _check_dependencies(self, hash_key, installs, data):
+        # Ensure the dependencies of a record are in the database, without
+        # constructing any spec.
+        spec_dict = installs[hash_key]['spec']
+        name = next(iter(spec_dict))
+        yaml_deps = spec_dict[name].get('dependencies')
+        if not yaml_deps:
+            return
+
+        for dname, dhash, dtypes in spack.spec.Spec.read_yaml_dep_specs(
+                yaml_deps):
+            upstream, record = self.query_by_spec_hash(dhash, data=data)
+            if not record:
+                msg = ("Missing dependency not in database: "
+                       "%s/%s needs %s-%s" % (
+                           name, hash_key[:7], dname, dhash[:7]))
+                if self._fail_when_missing_deps:
+                    raise MissingDependenciesError(msg)
+                tty.warn(msg)
+
     def _assign_dependencies(self, hash_key, installs, data):
         # Add dependencies from other records in the install DB to
         # form a full spec.
@@ -698,48 +951,163 @@ def invalid_record(hash_key, error):
             msg %= (hash_key, type(error).__name__, str(error))
             raise CorruptDatabaseError(msg, self._index_path)
 
-        # Build up the database in three passes:
-        #
-        #   1. Read in all specs without dependencies.
-        #   2. Hook dependencies up among specs.
-        #   3. Mark all specs concrete.
-        #
-        # The database is built up so that ALL specs in it share nodes
-        # (i.e., its specs are a true Merkle DAG, unlike most specs.)
+        # Records are read lazily: the spec of a record is only constructed,
+        # along with the specs of its dependencies, when it is first
+        # accessed.  Specs are still shared among records, so that ALL specs
+        # in the database share nodes (i.e., its specs are a true Merkle DAG,
+        # unlike most specs.)
 
-        # Pass 1: Iterate through database and build specs w/o dependencies
+        # Pass 1: Iterate through database and create records without specs
         data = {}
         for hash_key, rec in installs.items():
             try:
-                # This constructs a spec DAG from the list of all installs
-                spec = self._read_spec_from_dict(hash_key, installs)
-
-                # Insert the brand new spec in the database.  Each
-                # spec has its own copies of its dependency specs.
-                # TODO: would a more immmutable spec implementation simplify
-                #       this?
-                data[hash_key] = InstallRecord.from_dict(spec, rec)
+                loader = functools.partial(self._load_spec, hash_key, data)
+                data[hash_key] = InstallRecord.lazy_from_dict(rec, loader)
             except Exception as e:
                 invalid_record(hash_key, e)
 
-        # Pass 2: Assign dependencies once all specs are created.
+        # Pass 2: Check that dependencies are known once all records exist.
         for hash_key in data:
             try:
-                self._assign_dependencies(hash_key, installs, data)
+                self._check_dependencies(hash_key, installs, data)
             except MissingDependenciesError:
                 raise
             except Exception as e:
                 invalid_record(hash_key, e)
 
-        # Pass 3: Mark all specs concrete.  Specs representing real
-        # installations must be explicitly marked.
-        # We do this *after* all dependencies are connected because if we
-        # do it *while* we're constructing specs,it causes hashes to be
-        # cached prematurely.
-        for hash_key, rec in data.items():
-            rec.spec._mark_concrete()
-
         self._data = data
+        self._index = InstallRecordIndex(data)
+
+        self._journal_id = db.get('journal')
+        self._journal_offset = 0
+        self._journal_entries = 0
+        self._dirty = set()
+
+    def _load_spec(self, hash_key, data, rec):
+        """Construct the spec of a record read lazily, and hook it up to
+        the specs of its dependencies in ``data``, constructing them as
+        needed.
+
+        Does not do any locking.
+        """
+
+        # Install records don't include hash with spec, which is added to
+        # a copy of the node dict to keep the record dict as read.
+        installs = {hash_key: {'spec': dict(
+            (name, dict(node)) for name, node in rec._spec_dict.items())}}
+        try:
+            spec = self._read_spec_from_dict(hash_key, installs)
+        except Exception as e:
+            msg = ("Invalid record in Spack database: "
+                   "hash: %s, cause: %s: %s")
+            msg %= (hash_key, type(e).__name__, str(e))
+            raise CorruptDatabaseError(msg, self._index_path)
+        rec.spec = spec
+
+        # Mark the spec concrete *after* its dependencies are connected,
+        # as doing it before causes hashes to be cached prematurely.
+        self._assign_dependencies(hash_key, installs, data)
+        spec._mark_concrete()
+
+    def _load_all_specs(self):
+        """Construct the specs of all the records read lazily.
+
+        Specs are only connected to the dependents that were constructed,
+        so this is needed before following dependents in the database.
+
+        Does not do any locking.
+        """
+        for rec in self._data.values():
+            rec.spec
+
+    def _replay_journal(self):
+        """Apply the changes appended to the journal since it was last read
+        to the records in memory.
+
+        Does not do any locking.
+
+        Returns:
+            (bool) False if the journal does not apply to the snapshot of the
+                index in memory, True otherwise
+        """
+        if not self._journal_id or not os.path.isfile(self._journal_path):
+            return False
+
+        with open(self._journal_path, 'rb') as f:
+            header = f.readline()
+            try:
+                journal_id = sjson.load(header.decode('utf-8')).get('journal')
+            except (ValueError, AttributeError):
+                return False
+            if journal_id != self._journal_id:
+                return False
+
+            offset = max(self._journal_offset, len(header))
+            f.seek(0, os.SEEK_END)
+            if f.tell() < offset:
+                return False
+            f.seek(offset)
+            data = f.read()
+
+        # Ignore an incomplete last entry, left by an interrupted write
+        end = data.rfind(b'\n') + 1
+        try:
+            entries = [sjson.load(line.decode('utf-8'))
+                       for line in data[:end].splitlines()]
+        except ValueError as e:
+            raise CorruptDatabaseError(
+                "error parsing database journal:", str(e))
+
+        self._apply_journal_entries(entries)
+        self._journal_offset = offset + end
+        self._journal_entries += len(entries)
+        return True
+
+    def _apply_journal_entries(self, entries):
+        """Update the records in memory with entries of the journal.
+
+        Each entry holds the new install record for a hash, or None if the
+        record was removed.
+
+        Does not do any locking.
+        """
+        for entry in entries:
+            hash_key, rec_dict = entry['hash'], entry['record']
+            rec = self._data.get(hash_key)
+            try:
+                if rec_dict is None:
+                    if rec is None:
+                        continue
+                    del self._data[hash_key]
+                    self._index.remove(hash_key)
+                    # Specs not constructed yet have no dependents
+                    if rec._spec is None:
+                        continue
+                    for dep in rec.spec.dependencies(_tracked_deps):
+                        if dep._dependents.get(rec.spec.name):
+                            del dep._dependents[rec.spec.name]
+                    continue
+
+                if rec is None:
+                    loader = functools.partial(
+                        self._load_spec, hash_key, self._data)
+                    rec = InstallRecord.lazy_from_dict(rec_dict, loader)
+                    self._data[hash_key] = rec
+                else:
+                    # Update in place, records may be referenced elsewhere
+                    updated = InstallRecord.from_dict(None, rec_dict)
+                    rec.path = updated.path
+                    rec.installed = updated.installed
+                    rec.ref_count = updated.ref_count
+                    rec.explicit = updated.explicit
+                    rec.installation_time = updated.installation_time
+                    rec.deprecated_for = updated.deprecated_for
+                self._index.add(hash_key, rec)
+            except Exception as e:
+                raise CorruptDatabaseError(
+                    "Invalid entry in Spack database journal: hash: %s, "
+                    "cause: %s: %s" % (hash_key, type(e).__name__, str(e)),
+                    self._journal_path)
 
     def reindex(self, directory_layout):
         """Build database index from scratch based on a directory layout.
@@ -759,6 +1127,7 @@ def _read_suppress_error():
             except CorruptDatabaseError as e:
                 self._error = e
                 self._data = {}
+                self._index = InstallRecordIndex()
 
         transaction = lk.WriteTransaction(
             self.lock, acquire=_read_suppress_error, release=self._write
@@ -779,6 +1148,7 @@ def _read_suppress_error():
             except BaseException:
                 # If anything explodes, restore old data, skip write.
                 self._data = old_data
+                self._index = InstallRecordIndex(old_data)
                 raise
 
     def _construct_entry_from_directory_layout(self, directory_layout,
@@ -815,6 +1185,8 @@ def _construct_from_directory_layout(self, directory_layout, old_data):
         with directory_layout.disable_upstream_check():
             # Initialize data in the reconstructed DB
             self._data = {}
+            self._index = InstallRecordIndex()
+            self._dirty = None
 
             # Start inspecting the installed prefixes
             processed_specs = set()
@@ -899,7 +1271,7 @@ def _check_ref_counts(self):
                     (key, found, expected, self._index_path))
 
     def _write(self, type, value, traceback):
-        """Write the in-memory database index to its file path.
+        """Write the changes to the in-memory database to its file path.
 
         This is a helper function called by the WriteTransaction context
         manager. If there is an exception while the write lock is active,
@@ -907,32 +1279,104 @@ def _write(self, type, value, traceback):
         database *may* be left in an inconsistent state.  It will be consistent
         after the start of the next transaction, when it read from disk again.
 
+        The records changed by the transaction are appended to the journal
+        of the index, unless the whole index has to be written or the
+        journal is due for compaction.
+
         This routine does no locking.
         """
         # Do not write if exceptions were raised
         if type is not None:
+            # Force reading from disk at the start of the next transaction
+            self.last_seen_verifier = ''
+            return
+
+        if self._can_append_to_journal():
+            self._append_to_journal()
+        else:
+            self._write_snapshot()
+        self._dirty = set()
+
+    def _can_append_to_journal(self):
+        if not _use_uuid or self._dirty is None or not self._journal_id:
+            return False
+        if not os.path.isfile(self._journal_path):
+            return False
+
+        max_entries = len(self._data) * _journal_max_ratio
+        return self._journal_entries + len(self._dirty) <= max_entries
+
+    def _append_to_journal(self):
+        """Append the records changed by the current write transaction to
+        the journal of the index."""
+        if not self._dirty:
             return
 
-        temp_file = self._index_path + (
-            '.%s.%s.temp' % (socket.getfqdn(), os.getpid()))
+        lines = []
+        for hash_key in sorted(self._dirty):
+            rec = self._data.get(hash_key)
+            entry = {
+                'hash': hash_key,
+                'record': rec.to_dict() if rec else None
+            }
+            lines.append(json.dumps(entry, separators=(',', ':')) + '\n')
+        data = ''.join(lines).encode('utf-8')
+
+        # Overwrite any incomplete entry left by an interrupted write
+        with open(self._journal_path, 'rb+') as f:
+            f.seek(self._journal_offset)
+            f.truncate()
+            f.write(data)
+        self._journal_offset += len(data)
+        self._journal_entries += len(lines)
+
+        self._write_verifier('%s %s' % (self._journal_id, uuid.uuid4()))
+
+    def _write_snapshot(self):
+        """Write the whole in-memory database index to its file path,
+        starting a new, empty journal."""
+        self._journal_id = str(uuid.uuid4()) if _use_uuid else None
+        header = ''
+        if self._journal_id:
+            header = json.dumps({'journal': self._journal_id}) + '\n'
+
+        temp_suffix = '.%s.%s.temp' % (socket.getfqdn(), os.getpid())
+        temp_file = self._index_path + temp_suffix
+        temp_journal = self._journal_path + temp_suffix
 
         # Write a temporary database file them move it into place
         try:
             with open(temp_file, 'w') as f:
                 self._write_to_file(f)
             os.rename(temp_file, self._index_path)
-            if _use_uuid:
-                with open(self._verifier_path, 'w') as f:
-                    new_verifier = str(uuid.uuid4())
-                    f.write(new_verifier)
-                    self.last_seen_verifier = new_verifier
+            if self._journal_id:
+                with open(temp_journal, 'w') as f:
+                    f.write(header)
+                os.rename(temp_journal, self._journal_path)
+                self._write_verifier(self._journal_id)
         except BaseException as e:
             tty.debug(e)
-            # Clean up temp file if something goes wrong.
-            if os.path.exists(temp_file):
-                os.remove(temp_file)
+            # Clean up temp files if something goes wrong.
+            for path in (temp_file, temp_journal):
+                if os.path.exists(path):
+                    os.remove(path)
+            self.last_seen_verifier = ''
             raise
 
+        self._journal_offset = len(header)
+        self._journal_entries = 0
+
+    def _mark_changed(self, hash_key):
+        """Record that the install record for a hash changed, and has to
+        be written at the end of the current transaction."""
+        if self._dirty is not None:
+            self._dirty.add(hash_key)
+
+    def _write_verifier(self, new_verifier):
+        with open(self._verifier_path, 'w') as f:
+            f.write(new_verifier)
+        self.last_seen_verifier = new_verifier
+
     def _read(self):
         """Re-read Database from the data in the set location.
 
@@ -950,9 +1394,15 @@ def _read(self):
                     pass
             if ((current_verifier != self.last_seen_verifier) or
                     (current_verifier == '')):
+                # If only the journal changed since the last read, replay
+                # the new entries. Otherwise read from file.
+                journal_id = current_verifier.split(' ')[0]
+                replay = (self.last_seen_verifier and
+                          journal_id == self._journal_id)
                 self.last_seen_verifier = current_verifier
-                # Read from file if a database exists
-                self._read_from_file(self._index_path)
+                if not (replay and self._replay_journal()):
+                    self._read_from_file(self._index_path)
+                    self._replay_journal()
             return
         elif self.is_upstream:
             raise UpstreamDatabaseLockingError(
@@ -962,6 +1412,7 @@ def _read(self):
         # The file doesn't exist, try to traverse the directory.
         # reindex() takes its own write lock, so no lock here.
         with lk.WriteTransaction(self.lock):
+            self._dirty = None
             self._write(None, None, None)
         self.reindex(spack.store.layout)
 
@@ -1051,6 +1502,7 @@ def _add(
                 new_spec._add_dependency(record.spec, dep.deptypes)
                 if not upstream:
                     record.ref_count += 1
+                    self._mark_changed(dkey)
 
             # Mark concrete once everything is built, and preserve
             # the original hash of concrete specs.
@@ -1062,6 +1514,8 @@ def _add(
             self._data[key].installed = True
 
         self._data[key].explicit = explicit
+        self._index.add(key, self._data[key])
+        self._mark_changed(key)
 
     @_autospec
     def add(self, spec, directory_layout, explicit=False):
@@ -1102,9 +1556,11 @@ def _decrement_ref_count(self, spec):
 
         rec = self._data[key]
         rec.ref_count -= 1
+        self._mark_changed(key)
 
         if rec.ref_count == 0 and not rec.installed:
             del self._data[key]
+            self._index.remove(key)
             for dep in spec.dependencies(_tracked_deps):
                 self._decrement_ref_count(dep)
 
@@ -1116,17 +1572,20 @@ def _increment_ref_count(self, spec):
 
         rec = self._data[key]
         rec.ref_count += 1
+        self._mark_changed(key)
 
     def _remove(self, spec):
         """Non-locking version of remove(); does real work."""
         key = self._get_matching_spec_key(spec)
         rec = self._data[key]
+        self._mark_changed(key)
 
         if rec.ref_count > 0:
             rec.installed = False
             return rec.spec
 
         del self._data[key]
+        self._index.remove(key)
         for dep in rec.spec.dependencies(_tracked_deps):
             # FIXME: the two lines below needs to be updated once #11983 is
             # FIXME: fixed. The "if" statement should be deleted and specs are
@@ -1160,6 +1619,21 @@ def remove(self, spec):
         with self.write_transaction():
             return self._remove(spec)
 
+    def update_explicit(self, spec, explicit):
+        """Update the explicit flag of an installed spec.
+
+        Args:
+            spec (Spec): concrete spec already in the database
+            explicit (bool): whether the spec was explicitly installed
+        """
+        key = spec.dag_hash()
+        with self.write_transaction():
+            rec = self._data[key]
+            if explicit != rec.explicit:
+                rec.explicit = explicit
+                self._index.add(key, rec)
+                self._mark_changed(key)
+
     def deprecator(self, spec):
         """Return the spec that the given spec is deprecated for, or None"""
         with self.read_transaction():
@@ -1193,6 +1667,7 @@ def _deprecate(self, spec, deprecator):
         spec_rec.deprecated_for = deprecator_key
         spec_rec.installed = False
         self._data[spec_key] = spec_rec
+        self._mark_changed(spec_key)
 
     @_autospec
     def deprecate(self, spec, deprecator):
@@ -1207,6 +1682,12 @@ def installed_relatives(self, spec, direction='children', transitive=True,
         if direction not in ('parents', 'children'):
             raise ValueError("Invalid direction: %s" % direction)
 
+        if direction == 'parents':
+            with self.read_transaction():
+                self._load_all_specs()
+            for upstream_db in self.upstream_dbs:
+                upstream_db._load_all_specs()
+
         relatives = set()
         for spec in self.query(spec):
             if transitive:
@@ -1274,9 +1755,9 @@ def _get_by_hash_local(self, dag_hash, default=None, installed=any):
 
         # check if hash is a prefix of some installed (or previously
         # installed) spec.
-        matches = [record.spec for h, record in self._data.items()
-                   if h.startswith(dag_hash) and
-                   record.install_type_matches(installed)]
+        matches = [self._data[h].spec
+                   for h in self._index.hashes_with_prefix(dag_hash)
+                   if self._data[h].install_type_matches(installed)]
         if matches:
             return matches
 
@@ -1363,6 +1844,9 @@ def _query(
         # TODO: like installed and known that can be queried?  Or are
         # TODO: these really special cases that only belong here?
 
+        if isinstance(query_spec, six.string_types):
+            query_spec = spack.spec.Spec(query_spec)
+
         # Just look up concrete specs with hashes; no fancy search.
         if isinstance(query_spec, spack.spec.Spec) and query_spec.concrete:
             # TODO: handling of hashes restriction is not particularly elegant.
@@ -1373,15 +1857,23 @@ def _query(
             else:
                 return []
 
-        # Abstract specs require more work -- currently we test
-        # against everything.
+        # Abstract specs require more work -- narrow down the records to
+        # test against with the indexes first.
+        keys = self._index.candidates(
+            query_spec, explicit,
+            start_time=start_date and _timestamp(start_date),
+            end_time=end_date and _timestamp(end_date))
+        if keys is None:
+            keys = self._data.keys()
+        if hashes is not None:
+            keys = [key for key in keys if key in hashes]
+
         results = []
         start_date = start_date or datetime.datetime.min
         end_date = end_date or datetime.datetime.max
 
-        for key, rec in self._data.items():
-            if hashes is not None and rec.spec.dag_hash() not in hashes:
-                continue
+        for key in keys:
+            rec = self._data[key]
 
             if not rec.install_type_matches(installed):
                 continue
@@ -22,6 +22,7 @@
 import spack.concretize
 import spack.error
 import spack.hash_types as ht
+import spack.installer
 import spack.repo
 import spack.schema.env
 import spack.spec
@@ -486,7 +487,8 @@ def from_dict(d):
     def view(self):
         return YamlFilesystemView(self.root, spack.store.layout,
                                   ignore_conflicts=True,
-                                  projections=self.projections)
+                                  projections=self.projections,
+                                  manifest=True)
 
     def __contains__(self, spec):
         """Is the spec described by the view descriptor
@@ -505,7 +507,16 @@ def __contains__(self, spec):
 
         return True
 
-    def regenerate(self, all_specs, roots):
+    def regenerate(self, all_specs, roots, repair=False):
+        """Link the installed specs of the environment in the view, and
+        unlink the specs that are no longer part of it.
+
+        Only the files of the specs added or removed are read: the specs
+        linked in the view, and their files, are recorded in the manifest
+        of the view. With ``repair=True``, or if the view has no manifest,
+        broken links and empty directories are purged from the whole view
+        and the manifest is rebuilt from the specs linked in the view.
+        """
         specs_for_view = []
         specs = all_specs if self.link == 'all' else roots
         for spec in specs:
@@ -528,12 +539,20 @@ def regenerate(self, all_specs, roots):
 
             view = self.view()
 
-            view.clean()
-            specs_in_view = set(view.get_all_specs())
+            if repair or not view.manifest.exists():
+                view.repair()
             tty.msg("Updating view at {0}".format(self.root))
 
-            rm_specs = specs_in_view - installed_specs_for_view
-            add_specs = installed_specs_for_view - specs_in_view
+            # compare DAG hashes, to read only the specs removed from the
+            # view from its manifest
+            linked = set(view.manifest.dag_hashes())
+            wanted = dict((s.dag_hash(), s) for s in installed_specs_for_view)
+
+            rm_specs = set(view.manifest.get_spec(h)
+                           for h in linked if h not in wanted)
+            add_specs = set(s for h, s in wanted.items() if h not in linked)
+            specs_in_view = rm_specs | set(
+                s for h, s in wanted.items() if h in linked)
 
             # pass all_specs in, as it's expensive to read all the
             # spec.yaml files twice.
@@ -1081,7 +1100,13 @@ def update_default_view(self, viewpath):
         else:
             self.views.pop(name, None)
 
-    def regenerate_views(self):
+    def regenerate_views(self, repair=False):
+        """Update the views of the environment.
+
+        Args:
+            repair (bool): purge broken links and empty directories from
+                the whole views, and rebuild their manifests
+        """
         if not self.views:
             tty.debug("Skip view update, this environment does not"
                       " maintain a view")
@@ -1089,7 +1114,7 @@ def regenerate_views(self):
 
         specs = self._get_environment_specs()
         for view in self.views.values():
-            view.regenerate(specs, self.roots())
+            view.regenerate(specs, self.roots(), repair=repair)
 
     def _env_modifications_for_default_view(self, reverse=False):
         all_mods = spack.util.environment.EnvironmentModifications()
@@ -1219,6 +1244,15 @@ def install_all(self, args=None):
                 if not spec.package.installed:
                     uninstalled_specs.append(spec)
 
+        # Download the sources of the whole environment at once, rather than
+        # those of each root spec right before building it
+        if not (args and (args.cache_only or args.fake)):
+            pkgs = dict((s.dag_hash(), s.package)
+                        for spec in uninstalled_specs
+                        for s in spec.traverse())
+            spack.installer.prefetch_sources(
+                list(pkgs.values()), args.use_cache if args else True)
+
         for spec in uninstalled_specs:
             # Parse cli arguments and construct a dictionary
             # that will be passed to Package.do_install API
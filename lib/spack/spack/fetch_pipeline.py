@@ -0,0 +1,158 @@
+# Copyright 2013-2020 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Fetch the sources of many packages concurrently, ahead of their builds.
+
+Sources are otherwise downloaded one package at a time, right before each
+package is built. :func:`fetch_packages` downloads them up front with a
+bounded pool of threads: each archive is checked against its checksum as
+soon as it is downloaded, and stored in the source cache, so the builds
+that follow find everything locally.
+
+Archives are downloaded into private, temporary stages. The stage of a
+package belongs to its build (which may run in another Spack process) and
+is only used under the locks that the build takes: ``do_fetch()`` copies
+the archives from the source cache into it.
+
+Only packages whose sources are all archives (fetched with ``curl``, from
+S3 or from the source cache) are fetched concurrently. Other fetch
+strategies change the working directory of the process, so they are left
+to the usual serial fetch, and so are versions without a checksum (which
+may need a confirmation from the user) and patches.
+"""
+import copy
+import multiprocessing.pool
+import os
+
+import llnl.util.tty as tty
+
+import spack.caches
+import spack.config
+import spack.error
+import spack.fetch_strategy as fs
+import spack.stage
+
+
+def default_jobs():
+    """Number of concurrent downloads (the ``config:fetch_jobs`` setting)."""
+    return max(1, spack.config.get('config:fetch_jobs', 8))
+
+
+def _archive_paths(pkg):
+    """Storage paths of the archives of a package in the source cache, or
+    None if the package cannot be fetched concurrently."""
+    if pkg.spec.external or not pkg.has_code:
+        return None
+
+    if spack.config.get('config:checksum') and \
+            pkg.version not in pkg.versions:
+        return None
+
+    paths = []
+    for stage in pkg.stage:
+        if not isinstance(stage.default_fetcher, fs.URLFetchStrategy):
+            return None
+        if not stage.mirror_paths:
+            return None
+        paths.append(stage.mirror_paths.storage_path)
+    return paths
+
+
+def _is_cached(stage):
+    """Whether the archive of a stage is already in the source cache."""
+    return os.path.exists(os.path.join(
+        spack.caches.fetch_cache.root, stage.mirror_paths.storage_path))
+
+
+def _fetch(pkg):
+    """Fetch, check and cache the archives of a package.
+
+    Each archive is downloaded into a temporary stage of its own, removed
+    afterwards: the stage of the package is left alone.
+
+    Returns:
+        (spack.error.SpackError or None) the error that occurred, if any
+    """
+    for pkg_stage in pkg.stage:
+        if _is_cached(pkg_stage):
+            continue
+
+        # The fetcher is copied, as it keeps a reference to its stage
+        stage = spack.stage.Stage(
+            copy.copy(pkg_stage.default_fetcher),
+            mirror_paths=pkg_stage.mirror_paths, lock=False)
+        try:
+            stage.create()
+            stage.fetch()
+            if spack.config.get('config:checksum'):
+                stage.check()
+            stage.cache_local()
+        except spack.error.SpackError as e:
+            return e
+        finally:
+            stage.destroy()
+    return None
+
+
+def fetch_packages(packages, jobs=None):
+    """Fetch the sources of packages concurrently.
+
+    Packages that cannot be fetched concurrently, or that share their
+    archives with a package fetched here, are skipped: they are fetched
+    serially, from the source cache when possible, by ``do_fetch()``.
+    Failed downloads are not fatal either, as they are retried (and
+    reported) by ``do_fetch()``.
+
+    Args:
+        packages (list): concrete packages whose sources are fetched
+        jobs (int or None): maximum number of concurrent downloads
+            (default: see :func:`default_jobs`)
+
+    Returns:
+        (list) the packages whose sources were fetched
+    """
+    jobs = jobs or default_jobs()
+
+    to_fetch, fetching = [], set()
+    for pkg in packages:
+        paths = _archive_paths(pkg)
+        if paths is None or fetching.intersection(paths):
+            continue
+
+        # Skip sources that were already downloaded (e.g., for all the
+        # packages of an environment, before installing each of its specs)
+        if all(_is_cached(stage) for stage in pkg.stage):
+            continue
+
+        fetching.update(paths)
+        to_fetch.append(pkg)
+
+    if not to_fetch:
+        return []
+
+    jobs = min(jobs, len(to_fetch))
+    tty.msg('Fetching sources of {0} packages with {1} concurrent '
+            'downloads'.format(len(to_fetch), jobs))
+
+    # Messages (and curl progress bars) of concurrent downloads would be
+    # interleaved: only the outcome is reported, below
+    pool = multiprocessing.pool.ThreadPool(jobs)
+    try:
+        with tty.SuppressOutput(msg_enabled=False):
+            errors = pool.map(_fetch, to_fetch, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+    fetched = []
+    for pkg, error in zip(to_fetch, errors):
+        name = pkg.spec.cformat('{name}{@version}{/hash:7}')
+        if error is None:
+            fetched.append(pkg)
+        else:
+            tty.warn('Could not fetch the sources of {0}'.format(name),
+                     str(error))
+    tty.msg('Fetched sources of {0} packages'.format(len(fetched)))
+    return fetched
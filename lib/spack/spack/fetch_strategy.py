@@ -353,10 +353,16 @@ def _fetch_from_url(self, url):
             # Timeout if can't establish a connection after n sec.
             curl_args.extend(['--connect-timeout', str(connect_timeout)])
 
-        # Run curl but grab the mime type from the http headers
+        # Run curl but grab the mime type from the http headers. The working
+        # directory only matters when curl picks the name of the file, and
+        # is left alone otherwise so that archives can be fetched by
+        # several threads at once.
         curl = self.curl
-        with working_dir(self.stage.path):
+        if partial_file:
             headers = curl(*curl_args, output=str, fail_on_error=False)
+        else:
+            with working_dir(self.stage.path):
+                headers = curl(*curl_args, output=str, fail_on_error=False)
 
         if curl.returncode != 0:
             # clean up archive on failure.
@@ -1141,13 +1147,11 @@ def fetch(self):
 
         basename = os.path.basename(parsed_url.path)
 
-        with working_dir(self.stage.path):
-            _, headers, stream = web_util.read_from_url(self.url)
-
-            with open(basename, 'wb') as f:
-                shutil.copyfileobj(stream, f)
+        _, headers, stream = web_util.read_from_url(self.url)
+        with open(os.path.join(self.stage.path, basename), 'wb') as f:
+            shutil.copyfileobj(stream, f)
 
-            content_type = web_util.get_header(headers, 'Content-type')
+        content_type = web_util.get_header(headers, 'Content-type')
 
         if content_type == 'text/html':
             warn_content_type_mismatch(self.archive_file or "the archive")
@@ -10,15 +10,17 @@
 import shutil
 import sys
 
-from llnl.util.link_tree import LinkTree, MergeConflictError
+from llnl.util.link_tree import LinkTree, MergePlan, MergeConflictError
 from llnl.util import tty
 from llnl.util.lang import match_predicate, index_by
 from llnl.util.tty.color import colorize
 from llnl.util.filesystem import (
     mkdirp, remove_dead_links, remove_empty_directories)
 
+import spack.util.spack_json as sjson
 import spack.util.spack_yaml as s_yaml
 
+import spack.hash_types as ht
 import spack.spec
 import spack.store
 import spack.schema.projections
@@ -35,10 +37,11 @@
     from itertools import ifilter as filter
     from itertools import izip as zip
 
-__all__ = ["FilesystemView", "YamlFilesystemView"]
+__all__ = ["FilesystemView", "YamlFilesystemView", "ViewManifest"]
 
 
 _projections_path = '.spack/projections.yaml'
+_manifest_path = '.spack/view-manifest.json'
 
 
 class FilesystemView(object):
@@ -179,14 +182,121 @@ def print_status(self, *specs, **kwargs):
         raise NotImplementedError
 
 
+class ViewManifest(object):
+    """Record of the specs linked in a view, and of the files each of them
+    added to the view (relative to the root of the view).
+
+    Views keeping a manifest are updated without reading the whole view:
+    the specs linked in the view are read from the manifest rather than
+    from the ``spec.yaml`` files of the view, and the files of the specs
+    removed from the view are deleted even when their prefix is gone.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+        # DAG hash of the specs in the view -> hashes of the nodes of the
+        # spec and files added to the view
+        self._specs = None
+
+        # DAG hash -> node dictionary of the nodes of the specs in the view
+        self._nodes = None
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def _read(self):
+        if self._specs is not None:
+            return
+
+        self._specs, self._nodes = {}, {}
+        if self.exists():
+            with open(self.path) as f:
+                data = sjson.load(f)
+            self._specs = data['specs']
+            self._nodes = data['nodes']
+
+    def write(self):
+        self._read()
+
+        # empty views have no manifest (reading them in full is cheap)
+        if not self._specs:
+            if self.exists():
+                os.remove(self.path)
+                try:
+                    os.rmdir(os.path.dirname(self.path))
+                except OSError:
+                    pass
+            return
+
+        # only keep the nodes of specs that are still in the view
+        used = set(h for entry in self._specs.values()
+                   for h in entry['nodes'])
+        self._nodes = dict(
+            (h, node) for h, node in self._nodes.items() if h in used)
+
+        mkdirp(os.path.dirname(self.path))
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            sjson.dump({'specs': self._specs, 'nodes': self._nodes}, f)
+        os.rename(tmp, self.path)
+
+    def clear(self):
+        self._specs, self._nodes = {}, {}
+
+    def dag_hashes(self):
+        """DAG hashes of the specs linked in the view."""
+        self._read()
+        return list(self._specs)
+
+    def get_spec(self, dag_hash):
+        self._read()
+        nodes = self._specs[dag_hash]['nodes']
+        return spack.spec.Spec.from_dict(
+            {'spec': [self._nodes[h] for h in nodes]})
+
+    def files(self, dag_hash):
+        """Files added to the view by a spec, relative to the view root."""
+        self._read()
+        entry = self._specs.get(dag_hash)
+        return entry['files'] if entry else []
+
+    def add(self, spec, files):
+        """Record files added to the view by a spec."""
+        self._read()
+        dag_hash = spec.dag_hash()
+        if dag_hash not in self._specs:
+            nodes = []
+            for s in spec.traverse(order='pre', deptype=ht.dag_hash.deptype):
+                h = s.dag_hash()
+                nodes.append(h)
+                if h not in self._nodes:
+                    node = s.to_node_dict()
+                    node[s.name]['hash'] = h
+                    self._nodes[h] = node
+            self._specs[dag_hash] = {'nodes': nodes, 'files': []}
+        self._specs[dag_hash]['files'].extend(files)
+
+    def remove(self, spec):
+        self._read()
+        self._specs.pop(spec.dag_hash(), None)
+
+
 class YamlFilesystemView(FilesystemView):
     """
         Filesystem view to work with a yaml based directory layout.
+
+        With ``manifest=True``, the view records the specs linked in it
+        and the files they added in a ``ViewManifest``.
     """
 
     def __init__(self, root, layout, **kwargs):
         super(YamlFilesystemView, self).__init__(root, layout, **kwargs)
 
+        self.manifest = None
+        if kwargs.get('manifest', False):
+            self.manifest = ViewManifest(os.path.join(root, _manifest_path))
+
         # Super class gets projections from the kwargs
         # YAML specific to get projections from YAML file
         self.projections_path = os.path.join(self._root, _projections_path)
@@ -246,9 +356,11 @@ def add_specs(self, *specs, **kwargs):
 
         set(map(self._check_no_ext_conflicts, extensions))
         # fail on first error, otherwise link extensions as well
-        if all(map(self.add_standalone, standalones)):
+        if self.add_standalones(standalones):
             all(map(self.add_extension, extensions))
 
+        self._write_manifest()
+
     def add_extension(self, spec):
         if not spec.package.is_extension:
             tty.error(self._croot + 'Package %s is not an extension.'
@@ -272,68 +384,138 @@ def add_extension(self, spec):
         return True
 
     def add_standalone(self, spec):
-        if spec.package.is_extension:
-            tty.error(self._croot + 'Package %s is an extension.'
-                      % spec.name)
-            return False
+        return self.add_standalones([spec])
 
-        if spec.external:
-            tty.warn(self._croot + 'Skipping external package: %s'
-                     % colorize_spec(spec))
-            return True
+    def add_standalones(self, specs):
+        """
+            Link standalone packages in the view. All the packages are
+            checked before their prefixes are merged in the view at once.
+        """
+        to_merge = []
+        for spec in specs:
+            if spec.package.is_extension:
+                tty.error(self._croot + 'Package %s is an extension.'
+                          % spec.name)
+                return False
 
-        if self.check_added(spec):
-            tty.warn(self._croot + 'Skipping already linked package: %s'
-                     % colorize_spec(spec))
-            return True
+            if spec.external:
+                tty.warn(self._croot + 'Skipping external package: %s'
+                         % colorize_spec(spec))
+                continue
+
+            if self.check_added(spec):
+                tty.warn(self._croot + 'Skipping already linked package: %s'
+                         % colorize_spec(spec))
+                continue
+
+            if spec.package.extendable:
+                # Check for globally activated extensions in the extendee that
+                # we're looking at.
+                activated = [p.spec for p in
+                             spack.store.db.activated_extensions_for(spec)]
+                if activated:
+                    tty.error("Globally activated extensions cannot be used "
+                              "in conjunction with filesystem views. "
+                              "Please deactivate the following specs: ")
+                    spack.cmd.display_specs(activated, flags=True,
+                                            variants=True, long=False)
+                    return False
+
+            to_merge.append(spec)
+
+        self.merge_specs(to_merge)
+
+        for spec in to_merge:
+            self.link_meta_folder(spec)
 
-        if spec.package.extendable:
-            # Check for globally activated extensions in the extendee that
-            # we're looking at.
-            activated = [p.spec for p in
-                         spack.store.db.activated_extensions_for(spec)]
-            if activated:
-                tty.error("Globally activated extensions cannot be used in "
-                          "conjunction with filesystem views. "
-                          "Please deactivate the following specs: ")
-                spack.cmd.display_specs(activated, flags=True, variants=True,
-                                        long=False)
-                return False
+            if self.verbose:
+                tty.info(self._croot + 'Linked package: %s'
+                         % colorize_spec(spec))
+        return True
 
-        self.merge(spec)
+    def merge_specs(self, specs):
+        """
+            Merge the prefixes of several packages in the view.
 
-        self.link_meta_folder(spec)
+            The directories and links of the packages that link all their
+            files in views are planned together, so that conflicts between
+            any of them are found before the view is modified, and are
+            created by a pool of threads. Packages adding their files to
+            views in their own way are then merged one at a time.
+        """
+        plan = MergePlan()
+        ignore_file = match_predicate(self.layout.hidden_file_paths)
 
-        if self.verbose:
-            tty.info(self._croot + 'Linked package: %s' % colorize_spec(spec))
-        return True
+        merge_maps, others = {}, []
+        for spec in specs:
+            pkg = spec.package
+            if not links_all_files(pkg):
+                others.append(spec)
+                continue
+            merge_maps[spec] = plan.add_tree(
+                pkg.view_source(), pkg.view_destination(self), ignore_file)
+
+        conflicts = plan.conflicts
+        if not self.ignore_conflicts:
+            conflicts = conflicts + plan.existing
+        if conflicts:
+            raise MergeConflictError(conflicts[0])
+
+        plan.execute(link=self.link)
+
+        # with ignore_conflicts, a file provided by several packages is
+        # linked to the first one, which is the only one to record it
+        if self.manifest is not None:
+            for spec, merge_map in merge_maps.items():
+                self._record_files(spec, [
+                    dst for src, dst in merge_map.items()
+                    if plan.links.get(dst) == src])
+
+        for spec in others:
+            self.merge(spec)
 
     def merge(self, spec, ignore=None):
         pkg = spec.package
-        view_source = pkg.view_source()
-        view_dst = pkg.view_destination(self)
-
-        tree = LinkTree(view_source)
 
         ignore = ignore or (lambda f: False)
         ignore_file = match_predicate(
             self.layout.hidden_file_paths, ignore)
 
-        # check for dir conflicts
-        conflicts = tree.find_dir_conflicts(view_dst, ignore_file)
+        # plan the directories of the package, and check for dir conflicts
+        plan = MergePlan()
+        merge_map = plan.add_tree(pkg.view_source(),
+                                  pkg.view_destination(self),
+                                  ignore_file, link=False)
 
-        merge_map = tree.get_file_map(view_dst, ignore_file)
+        conflicts = list(plan.conflicts)
         if not self.ignore_conflicts:
             conflicts.extend(pkg.view_file_conflicts(self, merge_map))
 
         if conflicts:
             raise MergeConflictError(conflicts[0])
 
+        # files already in the view belong to other packages
+        if self.manifest is not None:
+            added = [dst for dst in merge_map.values()
+                     if not os.path.lexists(dst)]
+
         # merge directories with the tree
-        tree.merge_directories(view_dst, ignore_file)
+        plan.execute()
 
         pkg.add_files_to_view(self, merge_map)
 
+        if self.manifest is not None:
+            self._record_files(
+                spec, [path for path in added if os.path.lexists(path)])
+
+    def _record_files(self, spec, added):
+        """Record the files a package added to the view in the manifest."""
+        # the meta folder is linked after the files of the package
+        added = list(added)
+        added.append(self.get_path_meta_folder(spec))
+        self.manifest.add(spec, [
+            os.path.relpath(path, self._root) for path in added])
+
     def unmerge(self, spec, ignore=None):
         pkg = spec.package
         view_source = pkg.view_source()
@@ -421,12 +603,42 @@ def remove_specs(self, *specs, **kwargs):
 
         # Remove the packages from the view
         for spec in to_deactivate_sorted:
-            if spec.package.is_extension:
+            if self.manifest is not None and not os.path.isdir(spec.prefix):
+                # uninstalled packages are removed from the manifest
+                self.remove_files(spec)
+            elif spec.package.is_extension:
                 self.remove_extension(spec, with_dependents=with_dependents)
             else:
                 self.remove_standalone(spec)
 
-        self._purge_empty_directories()
+        if self.manifest is None:
+            self._purge_empty_directories()
+            return
+
+        # only directories that held files of the removed packages can
+        # have been left empty
+        files = []
+        for spec in to_deactivate_sorted:
+            files.extend(self.manifest.files(spec.dag_hash()))
+            self.manifest.remove(spec)
+        self._remove_empty_parents(
+            os.path.join(self._root, f) for f in files)
+        self._write_manifest()
+
+    def remove_files(self, spec):
+        """
+            Remove the files a package added to the view, as recorded in
+            the manifest of the view.
+        """
+        for f in self.manifest.files(spec.dag_hash()):
+            path = os.path.join(self._root, f)
+            if os.path.isdir(path) and not os.path.islink(path):
+                shutil.rmtree(path)
+            elif os.path.lexists(path):
+                os.remove(path)
+
+        if self.verbose:
+            tty.info(self._croot + 'Removed package: %s' % colorize_spec(spec))
 
     def remove_extension(self, spec, with_dependents=True):
         """
@@ -477,6 +689,13 @@ def get_projection_for_spec(self, spec):
         return self._root
 
     def get_all_specs(self):
+        if self.manifest is not None and self.manifest.exists():
+            return [self.manifest.get_spec(h)
+                    for h in self.manifest.dag_hashes()]
+        return self._read_all_specs()
+
+    def _read_all_specs(self):
+        """Read the specs linked in the view from their spec.yaml files."""
         md_dirs = []
         for root, dirs, files in os.walk(self._root):
             if spack.store.layout.metadata_dir in dirs:
@@ -596,10 +815,54 @@ def _purge_empty_directories(self):
     def _purge_broken_links(self):
         remove_dead_links(self._root)
 
+    def _remove_empty_parents(self, paths):
+        """Remove the directories containing ``paths`` that are empty, up
+        to the root of the view."""
+        root = os.path.abspath(self._root)
+        dirs = set(os.path.dirname(os.path.abspath(p)) for p in paths)
+        for d in sorted(dirs, key=len, reverse=True):
+            while d.startswith(root + os.sep):
+                try:
+                    os.rmdir(d)
+                except OSError:
+                    break
+                d = os.path.dirname(d)
+
+    def _write_manifest(self):
+        # views with nothing linked are not created for their manifest
+        if self.manifest is not None and os.path.isdir(self._root):
+            self.manifest.write()
+
     def clean(self):
         self._purge_broken_links()
         self._purge_empty_directories()
 
+    def repair(self):
+        """
+            Remove broken links and empty directories from the whole view,
+            and record the files of the packages linked in it in a new
+            manifest.
+        """
+        self.clean()
+        if self.manifest is None:
+            return
+
+        self.manifest.clear()
+        for spec in self._read_all_specs():
+            if spec.external or not os.path.isdir(spec.prefix):
+                continue
+            pkg = spec.package
+            tree = LinkTree(pkg.view_source())
+            ignore_file = match_predicate(self.layout.hidden_file_paths)
+            merge_map = tree.get_file_map(
+                pkg.view_destination(self), ignore_file)
+            added = [dst for src, dst in merge_map.items()
+                     if is_linked_file(src, dst)]
+            added.append(self.get_path_meta_folder(spec))
+            self.manifest.add(spec, [
+                os.path.relpath(path, self._root) for path in added])
+        self._write_manifest()
+
     def unlink_meta_folder(self, spec):
         path = self.get_path_meta_folder(spec)
         assert os.path.exists(path)
@@ -630,6 +893,27 @@ def get_spec_from_file(filename):
         return None
 
 
+def links_all_files(pkg):
+    """Whether a package adds all its files to views by linking them, as
+    done by default (see ``PackageViewMixin``)."""
+    import spack.package  # avoid circular import
+    for name in ('view_file_conflicts', 'add_files_to_view'):
+        owner = next(cls for cls in type(pkg).__mro__ if name in cls.__dict__)
+        if owner is not spack.package.PackageViewMixin:
+            return False
+    return True
+
+
+def is_linked_file(src, dst):
+    """Whether ``dst`` was linked (or copied) from ``src`` in a view."""
+    if os.path.islink(dst) and os.readlink(dst) == src:
+        return True
+    try:
+        return os.path.lexists(dst) and filecmp.cmp(src, dst, shallow=True)
+    except OSError:
+        return False
+
+
 def colorize_root(root):
     colorize = ft.partial(tty.color.colorize, color=sys.stdout.isatty())
     pre, post = map(colorize, "@M[@. @M]@.".split())
@@ -27,9 +27,12 @@
 installations of packages in a Spack instance.
 """
 
+import functools
 import glob
 import heapq
 import itertools
+import multiprocessing
+import multiprocessing.pool
 import os
 import shutil
 import six
@@ -42,6 +45,7 @@
 import spack.binary_distribution as binary_distribution
 import spack.compilers
 import spack.error
+import spack.fetch_pipeline
 import spack.hooks
 import spack.package
 import spack.package_prefs as prefs
@@ -80,6 +84,11 @@
 STATUS_REMOVED = 'removed'
 
 
+def _no_build():
+    """Placeholder for the build of a package that needs no building."""
+    pass
+
+
 def _handle_external_and_upstream(pkg, explicit):
     """
     Determine if the package is external or upstream and register it in the
@@ -354,6 +363,38 @@ def _try_install_from_binary_cache(pkg, explicit, unsigned=False):
     return _process_binary_cache_tarball(pkg, binary_spec, explicit, unsigned)
 
 
+def prefetch_sources(pkgs, use_cache=True):
+    """
+    Concurrently fetch the sources of the packages to be built from source,
+    before any of them is built (see ``config:fetch_jobs``).
+
+    Args:
+        pkgs (list of PackageBase): the packages about to be installed
+        use_cache (bool): ``True`` if packages are installed from a binary
+            cache when available (so their sources are not needed), otherwise
+            ``False``
+    """
+    jobs = spack.fetch_pipeline.default_jobs()
+    if jobs < 2:
+        return
+
+    to_fetch = []
+    for pkg in pkgs:
+        if pkg.installed_upstream or pkg.installed:
+            continue
+
+        if use_cache:
+            specs = binary_distribution.get_spec(pkg.spec, force=False)
+            binary_spec = spack.spec.Spec.from_dict(pkg.spec.to_dict())
+            binary_spec._mark_concrete()
+            if binary_spec in specs:
+                continue
+
+        to_fetch.append(pkg)
+
+    spack.fetch_pipeline.fetch_packages(to_fetch, jobs)
+
+
 def _update_explicit_entry_in_db(pkg, rec, explicit):
     """
     Ensure the spec is marked explicit in the database.
@@ -370,7 +411,7 @@ def _update_explicit_entry_in_db(pkg, rec, explicit):
             rec = spack.store.db.get_record(pkg.spec)
             message = '{s.name}@{s.version} : marking the package explicit'
             tty.msg(message.format(s=pkg.spec))
-            rec.explicit = True
+            spack.store.db.update_explicit(rec.spec, True)
 
 
 def dump_packages(spec, path):
@@ -546,6 +587,8 @@ def package_id(pkg):
 
 install_args_docstring = """
             cache_only (bool): Fail if binary package unavailable.
+            concurrent_builds (int): Maximum number of packages to build at
+                the same time, sharing the ``config:build_jobs`` budget.
             dirty (bool): Don't clean the build environment before installing.
             explicit (bool): True if package was explicitly installed, False
                 if package was implicitly installed (as a dependency).
@@ -1012,9 +1055,48 @@ def _install_task(self, task, **kwargs):
         Args:
             task (BuildTask): the installation build task for a package"""
 
-        cache_only = kwargs.get('cache_only', False)
         dirty = kwargs.get('dirty', False)
         fake = kwargs.get('fake', False)
+
+        build_process = self._prepare_build(task, **kwargs)
+        if build_process is None:
+            return
+
+        pkg = task.pkg
+        try:
+            self._setup_install_dir(pkg)
+
+            # Fork a child to do the actual installation.
+            # Preserve verbosity settings across installs.
+            spack.package.PackageBase._verbose = spack.build_environment.fork(
+                pkg, build_process, dirty=dirty, fake=fake)
+
+            self._register_build(task)
+
+        except StopIteration as e:
+            # A StopIteration exception means that do_install was asked to
+            # stop early from clients.
+            self._stop_build(task, e)
+
+    _install_task.__doc__ += install_args_docstring
+
+    def _prepare_build(self, task, **kwargs):
+        """
+        Flag the task as installing and, unless the package can be installed
+        from a binary cache, create the function that builds it in a child
+        process.
+
+        Args:
+            task (BuildTask): the installation build task for a package
+            kwargs: the installation arguments (see ``_install_task``)
+
+        Return:
+            (callable or None) the build function to be run by
+                ``spack.build_environment.fork()`` or ``None`` if there is
+                nothing left to build
+        """
+        cache_only = kwargs.get('cache_only', False)
+        fake = kwargs.get('fake', False)
         install_source = kwargs.get('install_source', False)
         keep_stage = kwargs.get('keep_stage', False)
         skip_patch = kwargs.get('skip_patch', False)
@@ -1145,34 +1227,9 @@ def build_process():
         # hook that allows tests to inspect the Package before installation
         # see unit_test_check() docs.
         if not pkg.unit_test_check():
-            return
-
-        try:
-            self._setup_install_dir(pkg)
-
-            # Fork a child to do the actual installation.
-            # Preserve verbosity settings across installs.
-            spack.package.PackageBase._verbose = spack.build_environment.fork(
-                pkg, build_process, dirty=dirty, fake=fake)
-
-            # Note: PARENT of the build process adds the new package to
-            # the database, so that we don't need to re-read from file.
-            spack.store.db.add(pkg.spec, spack.store.layout,
-                               explicit=explicit)
-
-            # If a compiler, ensure it is added to the configuration
-            if task.compiler:
-                spack.compilers.add_compilers_to_config(
-                    spack.compilers.find_compilers([pkg.spec.prefix]))
-
-        except StopIteration as e:
-            # A StopIteration exception means that do_install was asked to
-            # stop early from clients.
-            tty.msg('{0} {1}'.format(self.pid, str(e)))
-            tty.msg('Package stage directory : {0}'
-                    .format(pkg.stage.source_path))
+            return None
 
-    _install_task.__doc__ += install_args_docstring
+        return build_process
 
     def _next_is_pri0(self):
         """
@@ -1228,6 +1285,26 @@ def _push_task(self, pkg, compiler, start, attempts, status):
         self.build_tasks[pkg_id] = task
         heapq.heappush(self.build_pq, (task.key, task))
 
+    def _register_build(self, task):
+        """
+        Add the newly built package to the database and, if it is a
+        bootstrapped compiler, to the compiler configuration.
+
+        Args:
+            task (BuildTask): the build task for the built package
+        """
+        pkg = task.pkg
+
+        # Note: PARENT of the build process adds the new package to
+        # the database, so that we don't need to re-read from file.
+        spack.store.db.add(pkg.spec, spack.store.layout,
+                           explicit=task.pkg_id == self.pkg_id)
+
+        # If a compiler, ensure it is added to the configuration
+        if task.compiler:
+            spack.compilers.add_compilers_to_config(
+                spack.compilers.find_compilers([pkg.spec.prefix]))
+
     def _release_lock(self, pkg_id):
         """
         Release any lock on the package
@@ -1312,6 +1389,18 @@ def _setup_install_dir(self, pkg):
             # Ensure the metadata path exists as well
             fs.mkdirp(spack.store.layout.metadata_path(pkg.spec), mode=perms)
 
+    def _stop_build(self, task, exc):
+        """
+        Report a build that was asked to stop early by its client.
+
+        Args:
+            task (BuildTask): the build task for the stopped package
+            exc (StopIteration): the exception stopping the build
+        """
+        tty.msg('{0} {1}'.format(self.pid, str(exc)))
+        tty.msg('Package stage directory : {0}'
+                .format(task.pkg.stage.source_path))
+
     def _update_failed(self, task, mark=False, exc=None):
         """
         Update the task and transitive dependents as failed; optionally mark
@@ -1373,6 +1462,328 @@ def _update_installed(self, task):
                 tty.debug('{0} has no build task to update for {1}\'s success'
                           .format(dep_id, pkg_id))
 
+    def _ready_to_build(self, task, keep_prefix, keep_stage, restage):
+        """
+        Determine whether the (dequeued) build task still needs to be built
+        by this process, updating its status and locks along the way.
+
+        Tasks for packages that are installed externally or upstream, by
+        another process, or that failed are flagged accordingly.  Tasks whose
+        package prefix cannot be write locked are requeued.
+
+        Args:
+            task (BuildTask): the build task popped from the queue
+            keep_prefix (bool): ``True`` if the prefix is to be kept on
+                failure, otherwise ``False``
+            keep_stage (bool): ``True`` if the stage is to be kept even if
+                there are exceptions, otherwise ``False``
+            restage (bool): ``True`` if forcing Spack to restage the package
+                source, otherwise ``False``
+
+        Return:
+            (bool) ``True`` if the package is write locked and must be built,
+                otherwise ``False``
+        """
+        pkg, spec = task.pkg, task.pkg.spec
+        pkg_id = package_id(pkg)
+        tty.verbose('Processing {0}: task={1}'.format(pkg_id, task))
+
+        # Ensure that the current spec has NO uninstalled dependencies,
+        # which is assumed to be reflected directly in its priority.
+        #
+        # If the spec has uninstalled dependencies, then there must be
+        # a bug in the code (e.g., priority queue or uninstalled
+        # dependencies handling).  So terminate under the assumption that
+        # all subsequent tasks will have non-zero priorities or may be
+        # dependencies of this task.
+        if task.priority != 0:
+            tty.error('Detected uninstalled dependencies for {0}: {1}'
+                      .format(pkg_id, task.uninstalled_deps))
+            dep_str = 'dependencies' if task.priority > 1 else 'dependency'
+            raise InstallError(
+                'Cannot proceed with {0}: {1} uninstalled {2}: {3}'
+                .format(pkg_id, task.priority, dep_str,
+                        ','.join(task.uninstalled_deps)))
+
+        # Skip the installation if the spec is not being installed locally
+        # (i.e., if external or upstream) BUT flag it as installed since
+        # some package likely depends on it.
+        if pkg_id != self.pkg_id:
+            not_local = _handle_external_and_upstream(pkg, False)
+            if not_local:
+                self._update_installed(task)
+                _print_installed_pkg(pkg.prefix)
+                return False
+
+        # Flag a failed spec.  Do not need an (install) prefix lock since
+        # assume using a separate (failed) prefix lock file.
+        if pkg_id in self.failed or spack.store.db.prefix_failed(spec):
+            tty.warn('{0} failed to install'.format(pkg_id))
+            self._update_failed(task)
+            return False
+
+        # Attempt to get a write lock.  If we can't get the lock then
+        # another process is likely (un)installing the spec or has
+        # determined the spec has already been installed (though the
+        # other process may be hung).
+        ltype, lock = self._ensure_locked('write', pkg)
+        if lock is None:
+            # Attempt to get a read lock instead.  If this fails then
+            # another process has a write lock so must be (un)installing
+            # the spec (or that process is hung).
+            ltype, lock = self._ensure_locked('read', pkg)
+
+        # Requeue the spec if we cannot get at least a read lock so we
+        # can check the status presumably established by another process
+        # -- failed, installed, or uninstalled -- on the next pass.
+        if lock is None:
+            self._requeue_task(task)
+            return False
+
+        # Determine state of installation artifacts and adjust accordingly.
+        self._prepare_for_install(task, keep_prefix, keep_stage, restage)
+
+        # Flag an already installed package
+        if pkg_id in self.installed:
+            # Downgrade to a read lock to preclude other processes from
+            # uninstalling the package until we're done installing its
+            # dependents.
+            ltype, lock = self._ensure_locked('read', pkg)
+            if lock is not None:
+                self._update_installed(task)
+                _print_installed_pkg(pkg.prefix)
+
+                # It's an already installed compiler, add it to the config
+                if task.compiler:
+                    spack.compilers.add_compilers_to_config(
+                        spack.compilers.find_compilers([pkg.spec.prefix]))
+
+            else:
+                # At this point we've failed to get a write or a read
+                # lock, which means another process has taken a write
+                # lock between our releasing the write and acquiring the
+                # read.
+                #
+                # Requeue the task so we can re-check the status
+                # established by the other process -- failed, installed,
+                # or uninstalled -- on the next pass.
+                self.installed.remove(pkg_id)
+                self._requeue_task(task)
+            return False
+
+        # Having a read lock on an uninstalled pkg may mean another
+        # process completed an uninstall of the software between the
+        # time we failed to acquire the write lock and the time we
+        # took the read lock.
+        #
+        # Requeue the task so we can check the status presumably
+        # established by the other process -- failed, installed, or
+        # uninstalled -- on the next pass.
+        if ltype == 'read':
+            self._requeue_task(task)
+            return False
+
+        # Proceed with the installation since we have an exclusive write
+        # lock on the package.
+        return True
+
+    def _complete_task(self, task, keep_prefix, build):
+        """
+        Perform (or finish) the build of a write locked package and update
+        the installation state of its task accordingly.
+
+        Args:
+            task (BuildTask): the build task for the package being built
+            keep_prefix (bool): ``True`` if the prefix is to be kept on
+                failure, otherwise ``False``
+            build (callable): argless function that performs the build or
+                collects its outcome, raising an exception on failure
+        """
+        pkg = task.pkg
+        try:
+            build()
+            self._update_installed(task)
+
+            # If we installed then we should keep the prefix
+            stop_before_phase = getattr(pkg, 'stop_before_phase', None)
+            last_phase = getattr(pkg, 'last_phase', None)
+            keep_prefix = keep_prefix or \
+                (stop_before_phase is None and last_phase is None)
+
+        except spack.directory_layout.InstallDirectoryAlreadyExistsError:
+            tty.debug("Keeping existing install prefix in place.")
+            self._update_installed(task)
+            raise
+
+        except (Exception, KeyboardInterrupt, SystemExit) as exc:
+            # Assuming best effort installs so suppress the exception and
+            # mark as a failure UNLESS this is the explicit package.
+            err = 'Failed to install {0} due to {1}: {2}'
+            tty.error(err.format(pkg.name, exc.__class__.__name__,
+                      str(exc)))
+            self._update_failed(task, True, exc)
+
+            if task.pkg_id == self.pkg_id:
+                raise
+
+        finally:
+            # Remove the install prefix if anything went wrong during
+            # install.
+            if not keep_prefix:
+                pkg.remove_prefix()
+
+            # The subprocess *may* have removed the build stage. Mark it
+            # not created so that the next time pkg.stage is invoked, we
+            # check the filesystem for it.
+            pkg.stage.created = False
+
+        # Perform basic task cleanup for the installed spec to
+        # include downgrading the write to a read lock
+        self._cleanup_task(pkg)
+
+    def _peek_task(self):
+        """
+        Return the next build task to be processed without dequeueing it.
+
+        Entries for removed tasks at the front of the queue are discarded.
+
+        Return:
+            (BuildTask or None) the next task or ``None`` if the queue is
+                empty
+        """
+        while self.build_pq and self.build_pq[0][1].status == STATUS_REMOVED:
+            heapq.heappop(self.build_pq)
+        return self.build_pq[0][1] if self.build_pq else None
+
+    def _run_build(self, task, build_process, jobs, dirty, fake):
+        """
+        Build the package in a child process on behalf of a worker thread.
+
+        Any exception is returned, rather than raised, so the main thread
+        can update the installation state of the task.
+
+        Args:
+            task (BuildTask): the build task for the package being built
+            build_process (callable): the function run in the child process
+            jobs (int): number of build jobs allotted to the build
+            dirty (bool): Don't clean the build environment before installing
+            fake (bool): Don't really build; install fake stub files instead
+
+        Return:
+            (tuple) the task, the verbosity returned by the build and the
+                exception raised by the build (or ``None``)
+        """
+        try:
+            self._setup_install_dir(task.pkg)
+            echo = spack.build_environment.fork(
+                task.pkg, build_process, dirty=dirty, fake=fake, jobs=jobs)
+            return task, echo, None
+        except BaseException as exc:
+            return task, None, exc
+
+    def _finish_build(self, task, echo, exc):
+        """
+        Collect the outcome of a build performed by a worker thread.
+
+        Args:
+            task (BuildTask): the build task for the package that was built
+            echo (bool): the verbosity returned by the build
+            exc (Exception): the exception raised by the build (or ``None``)
+        """
+        if isinstance(exc, StopIteration):
+            self._stop_build(task, exc)
+            return
+
+        if exc is not None:
+            raise exc
+
+        # Preserve verbosity settings across installs.
+        spack.package.PackageBase._verbose = echo
+        self._register_build(task)
+
+    def _install_concurrently(self, concurrent_builds, **kwargs):
+        """
+        Process the build queue, building up to ``concurrent_builds``
+        packages without uninstalled dependencies at the same time.
+
+        Locking, database updates and queue bookkeeping all remain in the
+        calling thread.  Worker threads only wait on the forked build
+        processes, which share the ``config:build_jobs`` budget.
+
+        Args:
+            concurrent_builds (int): maximum number of simultaneous builds
+            kwargs: the installation arguments (see ``install``)
+        """
+        keep_prefix = kwargs.get('keep_prefix', False)
+        keep_stage = kwargs.get('keep_stage', False)
+        restage = kwargs.get('restage', False)
+        dirty = kwargs.get('dirty', False)
+        fake = kwargs.get('fake', False)
+
+        budget = spack.config.get('config:build_jobs', 16)
+        budget = max(1, min(budget, multiprocessing.cpu_count()))
+
+        # Mapping of the unique ids of the packages being built to the
+        # number of jobs allotted to their builds
+        active = {}
+        completed = six.moves.queue.Queue()
+        pool = multiprocessing.pool.ThreadPool(concurrent_builds)
+        try:
+            while self.build_pq or active:
+                # Examine each queued task at most once per pass so tasks
+                # requeued because another process holds their prefix lock
+                # do not spin while our own builds are running.
+                for _ in range(max(1, len(self.build_tasks))):
+                    if len(active) >= concurrent_builds:
+                        break
+
+                    # Tasks with uninstalled dependencies have to wait for
+                    # the running builds (unless there are none).
+                    next_task = self._peek_task()
+                    if next_task is None or \
+                            (active and next_task.priority != 0):
+                        break
+
+                    task = self._pop_task()
+                    if not self._ready_to_build(task, keep_prefix,
+                                                keep_stage, restage):
+                        continue
+
+                    build_process = self._prepare_build(task, **kwargs)
+                    if build_process is None:
+                        self._complete_task(task, keep_prefix, _no_build)
+                        continue
+
+                    # Split the remaining job budget between this build and
+                    # any other ready builds that can start right away.
+                    ready = sum(1 for t in self.build_tasks.values()
+                                if t.priority == 0) + 1
+                    slots = min(concurrent_builds - len(active), ready)
+                    jobs = max(1, (budget - sum(active.values())) // slots)
+
+                    tty.debug('Starting build of {0} with {1} jobs'
+                              .format(task.pkg_id, jobs))
+                    active[task.pkg_id] = jobs
+                    pool.apply_async(
+                        self._run_build,
+                        (task, build_process, jobs, dirty, fake),
+                        callback=completed.put)
+
+                if not active:
+                    continue
+
+                task, echo, exc = completed.get()
+                del active[task.pkg_id]
+                self._complete_task(
+                    task, keep_prefix,
+                    functools.partial(self._finish_build, task, echo, exc))
+
+        finally:
+            # Wait for any outstanding builds (e.g., if the explicit package
+            # failed) so no child process outlives the installer.
+            pool.close()
+            pool.join()
+
     def install(self, **kwargs):
         """
         Install the package and/or associated dependencies.
@@ -1383,6 +1794,7 @@ def install(self, **kwargs):
         keep_prefix = kwargs.get('keep_prefix', False)
         keep_stage = kwargs.get('keep_stage', False)
         restage = kwargs.get('restage', False)
+        concurrent_builds = kwargs.pop('concurrent_builds', 1) or 1
 
         # install_package defaults True and is popped so that dependencies are
         # always installed regardless of whether the root was installed
@@ -1401,154 +1813,30 @@ def install(self, **kwargs):
         # Initialize the build task queue
         self._init_queue(install_deps, install_package)
 
+        # Download the sources of all the packages to be built up front
+        if not (kwargs.get('cache_only', False) or kwargs.get('fake', False)):
+            prefetch_sources([task.pkg for pkg_id, task in
+                              self.build_tasks.items()
+                              if pkg_id not in self.installed],
+                             kwargs.get('use_cache', True))
+
         # Proceed with the installation
-        while self.build_pq:
-            task = self._pop_task()
-            if task is None:
-                continue
+        if concurrent_builds > 1:
+            self._install_concurrently(concurrent_builds, **kwargs)
 
-            pkg, spec = task.pkg, task.pkg.spec
-            pkg_id = package_id(pkg)
-            tty.verbose('Processing {0}: task={1}'.format(pkg_id, task))
-
-            # Ensure that the current spec has NO uninstalled dependencies,
-            # which is assumed to be reflected directly in its priority.
-            #
-            # If the spec has uninstalled dependencies, then there must be
-            # a bug in the code (e.g., priority queue or uninstalled
-            # dependencies handling).  So terminate under the assumption that
-            # all subsequent tasks will have non-zero priorities or may be
-            # dependencies of this task.
-            if task.priority != 0:
-                tty.error('Detected uninstalled dependencies for {0}: {1}'
-                          .format(pkg_id, task.uninstalled_deps))
-                dep_str = 'dependencies' if task.priority > 1 else 'dependency'
-                raise InstallError(
-                    'Cannot proceed with {0}: {1} uninstalled {2}: {3}'
-                    .format(pkg_id, task.priority, dep_str,
-                            ','.join(task.uninstalled_deps)))
-
-            # Skip the installation if the spec is not being installed locally
-            # (i.e., if external or upstream) BUT flag it as installed since
-            # some package likely depends on it.
-            if pkg_id != self.pkg_id:
-                not_local = _handle_external_and_upstream(pkg, False)
-                if not_local:
-                    self._update_installed(task)
-                    _print_installed_pkg(pkg.prefix)
+        else:
+            while self.build_pq:
+                task = self._pop_task()
+                if task is None:
                     continue
 
-            # Flag a failed spec.  Do not need an (install) prefix lock since
-            # assume using a separate (failed) prefix lock file.
-            if pkg_id in self.failed or spack.store.db.prefix_failed(spec):
-                tty.warn('{0} failed to install'.format(pkg_id))
-                self._update_failed(task)
-                continue
-
-            # Attempt to get a write lock.  If we can't get the lock then
-            # another process is likely (un)installing the spec or has
-            # determined the spec has already been installed (though the
-            # other process may be hung).
-            ltype, lock = self._ensure_locked('write', pkg)
-            if lock is None:
-                # Attempt to get a read lock instead.  If this fails then
-                # another process has a write lock so must be (un)installing
-                # the spec (or that process is hung).
-                ltype, lock = self._ensure_locked('read', pkg)
-
-            # Requeue the spec if we cannot get at least a read lock so we
-            # can check the status presumably established by another process
-            # -- failed, installed, or uninstalled -- on the next pass.
-            if lock is None:
-                self._requeue_task(task)
-                continue
-
-            # Determine state of installation artifacts and adjust accordingly.
-            self._prepare_for_install(task, keep_prefix, keep_stage,
-                                      restage)
-
-            # Flag an already installed package
-            if pkg_id in self.installed:
-                # Downgrade to a read lock to preclude other processes from
-                # uninstalling the package until we're done installing its
-                # dependents.
-                ltype, lock = self._ensure_locked('read', pkg)
-                if lock is not None:
-                    self._update_installed(task)
-                    _print_installed_pkg(pkg.prefix)
-
-                    # It's an already installed compiler, add it to the config
-                    if task.compiler:
-                        spack.compilers.add_compilers_to_config(
-                            spack.compilers.find_compilers([pkg.spec.prefix]))
-
-                else:
-                    # At this point we've failed to get a write or a read
-                    # lock, which means another process has taken a write
-                    # lock between our releasing the write and acquiring the
-                    # read.
-                    #
-                    # Requeue the task so we can re-check the status
-                    # established by the other process -- failed, installed,
-                    # or uninstalled -- on the next pass.
-                    self.installed.remove(pkg_id)
-                    self._requeue_task(task)
-                continue
-
-            # Having a read lock on an uninstalled pkg may mean another
-            # process completed an uninstall of the software between the
-            # time we failed to acquire the write lock and the time we
-            # took the read lock.
-            #
-            # Requeue the task so we can check the status presumably
-            # established by the other process -- failed, installed, or
-            # uninstalled -- on the next pass.
-            if ltype == 'read':
-                self._requeue_task(task)
-                continue
-
-            # Proceed with the installation since we have an exclusive write
-            # lock on the package.
-            try:
-                self._install_task(task, **kwargs)
-                self._update_installed(task)
-
-                # If we installed then we should keep the prefix
-                stop_before_phase = getattr(pkg, 'stop_before_phase', None)
-                last_phase = getattr(pkg, 'last_phase', None)
-                keep_prefix = keep_prefix or \
-                    (stop_before_phase is None and last_phase is None)
-
-            except spack.directory_layout.InstallDirectoryAlreadyExistsError:
-                tty.debug("Keeping existing install prefix in place.")
-                self._update_installed(task)
-                raise
+                if not self._ready_to_build(task, keep_prefix, keep_stage,
+                                            restage):
+                    continue
 
-            except (Exception, KeyboardInterrupt, SystemExit) as exc:
-                # Assuming best effort installs so suppress the exception and
-                # mark as a failure UNLESS this is the explicit package.
-                err = 'Failed to install {0} due to {1}: {2}'
-                tty.error(err.format(pkg.name, exc.__class__.__name__,
-                          str(exc)))
-                self._update_failed(task, True, exc)
-
-                if pkg_id == self.pkg_id:
-                    raise
-
-            finally:
-                # Remove the install prefix if anything went wrong during
-                # install.
-                if not keep_prefix:
-                    pkg.remove_prefix()
-
-                # The subprocess *may* have removed the build stage. Mark it
-                # not created so that the next time pkg.stage is invoked, we
-                # check the filesystem for it.
-                pkg.stage.created = False
-
-            # Perform basic task cleanup for the installed spec to
-            # include downgrading the write to a read lock
-            self._cleanup_task(pkg)
+                self._complete_task(
+                    task, keep_prefix,
+                    functools.partial(self._install_task, task, **kwargs))
 
         # Cleanup, which includes releasing all of the read locks
         self._cleanup_all_tasks()
@@ -10,6 +10,7 @@
 """
 from __future__ import print_function
 
+import atexit
 import sys
 import re
 import os
@@ -36,6 +37,7 @@
 import spack.repo
 import spack.store
 import spack.util.debug
+import spack.util.lock
 import spack.util.path
 import spack.util.executable as exe
 from spack.error import SpackError
@@ -464,6 +466,21 @@ def setup_main_options(args):
     # when to use color (takes always, auto, or never)
     color.set_color_when(args.color)
 
+    # record how long this process waited for its locks, if asked to
+    lock_stats_dir = spack.util.lock.lock_stats_dir()
+    if lock_stats_dir:
+        atexit.register(write_lock_stats, lock_stats_dir)
+
+
+def write_lock_stats(directory):
+    """Write the statistics of the locks taken by this process to
+    ``directory`` (registered to run at exit)."""
+    try:
+        spack.util.lock.write_lock_stats(directory)
+    except (IOError, OSError) as e:
+        tty.warn('Could not write lock statistics to {0}: {1}'
+                 .format(directory, str(e)))
+
 
 def allows_unknown_args(command):
     """Implements really simple argument injection for unknown arguments.
@@ -601,6 +618,24 @@ def _profile_wrapper(command, parser, args, unknown_args):
         stats = pstats.Stats(pr)
         stats.sort_stats(*sortby)
         stats.print_stats(nlines)
+        print_config_cache_stats()
+
+
+def print_config_cache_stats():
+    """Print how many configuration sections were read from the cache of
+    merged sections, to check its hit rate when profiling."""
+    cfg = spack.config.config
+    sections = sorted(set(cfg.cache_hits) | set(cfg.cache_misses))
+    if not sections:
+        return
+
+    print('Merged configuration sections:')
+    print('    {0:<12} {1:>8} {2:>8} {3:>9}'.format(
+        'section', 'hits', 'misses', 'hit rate'))
+    for section in sections:
+        hits, misses = cfg.cache_hits[section], cfg.cache_misses[section]
+        print('    {0:<12} {1:>8} {2:>8} {3:>8.1f}%'.format(
+            section, hits, misses, 100.0 * hits / (hits + misses)))
 
 
 def print_setup_info(*info):
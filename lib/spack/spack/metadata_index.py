@@ -0,0 +1,208 @@
+# Copyright 2013-2020 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+"""Index of the metadata declared by the packages of a repository.
+
+The versions, variants, dependencies, virtual packages provided, conflicts
+and URLs of a package are declared with directives, but reading them
+requires importing its ``package.py`` file. The ``MetadataIndex`` records
+them for all the packages of a repository when the repository is indexed
+(see ``spack.repo.RepoIndex``), so that commands listing many packages
+read a single file instead of importing every package.
+"""
+import re
+import textwrap
+
+from six import StringIO, string_types
+
+try:
+    from collections.abc import Mapping  # novm
+except ImportError:
+    from collections import Mapping
+
+import spack.repo
+import spack.util.spack_json as sjson
+from spack.version import Version
+
+#: Attributes of package classes with the URLs of the package
+url_attributes = ('homepage', 'url', 'list_url', 'git', 'hg', 'svn')
+
+#: Arguments of the ``version`` directive recorded in the index (checksums
+#: are left out, as they make most of the arguments of most versions)
+version_attributes = ('preferred', 'deprecated', 'url', 'git', 'tag',
+                      'branch', 'commit', 'submodules', 'expand',
+                      'extension')
+
+
+def _plain(value):
+    """Value with a JSON representation: lists, dicts, strings, numbers and
+    booleans are kept, anything else is converted to a string."""
+    if value is None or isinstance(value, (bool, int, float, string_types)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    if isinstance(value, dict):
+        return dict((str(k), _plain(v)) for k, v in value.items())
+    return str(value)
+
+
+def package_metadata(pkg_class):
+    """Dictionary with the metadata declared by a package class."""
+    versions = {}
+    for version, args in pkg_class.versions.items():
+        versions[str(version)] = dict(
+            (k, _plain(v)) for k, v in args.items()
+            if k in version_attributes)
+
+    variants = {}
+    for name, variant in pkg_class.variants.items():
+        values = variant.values
+        variants[name] = {
+            'default': _plain(variant.default),
+            'description': variant.description,
+            'values': None if values is None else _plain(tuple(values)),
+            'multi': variant.multi,
+        }
+
+    dependencies = {}
+    for name, conditions in pkg_class.dependencies.items():
+        dependencies[name] = [
+            [str(when), sorted(dep.type)]
+            for when, dep in conditions.items()]
+
+    provided = {}
+    for virtual, whens in pkg_class.provided.items():
+        provided[str(virtual)] = sorted(str(w) for w in whens)
+
+    conflicts = {}
+    for conflict, whens in pkg_class.conflicts.items():
+        conflicts[str(conflict)] = [[str(w), msg] for w, msg in whens]
+
+    metadata = {
+        'namespace': pkg_class.namespace,
+        'description': pkg_class.__doc__,
+        'maintainers': list(getattr(pkg_class, 'maintainers', [])),
+        'versions': versions,
+        'variants': variants,
+        'dependencies': dependencies,
+        'provided': provided,
+        'conflicts': conflicts,
+    }
+    for attr in url_attributes:
+        metadata[attr] = _plain(getattr(pkg_class, attr, None))
+    return metadata
+
+
+class PackageMetadata(object):
+    """Metadata of a package, read from a ``MetadataIndex``.
+
+    Provides the same attributes as package classes for the metadata it
+    records (``versions``, ``homepage``, ``maintainers``, ...), with
+    strings in place of specs in conditions.
+    """
+
+    def __init__(self, name, metadata):
+        self.name = name
+        self.metadata = metadata
+
+    def __getattr__(self, attr):
+        if attr in url_attributes or attr in (
+                'namespace', 'maintainers', 'variants', 'provided',
+                'conflicts', 'dependencies'):
+            return self.metadata[attr]
+        raise AttributeError(attr)
+
+    @property
+    def fullname(self):
+        return '{0}.{1}'.format(self.namespace, self.name)
+
+    @property
+    def description(self):
+        """Docstring of the package class."""
+        return self.metadata['description']
+
+    @property
+    def versions(self):
+        """Dictionary mapping versions to the arguments of their
+        ``version`` directive, without checksums."""
+        return dict((Version(v), args)
+                    for v, args in self.metadata['versions'].items())
+
+    def dependencies_of_type(self, *deptypes):
+        """Get dependencies that can possibly have these deptypes.
+
+        Returns:
+            (dict) mapping each dependency to its conditions
+        """
+        return dict(
+            (name, [when for when, types in conds])
+            for name, conds in self.dependencies.items()
+            if any(dt in types for when, types in conds for dt in deptypes))
+
+    def format_doc(self, **kwargs):
+        """Wrap doc string at 72 characters and format nicely"""
+        indent = kwargs.get('indent', 0)
+
+        if not self.description:
+            return ""
+
+        doc = re.sub(r'\s+', ' ', self.description)
+        lines = textwrap.wrap(doc, 72)
+        results = StringIO()
+        for line in lines:
+            results.write((" " * indent) + line + "\n")
+        return results.getvalue()
+
+
+class MetadataIndex(Mapping):
+    """Maps the names of packages to their ``PackageMetadata``."""
+
+    def __init__(self):
+        self._packages = {}
+
+    def to_json(self, stream):
+        sjson.dump({'packages': self._packages}, stream)
+
+    @staticmethod
+    def from_json(stream):
+        d = sjson.load(stream)
+
+        r = MetadataIndex()
+        r._packages.update(d['packages'])
+        return r
+
+    def __getitem__(self, pkg_name):
+        return PackageMetadata(pkg_name, self._packages[pkg_name])
+
+    def __iter__(self):
+        return iter(self._packages)
+
+    def __len__(self):
+        return len(self._packages)
+
+    def merge(self, other):
+        """Merge another metadata index into this one.
+
+        Args:
+            other (MetadataIndex): metadata index to be merged
+        """
+        self._packages.update(other._packages)
+
+    def remove_package(self, pkg_name):
+        """Removes a package from the index.
+
+        Args:
+            pkg_name (str): name of the package to be removed from the index
+        """
+        self._packages.pop(pkg_name.split('.')[-1], None)
+
+    def update_package(self, pkg_name):
+        """Updates the metadata of a package in the index.
+
+        Args:
+            pkg_name (str): name of the package to be updated in the index
+        """
+        # subclasses of other packages may have the name of their parent
+        pkg_class = spack.repo.path.get_pkg_class(pkg_name)
+        self._packages[pkg_name.split('.')[-1]] = package_metadata(pkg_class)
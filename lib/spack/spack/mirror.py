@@ -16,6 +16,8 @@
 import traceback
 import os.path
 import operator
+import functools
+import multiprocessing.pool
 
 import six
 
@@ -34,6 +36,7 @@
 import spack.config
 import spack.error
 import spack.url as url
+import spack.fetch_pipeline
 import spack.fetch_strategy as fs
 import spack.util.spack_json as sjson
 import spack.util.spack_yaml as syaml
@@ -401,10 +404,13 @@ def get_matching_versions(specs, num_versions=1):
     return matching
 
 
-def create(path, specs, skip_unstable_versions=False):
+def create(path, specs, skip_unstable_versions=False, jobs=None):
     """Create a directory to be used as a spack mirror, and fill it with
     package archives.
 
+    Archives already in the mirror are not fetched again, so running this
+    again with the same arguments resumes an interrupted mirror creation.
+
     Arguments:
         path: Path to create a mirror directory hierarchy in.
         specs: Any package versions matching these specs will be added \
@@ -412,6 +418,8 @@ def create(path, specs, skip_unstable_versions=False):
         skip_unstable_versions: if true, this skips adding resources when
             they do not have a stable archive checksum (as determined by
             ``fetch_strategy.stable_target``)
+        jobs (int or None): maximum number of specs added at the same time
+            (default: the ``config:fetch_jobs`` setting)
 
     Return Value:
         Returns a tuple of lists: (present, mirrored, error)
@@ -448,6 +456,11 @@ def create(path, specs, skip_unstable_versions=False):
     mirror_stats = MirrorStats()
 
     # Iterate through packages and download all safe tarballs for each
+    jobs = jobs or spack.fetch_pipeline.default_jobs()
+    if jobs > 1:
+        specs = _add_specs_concurrently(
+            specs, mirror_cache, mirror_stats, jobs)
+
     for spec in specs:
         mirror_stats.next_spec(spec)
         _add_single_spec(spec, mirror_cache, mirror_stats)
@@ -455,6 +468,90 @@ def create(path, specs, skip_unstable_versions=False):
     return mirror_stats.stats()
 
 
+def _archives_and_fetchers(spec):
+    """Return the mirror storage paths of the archives of a spec and of its
+    patches, and the ids of their fetchers, or None if the spec cannot be
+    added to a mirror concurrently with other specs.
+
+    Only archives can be fetched concurrently: the fetch strategies of
+    version control systems change the working directory of the process.
+    Fetchers shared between packages are returned too, as they keep a
+    reference to the stage they fetch into.
+    """
+    pkg = spec.package
+    stages = list(pkg.stage)
+    stages.extend(patch.stage for patch in pkg.all_patches() if patch.stage)
+
+    paths, fetchers = set(), set()
+    for stage in stages:
+        fetcher = stage.default_fetcher
+        if isinstance(fetcher, fs.BundleFetchStrategy):
+            continue
+        if not isinstance(fetcher, fs.URLFetchStrategy):
+            return None
+        paths.add(stage.mirror_paths.storage_path)
+        fetchers.add(id(fetcher))
+    return paths, fetchers
+
+
+def _add_spec_with_own_stats(spec, mirror):
+    stats = MirrorStats()
+    stats.next_spec(spec)
+    _add_single_spec(spec, mirror, stats)
+    return stats
+
+
+def _add_specs_concurrently(specs, mirror, mirror_stats, jobs):
+    """Add specs to a mirror with a pool of threads.
+
+    Specs are added in rounds where no two specs share an archive (by its
+    storage path, derived from the ``mirror_id()`` of its fetcher), so every
+    archive is fetched once: specs that share an archive with another one
+    are deferred to a later round, where they find it in the mirror.
+
+    Arguments:
+        specs (list): specs to add to the mirror
+        mirror (MirrorCache): mirror the specs are added to
+        mirror_stats (MirrorStats): statistics updated with the results of
+            each spec
+        jobs (int): number of threads
+
+    Returns:
+        (list) the specs that have to be added serially
+    """
+    pending, serial = [], []
+    for spec in specs:
+        claims = _archives_and_fetchers(spec)
+        if claims is None:
+            serial.append(spec)
+        else:
+            pending.append((spec, claims))
+
+    add_spec = functools.partial(_add_spec_with_own_stats, mirror=mirror)
+    pool = multiprocessing.pool.ThreadPool(jobs)
+    try:
+        while pending:
+            batch, deferred = [], []
+            claimed_paths, claimed_fetchers = set(), set()
+            for spec, (paths, fetchers) in pending:
+                if paths & claimed_paths or fetchers & claimed_fetchers:
+                    deferred.append((spec, (paths, fetchers)))
+                else:
+                    claimed_paths |= paths
+                    claimed_fetchers |= fetchers
+                    batch.append(spec)
+
+            # Results are merged by this thread only, as they arrive
+            for stats in pool.imap_unordered(add_spec, batch):
+                mirror_stats.merge(stats)
+            pending = deferred
+    finally:
+        pool.close()
+        pool.join()
+
+    return serial
+
+
 class MirrorStats(object):
     def __init__(self):
         self.present = {}
@@ -495,6 +592,14 @@ def added(self, resource):
     def error(self):
         self.errors.add(self.current_spec)
 
+    def merge(self, other):
+        """Add the statistics of the specs tallied by another MirrorStats
+        object to these ones."""
+        other._tally_current_spec()
+        self.present.update(other.present)
+        self.new.update(other.new)
+        self.errors |= other.errors
+
 
 def _add_single_spec(spec, mirror, mirror_stats):
     tty.msg("Adding package {pkg} to mirror".format(
@@ -31,17 +31,21 @@
 import collections
 import copy
 import datetime
+import hashlib
 import inspect
+import multiprocessing
 import os.path
 import re
 
 import llnl.util.filesystem
+import llnl.util.lang
 import llnl.util.tty as tty
 import spack.build_environment as build_environment
 import spack.error
 import spack.paths
 import spack.schema.environment
 import spack.projections as proj
+import spack.spec
 import spack.tengine as tengine
 import spack.util.environment
 import spack.util.file_permissions as fp
@@ -714,6 +718,29 @@ def verbose(self):
         return self.conf.verbose
 
 
+#: Times at which module files are created (see ``BaseContext.timestamp``)
+_timestamp_re = re.compile(r'\d{4}-\d\d-\d\d \d\d:\d\d:\d\d(\.\d+)?')
+
+
+def content_hash(text):
+    """Hash of the content of a module file with the given text, apart from
+    the time it was created."""
+    text = _timestamp_re.sub('', text)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+@llnl.util.lang.memoized
+def _make_template_environment(dirs):
+    return tengine.make_environment(list(dirs))
+
+
+def template_environment():
+    """Returns the environment used to render module files, shared by all
+    the module files whose templates are in the same directories (so that
+    templates are compiled once)."""
+    return _make_template_environment(tuple(tengine.default_template_dirs()))
+
+
 class BaseModuleFileWriter(object):
     def __init__(self, spec):
         self.spec = spec
@@ -756,44 +783,17 @@ def _get_template(self):
         # ... and return the first match
         return choices.pop(0)
 
-    def write(self, overwrite=False):
-        """Writes the module file.
+    def render(self):
+        """Renders the module file.
 
-        Args:
-            overwrite (bool): if True it is fine to overwrite an already
-                existing file. If False the operation is skipped an we print
-                a warning to the user.
+        Returns:
+            (str) the text of the module file
         """
-        # Return immediately if the module is blacklisted
-        if self.conf.blacklisted:
-            msg = '\tNOT WRITING: {0} [BLACKLISTED]'
-            tty.debug(msg.format(self.spec.cshort_spec))
-            return
-
-        # Print a warning in case I am accidentally overwriting
-        # a module file that is already there (name clash)
-        if not overwrite and os.path.exists(self.layout.filename):
-            message = 'Module file already exists : skipping creation\n'
-            message += 'file : {0.filename}\n'
-            message += 'spec : {0.spec}'
-            tty.warn(message.format(self.layout))
-            return
-
-        # If we are here it means it's ok to write the module file
-        msg = '\tWRITE: {0} [{1}]'
-        tty.debug(msg.format(self.spec.cshort_spec, self.layout.filename))
-
-        # If the directory where the module should reside does not exist
-        # create it
-        module_dir = os.path.dirname(self.layout.filename)
-        if not os.path.exists(module_dir):
-            llnl.util.filesystem.mkdirp(module_dir)
-
         # Get the template for the module
         template_name = self._get_template()
         import jinja2
         try:
-            env = tengine.make_environment()
+            env = template_environment()
             template = env.get_template(template_name)
         except jinja2.TemplateNotFound:
             # If the template was not found raise an exception with a little
@@ -821,7 +821,71 @@ def write(self, overwrite=False):
         context.update(conf_update)
 
         # Render the template
-        text = template.render(context)
+        return template.render(context)
+
+    def needs_update(self, text):
+        """Whether the module file has to be written to contain ``text``,
+        i.e. it does not exist or its content has a different hash."""
+        filename = self.layout.filename
+        if not os.path.exists(filename):
+            return True
+        with open(filename, 'rb') as f:
+            current = f.read().decode('utf-8', 'replace')
+        return content_hash(current) != content_hash(text)
+
+    def write(self, overwrite=False):
+        """Writes the module file.
+
+        Args:
+            overwrite (bool): if True it is fine to overwrite an already
+                existing file. If False the operation is skipped an we print
+                a warning to the user.
+        """
+        # Return immediately if the module is blacklisted
+        if self.conf.blacklisted:
+            msg = '\tNOT WRITING: {0} [BLACKLISTED]'
+            tty.debug(msg.format(self.spec.cshort_spec))
+            return
+
+        # Print a warning in case I am accidentally overwriting
+        # a module file that is already there (name clash)
+        if not overwrite and os.path.exists(self.layout.filename):
+            message = 'Module file already exists : skipping creation\n'
+            message += 'file : {0.filename}\n'
+            message += 'spec : {0.spec}'
+            tty.warn(message.format(self.layout))
+            return
+
+        self.write_text(self.render())
+
+    def write_text(self, text, check=True):
+        """Writes the rendered text of the module file, unless the file
+        already has this content: module files that do not change are
+        left untouched, permissions included.
+
+        Args:
+            text (str): text of the module file
+            check (bool): if False, ``text`` is known to differ from the
+                content of the module file
+
+        Returns:
+            (bool) True if the module file was written
+        """
+        if check and not self.needs_update(text):
+            msg = '\tUNCHANGED: {0} [{1}]'
+            tty.debug(msg.format(self.spec.cshort_spec, self.layout.filename))
+            return False
+
+        # If we are here it means it's ok to write the module file
+        msg = '\tWRITE: {0} [{1}]'
+        tty.debug(msg.format(self.spec.cshort_spec, self.layout.filename))
+
+        # If the directory where the module should reside does not exist
+        # create it
+        module_dir = os.path.dirname(self.layout.filename)
+        if not os.path.exists(module_dir):
+            llnl.util.filesystem.mkdirp(module_dir)
+
         # Write it to file
         with open(self.layout.filename, 'w') as f:
             f.write(text)
@@ -829,6 +893,7 @@ def write(self, overwrite=False):
         # Set the file permissions of the module to match that of the package
         if os.path.exists(self.layout.filename):
             fp.set_permissions_by_spec(self.layout.filename, self.spec)
+        return True
 
     def remove(self):
         """Deletes the module file."""
@@ -844,6 +909,93 @@ def remove(self):
                 pass
 
 
+#: Minimum number of module files for which rendering is shared by
+#: several processes
+parallel_write_threshold = 100
+
+
+def _render(writer):
+    """Render a module file, returning its text (None if the module file
+    already has this content) and an error message if it failed."""
+    try:
+        text = writer.render()
+        return (text if writer.needs_update(text) else None), None
+    except Exception as e:
+        tty.debug(e)
+        return None, str(e)
+
+
+def _render_in_pool(args):
+    """Render some module files in a worker of a pool (see ``_render``)."""
+    writer_cls, spec_dicts = args
+    results = []
+    for spec_dict in spec_dicts:
+        try:
+            spec = spack.spec.Spec.from_dict(spec_dict)
+            spec._mark_concrete()
+            writer = writer_cls(spec)
+        except Exception as e:
+            results.append((None, str(e)))
+            continue
+        results.append(_render(writer))
+    return results
+
+
+def write_module_files(writers, jobs=None):
+    """Writes the module files of many specs.
+
+    Module contexts are computed and templates rendered by a pool of
+    processes, and only the module files whose content changed are
+    written.
+
+    Args:
+        writers (list): writers of the module files, all of the same type
+        jobs (int or None): number of processes rendering module files
+            (default: one per CPU)
+
+    Returns:
+        (tuple) lists of the writers whose module file was written, and
+        of those whose module file was unchanged, and list of writers
+        that failed with their error messages
+    """
+    jobs = min(jobs or multiprocessing.cpu_count(), len(writers))
+    if jobs <= 1 or len(writers) < parallel_write_threshold:
+        results = [_render(x) for x in writers]
+    else:
+        # a few chunks per process, to balance the load
+        size = -(-len(writers) // (jobs * 4))
+        chunks = [writers[i:i + size] for i in range(0, len(writers), size)]
+
+        tty.debug('Rendering {0} module files with {1} processes'.format(
+            len(writers), jobs))
+        pool = multiprocessing.Pool(jobs)
+        try:
+            results = pool.map(
+                _render_in_pool,
+                [(type(chunk[0]), [x.spec.to_dict() for x in chunk])
+                 for chunk in chunks],
+                chunksize=1)
+        finally:
+            pool.terminate()
+            pool.join()
+        results = [r for chunk in results for r in chunk]
+
+    written, unchanged, errors = [], [], []
+    for writer, (text, error) in zip(writers, results):
+        if error:
+            errors.append((writer, error))
+        elif text is None:
+            unchanged.append(writer)
+        else:
+            try:
+                writer.write_text(text, check=False)
+                written.append(writer)
+            except Exception as e:
+                tty.debug(e)
+                errors.append((writer, str(e)))
+    return written, unchanged, errors
+
+
 class ModulesError(spack.error.SpackError):
     """Base error for modules."""
 
@@ -361,7 +361,8 @@ def patch_for_package(self, sha256, pkg):
         patch_dict['sha256'] = sha256
         return from_dict(patch_dict)
 
-    def update_package(self, pkg_fullname):
+    def remove_package(self, pkg_fullname):
+        """Remove the patches of a package from the index."""
         # remove this package from any patch entries that reference it.
         empty = []
         for sha256, package_to_patch in self.index.items():
@@ -380,6 +381,9 @@ def update_package(self, pkg_fullname):
         for sha256 in empty:
             del self.index[sha256]
 
+    def update_package(self, pkg_fullname):
+        self.remove_package(pkg_fullname)
+
         # update the index with per-package patch indexes
         pkg = spack.repo.get(pkg_fullname)
         partial_index = self._index_patches(pkg)
@@ -2,6 +2,9 @@
 # Spack Project Developers. See the top-level COPYRIGHT file for details.
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
+import functools
+import mmap
+import multiprocessing
 import os
 import platform
 import re
@@ -15,7 +18,9 @@
 import spack.cmd
 import spack.repo
 import spack.spec
+import spack.util.elf as elf
 import spack.util.executable as executable
+import spack.util.file_type
 
 
 class InstallRootStringError(spack.error.SpackError):
@@ -101,7 +106,8 @@ def _patchelf():
 def _elf_rpaths_for(path):
     """Return the RPATHs for an executable or a library.
 
-    The RPATHs are obtained by ``patchelf --print-rpath PATH``.
+    The RPATHs are read from the dynamic section of the ELF object. If it
+    cannot be parsed they are obtained by ``patchelf --print-rpath PATH``.
 
     Args:
         path (str): full path to the executable or library
@@ -109,6 +115,11 @@ def _elf_rpaths_for(path):
     Return:
         RPATHs as a list of strings.
     """
+    try:
+        return elf.get_rpaths(path)
+    except (elf.ElfParsingError, IOError, UnicodeDecodeError) as e:
+        tty.debug('Cannot read the RPATHs of {0}: {1}'.format(path, str(e)))
+
     # If we're relocating patchelf itself, use it
     patchelf_path = path if path.endswith("/bin/patchelf") else _patchelf()
     patchelf = executable.Executable(patchelf_path)
@@ -390,7 +401,8 @@ def _set_elf_rpaths(target, rpaths):
     """Replace the original RPATH of the target with the paths passed
     as arguments.
 
-    This function uses ``patchelf`` to set RPATHs.
+    The RPATH is rewritten in place if the new value fits in the space of
+    the old one, otherwise this function uses ``patchelf`` to set RPATHs.
 
     Args:
         target: target executable. Must be an ELF object.
@@ -398,8 +410,14 @@ def _set_elf_rpaths(target, rpaths):
 
     Returns:
         A string concatenating the stdout and stderr of the call
-        to ``patchelf``
+        to ``patchelf`` (empty if it was not needed)
     """
+    try:
+        if elf.set_rpaths(target, rpaths):
+            return ''
+    except (elf.ElfParsingError, IOError) as e:
+        tty.debug('Cannot set the RPATHs of {0}: {1}'.format(target, str(e)))
+
     # Join the paths using ':' as a separator
     rpaths_str = ':'.join(rpaths)
 
@@ -449,6 +467,175 @@ def needs_text_relocation(m_type, m_subtype):
     return m_type == 'text'
 
 
+#: Minimum number of files for which relocation is spread over processes
+_PARALLEL_RELOCATION_THRESHOLD = 64
+
+
+def _text_prefix_regex(prefix_to_prefix):
+    """Return a regular expression matching any of the old prefixes in text.
+
+    An old prefix only matches at the beginning of a path, i.e. if it is
+    preceded by a flag (like ``-L``) or by characters not legal in a path,
+    but not if it is preceded by other components of a path. The groups of
+    a match are: the flag, the old prefix and the rest of the path.
+
+    Args:
+        prefix_to_prefix (dict): maps the old prefixes to the new ones
+    """
+    # Longest prefixes first, so that the most specific one wins
+    old_prefixes = sorted(prefix_to_prefix, key=len, reverse=True)
+    alternatives = b'|'.join(re.escape(p.encode('utf-8'))
+                             for p in old_prefixes)
+    return re.compile(
+        b'(?<![\\w\\-_/])([\\w\\-_]*?)(%s)([\\w\\-_/]*)' % alternatives)
+
+
+def _binary_prefix_regex(prefix_to_prefix):
+    """Return a regular expression matching any of the old prefixes
+    anywhere in a binary file.
+
+    Args:
+        prefix_to_prefix (dict): maps the old prefixes to the new ones
+    """
+    old_prefixes = sorted(prefix_to_prefix, key=len, reverse=True)
+    return re.compile(b'|'.join(re.escape(p.encode('utf-8'))
+                                for p in old_prefixes))
+
+
+def _encode_mapping(prefix_to_prefix):
+    return dict((old.encode('utf-8'), new.encode('utf-8'))
+                for old, new in prefix_to_prefix.items())
+
+
+def _relocate_text_file(filename, regex, mapping):
+    """Replace all the old prefixes matched by ``regex`` in a text file
+    in a single pass.
+
+    The file is memory-mapped to check for matches and only rewritten if
+    any old prefix is found.
+
+    Args:
+        filename (str): target text file (utf-8 encoded)
+        regex: compiled expression from ``_text_prefix_regex()``
+        mapping (dict): maps the old prefixes to the new ones, as bytes
+
+    Returns:
+        (bool) True if the file was modified, False otherwise
+    """
+    def replace(match):
+        return match.group(1) + mapping[match.group(2)] + match.group(3)
+
+    with open(filename, 'rb+') as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped (and contain nothing to replace)
+            return False
+
+        try:
+            if not regex.search(mm):
+                return False
+            data = mm[:]
+        finally:
+            mm.close()
+
+        ndata = regex.sub(replace, data)
+        if ndata == data:
+            return False
+
+        f.seek(0)
+        f.write(ndata)
+        f.truncate()
+    return True
+
+
+def _relocate_binary_file(filename, regex, mapping):
+    """Replace all the old prefixes matched by ``regex`` in a binary file
+    in a single pass.
+
+    New prefixes are padded with ``os.sep`` to the length of the old ones
+    (see ``_binary_mapping()``) and written in place in a memory map of the
+    file, so only the changed pages are written back.
+
+    Args:
+        filename (str): target binary file
+        regex: compiled expression from ``_binary_prefix_regex()``
+        mapping (dict): maps the old prefixes to padded new ones, as bytes
+
+    Returns:
+        (bool) True if the file was modified, False otherwise
+    """
+    with open(filename, 'rb+') as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0)
+        except ValueError:
+            return False
+
+        try:
+            original_len = len(mm)
+            changes = [(m.start(), m.group()) for m in regex.finditer(mm)]
+            changes = [(start, mapping[old]) for start, old in changes
+                       if mapping[old] != old]
+            for start, new in changes:
+                mm[start:start + len(new)] = new
+            if changes:
+                mm.flush()
+            if len(mm) != original_len:
+                raise BinaryStringReplacementError(
+                    filename, original_len, len(mm))
+        finally:
+            mm.close()
+
+    return bool(changes)
+
+
+def _binary_mapping(prefix_to_prefix):
+    """Return the mapping of old prefixes to new prefixes padded with
+    ``os.sep`` to the same length, for the prefixes that can be replaced
+    in binaries (i.e. new prefixes not longer than the old ones).
+
+    Args:
+        prefix_to_prefix (dict): maps the old prefixes to the new ones
+    """
+    mapping = {}
+    for old, new in _encode_mapping(prefix_to_prefix).items():
+        padding = len(old) - len(new)
+        if padding >= 0:
+            mapping[old] = os.sep.encode('utf-8') * padding + new
+    return mapping
+
+
+def _relocate_files(worker, path_names, regex, mapping):
+    """Apply a single pass relocation function to many files.
+
+    Large batches of files are spread over a pool of processes, since
+    regular expression matching holds the GIL.
+
+    Args:
+        worker (callable): either ``_relocate_text_file`` or
+            ``_relocate_binary_file``
+        path_names (list): files to be relocated
+        regex: compiled expression matching the old prefixes
+        mapping (dict): maps the old prefixes to the new ones, as bytes
+
+    Returns:
+        (int) the number of modified files
+    """
+    relocate_file = functools.partial(worker, regex=regex, mapping=mapping)
+    nprocs = min(multiprocessing.cpu_count(),
+                 len(path_names) // _PARALLEL_RELOCATION_THRESHOLD)
+    if nprocs <= 1:
+        return sum(1 for path in path_names if relocate_file(path))
+
+    pool = multiprocessing.Pool(nprocs)
+    try:
+        modified = pool.map(relocate_file, path_names)
+    finally:
+        pool.terminate()
+        pool.join()
+    return sum(1 for m in modified if m)
+
+
 def _replace_prefix_text(filename, old_dir, new_dir):
     """Replace all the occurrences of the old install prefix with a
     new install prefix in text files that are utf-8 encoded.
@@ -458,23 +645,9 @@ def _replace_prefix_text(filename, old_dir, new_dir):
         old_dir (str): directory to be searched in the file
         new_dir (str): substitute for the old directory
     """
-    with open(filename, 'rb+') as f:
-        data = f.read()
-        f.seek(0)
-        # Replace old_dir with new_dir if it appears at the beginning of a path
-        # Negative lookbehind for a character legal in a path
-        # Then a match group for any characters legal in a compiler flag
-        # Then old_dir
-        # Then characters legal in a path
-        # Ensures we only match the old_dir if it's precedeed by a flag or by
-        # characters not legal in a path, but not if it's preceeded by other
-        # components of a path.
-        old_bytes = old_dir.encode('utf-8')
-        pat = b'(?<![\\w\\-_/])([\\w\\-_]*?)%s([\\w\\-_/]*)' % old_bytes
-        repl = b'\\1%s\\2' % new_dir.encode('utf-8')
-        ndata = re.sub(pat, repl, data)
-        f.write(ndata)
-        f.truncate()
+    prefix_to_prefix = {old_dir: new_dir}
+    _relocate_text_file(filename, _text_prefix_regex(prefix_to_prefix),
+                        _encode_mapping(prefix_to_prefix))
 
 
 def _replace_prefix_bin(filename, old_dir, new_dir):
@@ -489,31 +662,11 @@ def _replace_prefix_bin(filename, old_dir, new_dir):
         old_dir (str): directory to be searched in the file
         new_dir (str): substitute for the old directory
     """
-    def replace(match):
-        occurances = match.group().count(old_dir.encode('utf-8'))
-        olen = len(old_dir.encode('utf-8'))
-        nlen = len(new_dir.encode('utf-8'))
-        padding = (olen - nlen) * occurances
-        if padding < 0:
-            return data
-        return match.group().replace(
-            old_dir.encode('utf-8'),
-            os.sep.encode('utf-8') * padding + new_dir.encode('utf-8')
-        )
-
-    with open(filename, 'rb+') as f:
-        data = f.read()
-        f.seek(0)
-        original_data_len = len(data)
-        pat = re.compile(old_dir.encode('utf-8'))
-        if not pat.search(data):
-            return
-        ndata = pat.sub(replace, data)
-        if not len(ndata) == original_data_len:
-            raise BinaryStringReplacementError(
-                filename, original_data_len, len(ndata))
-        f.write(ndata)
-        f.truncate()
+    prefix_to_prefix = {old_dir: new_dir}
+    mapping = _binary_mapping(prefix_to_prefix)
+    if mapping:
+        _relocate_binary_file(
+            filename, _binary_prefix_regex(prefix_to_prefix), mapping)
 
 
 def relocate_macho_binaries(path_names, old_layout_root, new_layout_root,
@@ -627,8 +780,9 @@ def relocate_elf_binaries(binaries, orig_root, new_root,
                           new_prefixes, rel, orig_prefix, new_prefix):
     """Relocate the binaries passed as arguments by changing their RPATHs.
 
-    Use patchelf to get the original RPATHs and then replace them with
-    rpaths in the new directory layout.
+    Read the original RPATHs and then replace them with rpaths in the new
+    directory layout. Both are done directly on the ELF objects, with
+    patchelf used only for RPATHs that grow or cannot be parsed.
 
     New RPATHs are determined from a dictionary mapping the prefixes in the
     old directory layout to the prefixes in the new directory layout if the
@@ -765,16 +919,23 @@ def relocate_text(path_names, old_layout_root, new_layout_root,
     """
     Replace old paths with new paths in text files
     including the path the the spack sbang script
+
+    All the prefixes are replaced in a single pass over each file.
     """
     sbangre = '#!/bin/bash %s/bin/sbang' % old_spack_prefix
     sbangnew = '#!/bin/bash %s/bin/sbang' % new_spack_prefix
 
-    for path_name in path_names:
-        _replace_prefix_text(path_name, old_install_prefix, new_install_prefix)
-        for orig_dep_prefix, new_dep_prefix in prefix_to_prefix.items():
-            _replace_prefix_text(path_name, orig_dep_prefix, new_dep_prefix)
-        _replace_prefix_text(path_name, old_layout_root, new_layout_root)
-        _replace_prefix_text(path_name, sbangre, sbangnew)
+    all_prefixes = dict((old, new) for old, new in prefix_to_prefix.items()
+                        if new is not None)
+    all_prefixes[old_install_prefix] = new_install_prefix
+    all_prefixes[old_layout_root] = new_layout_root
+    all_prefixes[sbangre] = sbangnew
+
+    modified = _relocate_files(
+        _relocate_text_file, path_names,
+        _text_prefix_regex(all_prefixes), _encode_mapping(all_prefixes))
+    tty.debug('Relocated {0} of {1} text files'
+              .format(modified, len(path_names)))
 
 
 def relocate_text_bin(path_names, old_layout_root, new_layout_root,
@@ -787,12 +948,22 @@ def relocate_text_bin(path_names, old_layout_root, new_layout_root,
       because this breaks the binary.
       """
     if len(new_install_prefix) <= len(old_install_prefix):
-        for path_name in path_names:
-            for old_dep_prefix, new_dep_prefix in prefix_to_prefix.items():
-                if len(new_dep_prefix) <= len(old_dep_prefix):
-                    _replace_prefix_bin(
-                        path_name, old_dep_prefix, new_dep_prefix)
-            _replace_prefix_bin(path_name, old_spack_prefix, new_spack_prefix)
+        all_prefixes = dict((old, new)
+                            for old, new in prefix_to_prefix.items()
+                            if new is not None)
+        all_prefixes[old_spack_prefix] = new_spack_prefix
+
+        # Prefixes that grew cannot be replaced and are left untouched
+        mapping = _binary_mapping(all_prefixes)
+        if not mapping:
+            return
+
+        prefixes = dict((old.decode('utf-8'), None) for old in mapping)
+        modified = _relocate_files(
+            _relocate_binary_file, path_names,
+            _binary_prefix_regex(prefixes), mapping)
+        tty.debug('Relocated {0} of {1} binary files'
+                  .format(modified, len(path_names)))
     else:
         if len(path_names) > 0:
             raise BinaryTextReplaceError(
@@ -915,18 +1086,15 @@ def is_binary(file):
 def mime_type(file):
     """Returns the mime type and subtype of a file.
 
+    The type is determined from the first few KB of the file, as
+    ``file -b -h --mime-type`` would, without running any subprocess.
+
     Args:
         file: file to be analyzed
 
     Returns:
         Tuple containing the MIME type and subtype
     """
-    file_cmd = executable.Executable('file')
-    output = file_cmd('-b', '-h', '--mime-type', file, output=str, error=str)
-    tty.debug('[MIME_TYPE] {0} -> {1}'.format(file, output.strip()))
-    # In corner cases the output does not contain a subtype prefixed with a /
-    # In those cases add the / so the tuple can be formed.
-    if '/' not in output:
-        output += '/'
-    split_by_slash = output.strip().split('/')
-    return (split_by_slash[0], "/".join(split_by_slash[1:]))
+    m_type, m_subtype = spack.util.file_type.mime_type(file)
+    tty.debug('[MIME_TYPE] {0} -> {1}/{2}'.format(file, m_type, m_subtype))
+    return m_type, m_subtype
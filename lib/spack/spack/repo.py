@@ -8,13 +8,17 @@
 import contextlib
 import errno
 import functools
+import hashlib
 import inspect
 import itertools
+import multiprocessing
+import multiprocessing.pool
 import os
 import re
 import shutil
 import stat
 import sys
+import time
 import traceback
 import types
 
@@ -33,6 +37,7 @@
 import spack.config
 import spack.caches
 import spack.error
+import spack.metadata_index
 import spack.patch
 import spack.spec
 import spack.util.spack_json as sjson
@@ -114,71 +119,158 @@ class FastPackageChecker(Mapping):
     'package.py' files associated with them.
 
     For each repository a cache is maintained at class level, and shared among
-    all instances referring to it. Update of the global cache is done lazily
-    during instance initialization.
+    all instances referring to it. Update of the global cache is done lazily:
+    the names of the packages are listed during instance initialization, and
+    the files of the packages are only stat'ed when their stats are needed,
+    to check whether the indexes of the repository are up to date.
+
+    The list of package names is stored in the misc cache, and reused as long
+    as the directory of the packages is not modified.
     """
-    #: Global cache, reused by every instance
+    #: Global cache of package names, reused by every instance
+    _names_cache = {}
+
+    #: Global cache of stats, reused by every instance
     _paths_cache = {}
 
+    #: Number of threads stat'ing package files, to overlap the latency of
+    #: network filesystems
+    stat_threads = 16
+
     def __init__(self, packages_path):
         # The path of the repository managed by this instance
         self.packages_path = packages_path
 
         # If the cache we need is not there yet, then build it appropriately
-        if packages_path not in self._paths_cache:
-            self._paths_cache[packages_path] = self._create_new_cache()
+        if packages_path not in self._names_cache:
+            self._names_cache[packages_path] = self._list_packages()
 
         #: Reference to the appropriate entry in the global cache
-        self._packages_to_stats = self._paths_cache[packages_path]
+        self._package_names = self._names_cache[packages_path]
 
-    def _create_new_cache(self):
-        """Create a new cache for packages in a repo.
-
-        The implementation here should try to minimize filesystem
-        calls.  At the moment, it is O(number of packages) and makes
-        about one stat call per package.  This is reasonably fast, and
-        avoids actually importing packages in Spack, which is slow.
+    @property
+    def _packages_to_stats(self):
+        if self.packages_path not in self._paths_cache:
+            self._paths_cache[self.packages_path] = self._create_new_cache()
+        return self._paths_cache[self.packages_path]
+
+    def _names_cache_key(self):
+        path_hash = hashlib.sha1(self.packages_path.encode('utf-8'))
+        return 'package_names/{0}.json'.format(path_hash.hexdigest())
+
+    def _list_packages(self):
+        """List the names of the packages in a repo, reusing the list
+        stored in the misc cache if the packages directory did not change.
         """
-        # Create a dictionary that will store the mapping between a
-        # package name and its stat info
-        cache = {}
-        for pkg_name in os.listdir(self.packages_path):
-            # Skip non-directories in the package root.
-            pkg_dir = os.path.join(self.packages_path, pkg_name)
+        misc_cache = spack.caches.misc_cache
+        key = self._names_cache_key()
+        mtime = os.stat(self.packages_path).st_mtime
 
+        if misc_cache.init_entry(key):
+            try:
+                with misc_cache.read_transaction(key) as f:
+                    data = sjson.load(f)
+                if data['path'] == self.packages_path and \
+                        data['mtime'] == mtime:
+                    # adding a package file to an existing directory does
+                    # not change the mtime of the packages directory
+                    names = set(data['packages'])
+                    names.difference_update(
+                        x for x in data['missing']
+                        if self._stat_package(x) is None)
+                    return names
+            except (IOError, OSError, ValueError, KeyError) as e:
+                tty.debug('Ignoring the list of packages in {0}: {1}'.format(
+                    misc_cache.cache_path(key), str(e)))
+
+        names = set()
+        for pkg_name in os.listdir(self.packages_path):
             # Warn about invalid names that look like packages.
             if not nm.valid_module_name(pkg_name):
                 if not pkg_name.startswith('.'):
                     tty.warn('Skipping package at {0}. "{1}" is not '
                              'a valid Spack module name.'.format(
-                                 pkg_dir, pkg_name))
+                                 os.path.join(self.packages_path, pkg_name),
+                                 pkg_name))
                 continue
+            names.add(pkg_name)
 
-            # Construct the file name from the directory
-            pkg_file = os.path.join(
-                self.packages_path, pkg_name, package_file_name
-            )
+        # Skip directories without a package file. They are kept in the
+        # list for the next runs, which check them again.
+        stats = self._stat_packages(names)
+        missing = names.difference(stats)
+        self._paths_cache[self.packages_path] = stats
 
-            # Use stat here to avoid lots of calls to the filesystem.
+        # The directory could be modified again without a change of its
+        # mtime, within the resolution of the filesystem
+        if time.time() - mtime > 2:
             try:
-                sinfo = os.stat(pkg_file)
-            except OSError as e:
-                if e.errno == errno.ENOENT:
-                    # No package.py file here.
-                    continue
-                elif e.errno == errno.EACCES:
-                    tty.warn("Can't read package file %s." % pkg_file)
-                    continue
-                raise e
-
-            # If it's not a file, skip it.
-            if stat.S_ISDIR(sinfo.st_mode):
-                continue
+                with misc_cache.write_transaction(key) as (old, new):
+                    sjson.dump({'path': self.packages_path, 'mtime': mtime,
+                                'packages': sorted(names),
+                                'missing': sorted(missing)}, new)
+            except (IOError, OSError) as e:
+                tty.debug('Cannot store the list of packages in {0}: {1}'
+                          .format(misc_cache.cache_path(key), str(e)))
+        return set(stats)
+
+    def _stat_package(self, pkg_name):
+        # Construct the file name from the directory
+        pkg_file = os.path.join(
+            self.packages_path, pkg_name, package_file_name
+        )
+
+        # Use stat here to avoid lots of calls to the filesystem.
+        try:
+            sinfo = os.stat(pkg_file)
+        except OSError as e:
+            if e.errno == errno.ENOENT:
+                # No package.py file here.
+                return None
+            elif e.errno == errno.EACCES:
+                tty.warn("Can't read package file %s." % pkg_file)
+                return None
+            raise e
+
+        # If it's not a file, skip it.
+        if stat.S_ISDIR(sinfo.st_mode):
+            return None
+
+        return sinfo
+
+    def _stat_packages(self, pkg_names):
+        """Stat the files of packages, concurrently if there are many."""
+        pkg_names = sorted(pkg_names)
+        nthreads = min(self.stat_threads, len(pkg_names) // 64)
+        if nthreads > 1:
+            pool = multiprocessing.pool.ThreadPool(nthreads)
+            try:
+                chunksize = -(-len(pkg_names) // nthreads)
+                stats = pool.map(
+                    self._stat_package, pkg_names, chunksize=chunksize)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            stats = [self._stat_package(x) for x in pkg_names]
 
-            # If it is a file, then save the stats under the
-            # appropriate key
-            cache[pkg_name] = sinfo
+        return dict((name, sinfo) for name, sinfo in zip(pkg_names, stats)
+                    if sinfo is not None)
+
+    def _create_new_cache(self):
+        """Create a new cache for packages in a repo.
+
+        The implementation here should try to minimize filesystem
+        calls.  At the moment, it is O(number of packages) and makes
+        about one stat call per package.  This is reasonably fast, and
+        avoids actually importing packages in Spack, which is slow.
+        """
+        # Create a dictionary that will store the mapping between a
+        # package name and its stat info
+        cache = self._stat_packages(self._package_names)
 
+        # Packages whose file was removed are not listed anymore
+        self._package_names.intersection_update(cache)
         return cache
 
     def last_mtime(self):
@@ -188,11 +280,14 @@ def last_mtime(self):
     def __getitem__(self, item):
         return self._packages_to_stats[item]
 
+    def __contains__(self, item):
+        return item in self._package_names
+
     def __iter__(self):
-        return iter(self._packages_to_stats)
+        return iter(self._package_names)
 
     def __len__(self):
-        return len(self._packages_to_stats)
+        return len(self._package_names)
 
 
 class TagIndex(Mapping):
@@ -224,6 +319,29 @@ def __iter__(self):
     def __len__(self):
         return len(self._tag_dict)
 
+    def merge(self, other):
+        """Merge another tag index into this one.
+
+        Args:
+            other (TagIndex): tag index to be merged
+        """
+        for tag, pkgs in other._tag_dict.items():
+            pkg_list = self._tag_dict[tag]
+            pkg_list.extend(p for p in pkgs if p not in pkg_list)
+
+    def remove_package(self, pkg_name):
+        """Removes a package from the tag index.
+
+        Args:
+            pkg_name (str): name of the package to be removed from the index
+
+        """
+        # Packages are listed without their namespace
+        pkg_name = pkg_name.split('.')[-1]
+        for pkg_list in self._tag_dict.values():
+            if pkg_name in pkg_list:
+                pkg_list.remove(pkg_name)
+
     def update_package(self, pkg_name):
         """Updates a package in the tag index.
 
@@ -234,9 +352,7 @@ def update_package(self, pkg_name):
         package = path.get(pkg_name)
 
         # Remove the package from the list of packages, if present
-        for pkg_list in self._tag_dict.values():
-            if pkg_name in pkg_list:
-                pkg_list.remove(pkg_name)
+        self.remove_package(pkg_name)
 
         # Add it again under the appropriate tags
         for tag in getattr(package, 'tags', []):
@@ -279,6 +395,16 @@ def read(self, stream):
     def update(self, pkg_fullname):
         """Update the index in memory with information about a package."""
 
+    @abc.abstractmethod
+    def remove(self, pkg_fullname):
+        """Remove the information about a package from the index in memory.
+        """
+
+    @abc.abstractmethod
+    def merge(self, index):
+        """Merge in memory an index of other packages, created by another
+        instance of this indexer."""
+
     @abc.abstractmethod
     def write(self, stream):
         """Write the index to a file object."""
@@ -295,6 +421,12 @@ def read(self, stream):
     def update(self, pkg_fullname):
         self.index.update_package(pkg_fullname)
 
+    def remove(self, pkg_fullname):
+        self.index.remove_package(pkg_fullname)
+
+    def merge(self, index):
+        self.index.merge(index)
+
     def write(self, stream):
         self.index.to_json(stream)
 
@@ -311,6 +443,12 @@ def update(self, pkg_fullname):
         self.index.remove_provider(pkg_fullname)
         self.index.update(pkg_fullname)
 
+    def remove(self, pkg_fullname):
+        self.index.remove_provider(pkg_fullname)
+
+    def merge(self, index):
+        self.index.merge(index)
+
     def write(self, stream):
         self.index.to_json(stream)
 
@@ -336,6 +474,61 @@ def write(self, stream):
     def update(self, pkg_fullname):
         self.index.update_package(pkg_fullname)
 
+    def remove(self, pkg_fullname):
+        self.index.remove_package(pkg_fullname)
+
+    def merge(self, index):
+        self.index.update(index)
+
+
+#: Minimum number of packages to be indexed for the indexing to be shared
+#: by several processes
+parallel_index_threshold = 100
+
+
+def _index_packages_in_pool(args):
+    """Create the indexes of some packages in a worker of a pool.
+
+    Returns the indexes, serialized by their indexers, or None if any
+    package could not be indexed: they are then indexed again by the
+    parent process, which reports the error.
+    """
+    indexer_classes, pkg_fullnames = args
+    try:
+        indexes = {}
+        for name, cls in indexer_classes.items():
+            indexer = cls()
+            indexer.create()
+            for pkg_fullname in pkg_fullnames:
+                indexer.update(pkg_fullname)
+            stream = six.StringIO()
+            indexer.write(stream)
+            indexes[name] = stream.getvalue()
+        return indexes
+    except Exception:
+        return None
+
+
+class MetadataIndexer(Indexer):
+    """Lifecycle methods for the index of package metadata."""
+    def _create(self):
+        return spack.metadata_index.MetadataIndex()
+
+    def read(self, stream):
+        self.index = spack.metadata_index.MetadataIndex.from_json(stream)
+
+    def update(self, pkg_fullname):
+        self.index.update_package(pkg_fullname)
+
+    def remove(self, pkg_fullname):
+        self.index.remove_package(pkg_fullname)
+
+    def merge(self, index):
+        self.index.merge(index)
+
+    def write(self, stream):
+        self.index.to_json(stream)
+
 
 class RepoIndex(object):
     """Container class that manages a set of Indexers for a Repo.
@@ -393,24 +586,101 @@ def _build_all_indexes(self):
         invocations.
 
         """
-        for name, indexer in self.indexers.items():
-            self.indexes[name] = self._build_index(name, indexer)
+        needs_update = set()
+        for name in self.indexers:
+            needs_update.update(self._needs_update(name))
 
-    def _build_index(self, name, indexer):
-        """Determine which packages need an update, and update indexes."""
+        # Each package is loaded once for all the indexes, in parallel when
+        # there are many of them (e.g., after the repository is updated)
+        partial_indexes = {}
+        if len(needs_update) >= parallel_index_threshold:
+            partial_indexes = self._index_packages(sorted(needs_update))
 
-        # Filename of the provider index cache (we assume they're all json)
-        cache_filename = '{0}/{1}-index.json'.format(name, self.namespace)
+        for name, indexer in self.indexers.items():
+            self.indexes[name] = self._build_index(
+                name, indexer, partial_indexes.get(name))
 
-        # Compute which packages needs to be updated in the cache
-        misc_cache = spack.caches.misc_cache
-        index_mtime = misc_cache.mtime(cache_filename)
+    def _cache_filename(self, name):
+        # Filename of the provider index cache (we assume they're all json)
+        return '{0}/{1}-index.json'.format(name, self.namespace)
 
-        needs_update = [
+    def _needs_update(self, name):
+        """Packages that changed since an index was last written."""
+        index_mtime = spack.caches.misc_cache.mtime(self._cache_filename(name))
+        return [
             x for x, sinfo in self.checker.items()
             if sinfo.st_mtime > index_mtime
         ]
 
+    def _index_packages(self, pkg_names, jobs=None):
+        """Index packages with a pool of processes, each of them indexing
+        a share of the packages.
+
+        Args:
+            pkg_names (list): names of the packages to be indexed
+            jobs (int or None): number of processes (default: one per CPU)
+
+        Returns:
+            (dict) for each indexer, a tuple with the names of the packages
+            that were indexed and their index. Empty if the packages could
+            not be indexed in parallel.
+        """
+        jobs = min(jobs or multiprocessing.cpu_count(), len(pkg_names))
+        if jobs <= 1:
+            return {}
+
+        indexer_classes = dict(
+            (name, type(indexer)) for name, indexer in self.indexers.items())
+        fullnames = ['%s.%s' % (self.namespace, x) for x in pkg_names]
+        # a few chunks per process, to balance the load
+        size = -(-len(fullnames) // (jobs * 4))
+        chunks = [fullnames[i:i + size]
+                  for i in range(0, len(fullnames), size)]
+
+        tty.debug('Indexing {0} packages in {1} with {2} processes'.format(
+            len(pkg_names), self.namespace, jobs))
+        pool = multiprocessing.Pool(jobs)
+        try:
+            results = pool.map(
+                _index_packages_in_pool,
+                [(indexer_classes, chunk) for chunk in chunks],
+                chunksize=1)
+        finally:
+            pool.terminate()
+            pool.join()
+
+        if any(r is None for r in results):
+            return {}
+
+        partial_indexes = {}
+        for name, cls in indexer_classes.items():
+            partial_indexes[name] = (set(pkg_names), [])
+            for result in results:
+                partial = cls()
+                partial.read(six.StringIO(result[name]))
+                partial_indexes[name][1].append(partial.index)
+        return partial_indexes
+
+    def _build_index(self, name, indexer, partial_indexes=None):
+        """Determine which packages need an update, and update indexes.
+
+        Args:
+            name (str): name of the index
+            indexer (Indexer): indexer of the index
+            partial_indexes (tuple or None): names of packages and indexes
+                created by other processes for them. Used instead of
+                loading the packages if all those needing an update are
+                covered.
+        """
+        cache_filename = self._cache_filename(name)
+
+        # Compute which packages needs to be updated in the cache
+        misc_cache = spack.caches.misc_cache
+        needs_update = self._needs_update(name)
+
+        if partial_indexes and not set(needs_update) <= partial_indexes[0]:
+            partial_indexes = None
+
         index_existed = misc_cache.init_entry(cache_filename)
         if index_existed and not needs_update:
             # If the index exists and doesn't need an update, read it
@@ -422,9 +692,16 @@ def _build_index(self, name, indexer):
             with misc_cache.write_transaction(cache_filename) as (old, new):
                 indexer.read(old) if old else indexer.create()
 
-                for pkg_name in needs_update:
-                    namespaced_name = '%s.%s' % (self.namespace, pkg_name)
-                    indexer.update(namespaced_name)
+                if partial_indexes:
+                    pkg_names, indexes = partial_indexes
+                    for pkg_name in pkg_names:
+                        indexer.remove('%s.%s' % (self.namespace, pkg_name))
+                    for index in indexes:
+                        indexer.merge(index)
+                else:
+                    for pkg_name in needs_update:
+                        namespaced_name = '%s.%s' % (self.namespace, pkg_name)
+                        indexer.update(namespaced_name)
 
                 indexer.write(new)
 
@@ -557,6 +834,11 @@ def patch_index(self):
 
         return self._patch_index
 
+    def package_metadata(self, pkg_name):
+        """Metadata of a package, read without importing it (see
+        ``spack.metadata_index``)."""
+        return self.repo_for_pkg(pkg_name).package_metadata(pkg_name)
+
     @autospec
     def providers_for(self, vpkg_spec):
         providers = self.provider_index.providers_for(vpkg_spec)
@@ -747,6 +1029,7 @@ def check(condition, msg):
 
         # Indexes for this repository, computed lazily
         self._repo_index = None
+        self._metadata_repo_index = None
 
         # make sure the namespace for packages in this repo exists.
         self._create_namespace()
@@ -960,6 +1243,28 @@ def patch_index(self):
         """Index of patches and packages they're defined on."""
         return self.index['patches']
 
+    @property
+    def metadata_index(self):
+        """Index of the metadata declared by the packages.
+
+        It is much larger than the other indexes, so it is built and read
+        apart from them, only by the commands that need it.
+        """
+        if self._metadata_repo_index is None:
+            self._metadata_repo_index = RepoIndex(
+                self._pkg_checker, self.namespace)
+            self._metadata_repo_index.add_indexer(
+                'metadata', MetadataIndexer())
+        return self._metadata_repo_index['metadata']
+
+    def package_metadata(self, pkg_name):
+        """Metadata of a package, read without importing it (see
+        ``spack.metadata_index``)."""
+        name = pkg_name.split('.')[-1]
+        if name not in self.metadata_index:
+            raise UnknownPackageError(pkg_name, self)
+        return self.metadata_index[name]
+
     @autospec
     def providers_for(self, vpkg_spec):
         providers = self.provider_index.providers_for(vpkg_spec)
@@ -58,6 +58,10 @@
             'connect_timeout': {'type': 'integer', 'minimum': 0},
             'verify_ssl': {'type': 'boolean'},
             'suppress_gpg_warnings': {'type': 'boolean'},
+            'binary_compression': {
+                'type': 'string',
+                'enum': ['gzip', 'xz', 'zstd'],
+            },
             'install_missing_compilers': {'type': 'boolean'},
             'debug': {'type': 'boolean'},
             'checksum': {'type': 'boolean'},
@@ -65,6 +69,7 @@
             'dirty': {'type': 'boolean'},
             'build_language': {'type': 'string'},
             'build_jobs': {'type': 'integer', 'minimum': 1},
+            'fetch_jobs': {'type': 'integer', 'minimum': 1},
             'ccache': {'type': 'boolean'},
             'db_lock_timeout': {'type': 'integer', 'minimum': 1},
             'package_lock_timeout': {
@@ -73,6 +78,7 @@
                     {'type': 'null'}
                 ],
             },
+            'lock_stats_dir': {'type': 'string'},
             'allow_sgid': {'type': 'boolean'},
         },
     },
@@ -64,14 +64,18 @@ def to_dict(self):
         return dict(d)
 
 
+def default_template_dirs():
+    """Returns the default directories where to search for templates."""
+    builtins = spack.config.get('config:template_dirs')
+    extensions = spack.extensions.get_template_dirs()
+    return [canonicalize_path(d)
+            for d in itertools.chain(builtins, extensions)]
+
+
 def make_environment(dirs=None):
     """Returns an configured environment for template rendering."""
     if dirs is None:
-        # Default directories where to search for templates
-        builtins = spack.config.get('config:template_dirs')
-        extensions = spack.extensions.get_template_dirs()
-        dirs = [canonicalize_path(d)
-                for d in itertools.chain(builtins, extensions)]
+        dirs = default_template_dirs()
 
     # avoid importing this at the top level as it's used infrequently and
     # slows down startup a bit.
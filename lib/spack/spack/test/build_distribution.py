@@ -5,11 +5,21 @@
 
 import pytest
 
+import hashlib
+import io
 import os
 import os.path
+import tarfile
+
+from contextlib import closing
 
-import spack.spec
 import spack.binary_distribution
+import spack.caches
+import spack.config
+import spack.spec
+import spack.util.file_cache
+import spack.util.spack_yaml as syaml
+import spack.util.web
 
 install = spack.main.SpackCommand('install')
 
@@ -39,3 +49,214 @@ def test_build_tarball_overwrite(
 
         with pytest.raises(spack.binary_distribution.NoOverwriteException):
             spack.binary_distribution.build_tarball(spec, '.', unsigned=True)
+
+
+def test_build_tarball_streams_prefix(install_mockery, mock_fetch, tmpdir):
+    bindist = spack.binary_distribution
+
+    with tmpdir.as_cwd():
+        spec = spack.spec.Spec('trivial-install-test-package').concretized()
+        install(str(spec))
+
+        # A text file, a hard link to it and an absolute link into the
+        # install tree
+        dummy = os.path.join(spec.prefix, 'dummy.txt')
+        with open(dummy, 'w') as f:
+            f.write(spec.prefix)
+        os.link(dummy, os.path.join(spec.prefix, 'hardlink.txt'))
+        link = os.path.join(spec.prefix, 'link_to_dummy.txt')
+        os.symlink(dummy, link)
+
+        bindist.build_tarball(spec, '.', rel=True, unsigned=True)
+
+        tarfile_name = bindist.tarball_name(spec, '.tar.gz')
+        specfile_name = bindist.tarball_name(spec, '.spec.yaml')
+        spackfile_path = os.path.join(
+            bindist.build_cache_prefix('.'),
+            bindist.tarball_path_name(spec, '.spack'))
+        with closing(tarfile.open(spackfile_path)) as tar:
+            assert tar.getnames() == [tarfile_name, specfile_name]
+            data = tar.extractfile(tarfile_name).read()
+            spec_dict = syaml.load(tar.extractfile(specfile_name).read())
+
+    checksum = spec_dict['binary_cache_checksum']['hash']
+    assert checksum == hashlib.sha256(data).hexdigest()
+
+    topdir = os.path.basename(spec.prefix)
+    with closing(tarfile.open(fileobj=io.BytesIO(data))) as tar:
+        members = dict((m.name, m) for m in tar.getmembers())
+        buildinfo = syaml.load(tar.extractfile(os.path.join(
+            topdir, '.spack', 'binary_distribution')).read())
+
+    assert members[topdir].isdir()
+    assert members[os.path.join(topdir, 'dummy.txt')].isreg()
+    hardlink = members[os.path.join(topdir, 'hardlink.txt')]
+    assert hardlink.islnk()
+    assert hardlink.linkname == os.path.join(topdir, 'dummy.txt')
+
+    # Links are made relative in the tarball, but not in the prefix
+    assert members[os.path.join(topdir, 'link_to_dummy.txt')].linkname == \
+        'dummy.txt'
+    assert os.readlink(link) == dummy
+
+    assert buildinfo['relative_rpaths'] is True
+    assert buildinfo['relocate_links'] == ['link_to_dummy.txt']
+    assert sorted(buildinfo['relocate_textfiles']) == \
+        ['dummy.txt', 'hardlink.txt']
+
+
+@pytest.mark.parametrize('compression,threads', [
+    ('gzip', 1),
+    ('gzip', 3),
+    pytest.param('xz', 2, marks=pytest.mark.requires_executables('xz')),
+    pytest.param('zstd', 2, marks=pytest.mark.requires_executables('zstd')),
+])
+def test_build_tarball_compression(
+        install_mockery, mock_fetch, tmpdir, compression, threads):
+    bindist = spack.binary_distribution
+
+    with tmpdir.as_cwd():
+        spec = spack.spec.Spec('trivial-install-test-package').concretized()
+        install(str(spec))
+
+    # Large enough to be compressed in several blocks
+    data = os.urandom(1 << 16) * 40
+    with open(os.path.join(spec.prefix, 'data.bin'), 'wb') as f:
+        f.write(data)
+
+    mirror_dir = str(tmpdir.join('mirror'))
+    bindist.build_tarball(spec, mirror_dir, unsigned=True,
+                          compression=compression, threads=threads)
+
+    spackfile_path = os.path.join(bindist.build_cache_prefix(mirror_dir),
+                                  bindist.tarball_path_name(spec, '.spack'))
+    with closing(tarfile.open(spackfile_path)) as tar:
+        spec_dict = syaml.load(tar.extractfile(
+            bindist.tarball_name(spec, '.spec.yaml')).read())
+        assert tar.getnames()[0] == bindist.tarball_name(
+            spec, bindist._compression_extensions[compression])
+    assert spec_dict['buildinfo']['compression'] == compression
+
+    spec.package.do_uninstall(force=True)
+    bindist.extract_tarball(spec, spackfile_path, unsigned=True)
+    with open(os.path.join(spec.prefix, 'data.bin'), 'rb') as f:
+        assert f.read() == data
+
+
+def test_build_cache_index(install_mockery, mock_fetch, monkeypatch, tmpdir):
+    bindist = spack.binary_distribution
+    cache = spack.util.file_cache.FileCache(str(tmpdir.join('cache')))
+    monkeypatch.setattr(spack.caches, 'misc_cache', cache)
+    monkeypatch.setattr(bindist, '_cached_specs', set())
+    monkeypatch.setattr(bindist, '_mirror_indexes', {})
+
+    spec = spack.spec.Spec('trivial-install-test-package').concretized()
+    install(str(spec))
+    mirror_dir = tmpdir.join('mirror')
+    bindist.build_tarball(
+        spec, str(mirror_dir), unsigned=True, regenerate_index=True)
+    mirror_url = 'file://' + str(mirror_dir)
+
+    index = bindist.get_mirror_index(mirror_url)
+    entry = index['specs'][spec.dag_hash()]
+    assert entry['spec_file'] == bindist.tarball_name(spec, '.spec.yaml')
+    assert entry['full_hash'] == spec.full_hash()
+    assert 'hash' in entry['binary_cache_checksum']
+    assert index['full_hashes'] == {spec.full_hash(): spec.dag_hash()}
+
+    # Specs are looked up in the index, without reading their spec.yaml
+    read_from_url = spack.util.web.read_from_url
+    try_download_specs = bindist.try_download_specs
+
+    def _read_from_url(url, *args, **kwargs):
+        assert not str(url).endswith('.spec.yaml')
+        return read_from_url(url, *args, **kwargs)
+
+    def _try_download_specs(urls=None, force=False):
+        assert not urls
+        return try_download_specs(urls, force)
+    monkeypatch.setattr(spack.util.web, 'read_from_url', _read_from_url)
+    monkeypatch.setattr(bindist, 'try_download_specs', _try_download_specs)
+    with spack.config.override('mirrors', {'test': mirror_url}):
+        assert spec in bindist.get_spec(spec)
+        assert spec in bindist.get_specs(allarch=True)
+    assert not bindist.needs_rebuild(spec, mirror_url)
+
+    # Regenerating the index only reads the spec files that were updated
+    read = []
+    monkeypatch.setattr(bindist, '_read_spec_file',
+                        lambda url: read.append(url))
+    cache_prefix = bindist.build_cache_prefix(str(mirror_dir))
+    bindist.generate_package_index(cache_prefix, updated=[])
+    assert not read
+    assert bindist.get_mirror_index(mirror_url)['specs']
+
+    # Specs missing from a stale index are read from their spec.yaml
+    monkeypatch.setattr(spack.util.web, 'read_from_url', read_from_url)
+    monkeypatch.setattr(bindist, 'try_download_specs', try_download_specs)
+    monkeypatch.setattr(bindist, '_cached_specs', set())
+    monkeypatch.setitem(bindist._mirror_indexes, mirror_url, {
+        'version': 1, 'specs': {}, 'full_hashes': {}})
+    with spack.config.override('mirrors', {'test': mirror_url}):
+        assert spec in bindist.get_spec(spec)
+    assert not bindist.needs_rebuild(spec, mirror_url)
+
+    monkeypatch.setattr(bindist, '_cached_specs', set())
+    with spack.config.override('mirrors', {'test': mirror_url}):
+        assert spec in bindist.get_specs(allarch=True)
+
+
+def test_build_cache_index_is_cached(mutable_config, monkeypatch, tmpdir):
+    bindist = spack.binary_distribution
+    cache = spack.util.file_cache.FileCache(str(tmpdir.join('cache')))
+    monkeypatch.setattr(spack.caches, 'misc_cache', cache)
+    monkeypatch.setattr(bindist, '_mirror_indexes', {})
+    mirror_url = 'file://' + str(tmpdir.join('mirror'))
+
+    # A mirror without an index
+    cache_prefix = tmpdir.mkdir('mirror').mkdir('build_cache')
+    assert bindist.get_mirror_index(mirror_url) is None
+
+    # An empty index is downloaded once, and then read from the misc cache
+    # for as long as its checksum does not change
+    bindist.generate_package_index(str(cache_prefix))
+    assert bindist.get_mirror_index(mirror_url) == {
+        'version': 1, 'specs': {}, 'full_hashes': {}}
+    cache_prefix.join('index.json.gz').remove()
+    assert bindist.get_mirror_index(mirror_url, force=True)['specs'] == {}
+
+    cache_prefix.join('index.json.hash').write('0' * 64)
+    assert bindist.get_mirror_index(mirror_url, force=True) is None
+
+
+def test_build_and_extract_tarballs_concurrently(
+        install_mockery, mock_fetch, monkeypatch, tmpdir):
+    bindist = spack.binary_distribution
+    cache = spack.util.file_cache.FileCache(str(tmpdir.join('cache')))
+    monkeypatch.setattr(spack.caches, 'misc_cache', cache)
+    monkeypatch.setattr(bindist, '_mirror_indexes', {})
+
+    with tmpdir.as_cwd():
+        install('libdwarf')
+    spec = spack.spec.Spec('libdwarf').concretized()
+    specs = [spec['libelf'], spec]
+
+    mirror_dir = str(tmpdir.join('mirror'))
+    bindist.build_tarballs(
+        specs, mirror_dir, unsigned=True, regenerate_index=True, jobs=2)
+    index = bindist.get_mirror_index('file://' + mirror_dir)
+    assert set(index['specs']) == set(s.dag_hash() for s in specs)
+
+    with pytest.raises(bindist.BuildCacheError):
+        bindist.build_tarballs(specs, mirror_dir, unsigned=True, jobs=2)
+
+    for s in reversed(specs):
+        s.package.do_uninstall(force=True)
+
+    # Dependencies are installed first
+    with spack.config.override('mirrors', {'test': 'file://' + mirror_dir}):
+        results = list(bindist.extract_tarballs(
+            reversed(specs), unsigned=True, jobs=2))
+    assert results == [(s, None) for s in specs]
+    for s in specs:
+        assert os.path.isdir(s.prefix)
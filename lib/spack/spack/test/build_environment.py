@@ -339,3 +339,19 @@ def test_setting_dtags_based_on_config(
 
         dtags_to_add = modifications['SPACK_DTAGS_TO_ADD'][0]
         assert dtags_to_add.value == expected_flag
+
+
+def test_fork_jobs_are_not_written_to_config_files(
+        mutable_config, mock_packages):
+    pkg = spack.spec.Spec('a').concretized().package
+    mutable_config.push_scope(spack.config.InternalConfigScope('command_line'))
+    user_config = mutable_config.scopes['user'].path
+
+    def _build_jobs():
+        return spack.config.get('config:build_jobs')
+
+    jobs = spack.build_environment.fork(pkg, _build_jobs, False, True, 3)
+    assert jobs == 3
+    assert 'build_jobs' not in ''.join(
+        open(os.path.join(user_config, f)).read()
+        for f in os.listdir(user_config))
@@ -4,12 +4,15 @@
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
 import errno
+import multiprocessing
 import platform
 
 import pytest
 
 import spack.main
 import spack.binary_distribution
+import spack.cmd.buildcache
+import spack.config
 
 buildcache = spack.main.SpackCommand('buildcache')
 install = spack.main.SpackCommand('install')
@@ -56,3 +59,32 @@ def test_buildcache_create_fail_on_perm_denied(
                    '--unsigned', 'trivial-install-test-package')
     assert error.value.errno == errno.EACCES
     tmpdir.chmod(0o700)
+
+
+@pytest.mark.db
+def test_buildcache_install_jobs(database, monkeypatch):
+    specs = database.query_local('mpileaks')
+    monkeypatch.setattr(
+        spack.cmd.buildcache, 'match_downloaded_specs',
+        lambda pkgs, *args: specs[:len(pkgs)])
+
+    serial, jobs = [], []
+    monkeypatch.setattr(
+        spack.cmd.buildcache, 'install_tarball',
+        lambda spec, args: serial.append(spec))
+    monkeypatch.setattr(
+        spack.binary_distribution, 'extract_tarballs',
+        lambda *args: jobs.append(args[-1]) or [])
+    monkeypatch.setattr(multiprocessing, 'cpu_count', lambda: 4)
+
+    # A single spec is installed serially, unless asked otherwise
+    buildcache('install', '-f', 'mpileaks')
+    assert serial == specs[:1] and not jobs
+
+    build_jobs = spack.config.get('config:build_jobs')
+    buildcache('install', '-f', '-j', '3', 'mpileaks')
+    assert jobs == [3]
+    assert spack.config.get('config:build_jobs') == build_jobs
+
+    buildcache('install', '-f', 'mpileaks ^mpich', 'mpileaks ^zmpi')
+    assert jobs == [3, 4]
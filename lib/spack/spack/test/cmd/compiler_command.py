@@ -3,10 +3,12 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
-import pytest
-
+import argparse
 import os
 
+import pytest
+
+import spack.cmd.compiler
 import spack.main
 
 compiler = spack.main.SpackCommand('compiler')
@@ -38,3 +40,19 @@ def test_compiler_find_without_paths(no_compilers_yaml, working_env, tmpdir):
     output = compiler('find', '--scope=site')
 
     assert 'gcc' in output
+
+
+def test_compiler_cache_clear(mock_compiler_probe_cache, tmpdir):
+    gcc = tmpdir.join('gcc')
+    gcc.write('#!/bin/sh\n')
+    mock_compiler_probe_cache.set(str(gcc), 'version --version', '9.3.0')
+
+    compiler('cache', 'clear')
+    assert mock_compiler_probe_cache.get(
+        str(gcc), 'version --version') is None
+
+
+def test_compiler_cache_without_subcommand(capsys):
+    # Depending on the version of argparse, the subcommand may be optional
+    spack.cmd.compiler.compiler_cache(argparse.Namespace(cache_command=None))
+    assert 'clear' in capsys.readouterr()[0]
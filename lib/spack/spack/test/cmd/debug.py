@@ -10,7 +10,11 @@
 import os
 import os.path
 
+import llnl.util.lock
+
 import spack.architecture as architecture
+import spack.config
+import spack.util.lock
 from spack.main import SpackCommand, get_version
 from spack.util.executable import which
 
@@ -53,3 +57,39 @@ def test_report():
     assert get_version() in out
     assert platform.python_version() in out
     assert str(arch) in out
+
+
+def test_locks(mutable_config, tmpdir, monkeypatch):
+    stats_dir = str(tmpdir.join('lock-stats'))
+    db_lock = ('/spack/opt/.spack-db/lock', 0, 0)
+    prefix_lock = ('/spack/opt/.spack-db/prefix_lock', 42, 1)
+
+    # Two processes waiting for the database
+    for wait_time in (2.0, 3.0):
+        db_stats = llnl.util.lock.LockStats('(database)')
+        db_stats.write_acquisitions = 1
+        db_stats.record_wait(wait_time)
+        prefix_stats = llnl.util.lock.LockStats('(zlib)')
+        prefix_stats.read_acquisitions = 2
+        prefix_stats.timeouts = 1
+        monkeypatch.setattr(llnl.util.lock, 'lock_stats', {
+            db_lock: db_stats, prefix_lock: prefix_stats})
+        spack.util.lock.write_lock_stats(stats_dir)
+
+    out = debug('locks', stats_dir)
+    assert 'Locks taken by 2 processes' in out
+    lines = out.strip().split('\n')
+    assert '5.000s' in lines[2] and '3.000s' in lines[2]
+    assert lines[2].endswith('/spack/opt/.spack-db/lock[0:0] (database)')
+    assert lines[3].split()[3:7] == ['4', '0', '0', '2']
+
+    out = debug('locks', '--sort', 'timeouts', '--top', '1', stats_dir)
+    assert len(out.strip().split('\n')) == 3
+    assert 'prefix_lock[42:1] (zlib)' in out
+
+    # Lock statistics are read from config:lock_stats_dir by default
+    with spack.config.override('config:lock_stats_dir', stats_dir):
+        assert 'Locks taken by 2 processes' in debug('locks')
+    with spack.config.override('config:lock_stats_dir', ''):
+        debug('locks', fail_on_error=False)
+        assert debug.returncode == 1
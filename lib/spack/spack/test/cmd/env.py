@@ -15,6 +15,7 @@
 import spack.environment as ev
 
 from spack.cmd.env import _env_create
+from spack.filesystem_view import YamlFilesystemView
 from spack.spec import Spec
 from spack.main import SpackCommand
 from spack.stage import stage_prefix
@@ -987,6 +988,50 @@ def test_env_updates_view_uninstall(
     check_viewdir_removal(view_dir)
 
 
+def test_env_view_manifest(
+        tmpdir, mock_stage, mock_fetch, install_mockery, monkeypatch):
+    view_dir = tmpdir.mkdir('view')
+    env('create', '--with-view=%s' % view_dir, 'test')
+    with ev.read('test'):
+        add('mpileaks')
+        install('--fake')
+
+    view = ev.read('test').default_view.view()
+    specs = dict((s.name, s) for s in view.get_all_specs())
+    assert 'libdwarf' in specs
+    files = view.manifest.files(specs['mpileaks'].dag_hash())
+    assert os.path.join('bin', 'mpileaks') in files
+    assert os.path.join('.spack', 'mpileaks') in files
+
+    # Views with a manifest are updated without reading the whole view
+    def _fail(*args, **kwargs):
+        raise AssertionError('the whole view was read')
+    monkeypatch.setattr(YamlFilesystemView, 'clean', _fail)
+    monkeypatch.setattr(YamlFilesystemView, '_read_all_specs', _fail)
+    ev.read('test').regenerate_views()
+
+    # The links of packages uninstalled outside of the environment are
+    # removed from the view
+    uninstall('-fy', 'mpileaks')
+    ev.read('test').regenerate_views()
+    assert not os.path.lexists(str(view_dir.join('bin', 'mpileaks')))
+    assert not os.path.exists(str(view_dir.join('.spack', 'mpileaks')))
+    assert os.path.exists(str(view_dir.join('.spack', 'libdwarf')))
+    monkeypatch.undo()
+
+    # Repairing the view purges links made outside of Spack, and rebuilds
+    # its manifest
+    os.remove(view.manifest.path)
+    os.symlink(str(tmpdir.join('missing')), str(view_dir.join('broken')))
+    with ev.read('test'):
+        env('view', 'repair')
+    assert not os.path.lexists(str(view_dir.join('broken')))
+    view = ev.read('test').default_view.view()
+    assert view.manifest.exists()
+    assert 'libdwarf' in [s.name for s in view.get_all_specs()]
+    assert 'mpileaks' not in [s.name for s in view.get_all_specs()]
+
+
 def test_env_updates_view_uninstall_referenced_elsewhere(
         tmpdir, mock_stage, mock_fetch, install_mockery):
     view_dir = tmpdir.mkdir('view')
@@ -8,8 +8,10 @@
 
 import pytest
 
+import spack.config
 import spack.main
 import spack.modules
+import spack.modules.common
 from spack.test.conftest import use_store, use_configuration, use_repo
 
 module = spack.main.SpackCommand('module')
@@ -96,6 +98,26 @@ def test_remove_and_add(database, module_type):
         assert os.path.exists(item)
 
 
+@pytest.mark.db
+@pytest.mark.parametrize('cli_args,expected_jobs', [
+    ([], None),
+    (['-j', '3'], 3),
+])
+def test_refresh_jobs(database, monkeypatch, cli_args, expected_jobs):
+    calls = []
+
+    def _write_module_files(writers, jobs=None):
+        calls.append(jobs)
+        return [], writers, []
+    monkeypatch.setattr(
+        spack.modules.common, 'write_module_files', _write_module_files)
+
+    build_jobs = spack.config.get('config:build_jobs')
+    module('tcl', 'refresh', '-y', *(cli_args + ['mpileaks']))
+    assert calls == [expected_jobs]
+    assert spack.config.get('config:build_jobs') == build_jobs
+
+
 @pytest.mark.db
 @pytest.mark.parametrize('cli_args', [
     ['libelf'],
@@ -16,6 +16,8 @@
 import spack.spec
 import spack.compiler
 import spack.compilers as compilers
+import spack.paths
+import spack.util.executable
 
 import spack.compilers.arm
 import spack.compilers.cce
@@ -30,6 +32,9 @@
 
 from spack.compiler import Compiler
 
+# The method that disable_compiler_execution replaces in every test
+_get_compiler_link_paths = Compiler.__dict__['_get_compiler_link_paths']
+
 
 @pytest.fixture()
 def make_args_for_version(monkeypatch):
@@ -668,3 +673,105 @@ def module(*args):
     compiler = compilers[0]
     version = compiler.get_real_version()
     assert version == test_version
+
+
+def test_version_output_is_cached(tmpdir, mock_compiler_probe_cache,
+                                  monkeypatch):
+    calls = tmpdir.join('calls')
+    gcc = tmpdir.join('gcc')
+
+    def _make_gcc(version):
+        gcc.write('#!/bin/sh\necho called >> {0}\necho {1}\n'.format(
+            calls, version))
+        gcc.chmod(0o755)
+
+    def _version_output():
+        # Forget the results of previous calls in this process
+        spack.compiler.get_compiler_version_output.cache.clear()
+        monkeypatch.setattr(spack.compiler, 'probe_cache',
+                            spack.compiler.CompilerProbeCache())
+        output = spack.compiler.get_compiler_version_output(
+            str(gcc), '--version')
+        return output.strip()
+
+    _make_gcc('9.3.0')
+    assert _version_output() == '9.3.0'
+    assert _version_output() == '9.3.0'
+    assert len(calls.readlines()) == 1
+
+    # The cached output is discarded when the compiler changes
+    _make_gcc('10.1.0')
+    assert _version_output() == '10.1.0'
+    assert len(calls.readlines()) == 2
+
+
+def test_probe_cache(tmpdir, mock_compiler_probe_cache):
+    gcc = tmpdir.join('gcc')
+    gcc.write('#!/bin/sh\n')
+    path = str(gcc)
+
+    cache = mock_compiler_probe_cache
+    assert cache.get(path, 'link_dirs -v') is None
+    cache.set(path, 'link_dirs -v', ['/opt/gcc/lib64'])
+    cache.set(path, 'version --version', '9.3.0')
+    assert cache.get(path, 'link_dirs -v') == ['/opt/gcc/lib64']
+
+    # Results of executables that do not exist are not stored
+    cache.set(str(tmpdir.join('missing')), 'version --version', '9.3.0')
+    assert cache.get(str(tmpdir.join('missing')), 'version --version') is None
+
+    # Results are read back by other processes
+    other_cache = spack.compiler.CompilerProbeCache()
+    assert other_cache.get(path, 'version --version') == '9.3.0'
+
+    other_cache.clear()
+    assert other_cache.get(path, 'version --version') is None
+    assert spack.compiler.CompilerProbeCache().get(
+        path, 'version --version') is None
+
+
+def test_link_paths_are_cached_by_environment(tmpdir, monkeypatch,
+                                              mock_compiler_probe_cache):
+    # Undo disable_compiler_execution, the compiler here is a script
+    monkeypatch.setattr(spack.compiler.Compiler, '_get_compiler_link_paths',
+                        _get_compiler_link_paths)
+
+    # The same compiler wrapper links with the libraries of the compiler
+    # loaded in its environment, like the Cray compiler wrappers
+    calls = tmpdir.join('calls')
+    cc = tmpdir.join('cc')
+    cc.write("#!/bin/sh\necho called >> {0}\n"
+             "printf 'Library search paths:\\n\\t/opt/prgenv/lib\\n'\n"
+             .format(calls))
+    cc.chmod(0o755)
+    gcc_cls = spack.compilers.gcc.Gcc
+
+    def _link_paths(context):
+        return gcc_cls._get_compiler_link_paths([str(cc)], context)
+
+    assert _link_paths('prgenv-gnu') == ['/opt/prgenv/lib']
+    assert _link_paths('prgenv-gnu') == ['/opt/prgenv/lib']
+    assert len(calls.readlines()) == 1
+
+    assert _link_paths('prgenv-cray') == ['/opt/prgenv/lib']
+    assert _link_paths(None) == ['/opt/prgenv/lib']
+    assert len(calls.readlines()) == 3
+
+    # Compilers with different modules probe their executables apart
+    def _context(modules):
+        return gcc_cls(spack.spec.CompilerSpec('gcc@8.3.0'), 'fake', 'fake',
+                       [str(cc)] * 4, modules=modules)._probe_context()
+
+    assert _context(None) is None
+    assert _context(['PrgEnv-gnu']) == _context(['PrgEnv-gnu'])
+    assert _context(['PrgEnv-gnu']) != _context(['PrgEnv-cray'])
+
+
+@pytest.mark.parametrize('module', ['spack.config', 'spack.repo'])
+def test_module_imports_first(module):
+    # The probe cache must not make Spack modules import each other in a
+    # loop when one of them is imported before the others
+    python = spack.util.executable.Executable(sys.executable)
+    python('-c', 'import {0}'.format(module), extra_env={
+        'PYTHONPATH': os.pathsep.join(
+            [spack.paths.lib_path, spack.paths.external_path])})
@@ -443,6 +443,98 @@ def test_internal_config_update(mock_low_high_config, write_config_file):
     assert after['install_tree'] == 'foo/bar'
 
 
+def test_merged_sections_are_cached(mock_low_high_config, write_config_file):
+    cfg = mock_low_high_config
+    write_config_file('config', config_low, 'low')
+    write_config_file('config', config_merge_list, 'high')
+
+    merged = cfg.get('config')
+    assert cfg.get('config') == merged
+    assert cfg.get('config:install_tree') == 'install_tree_path'
+    assert cfg.cache_misses['config'] == 1
+    assert cfg.cache_hits['config'] == 2
+
+    # The first two levels of cached sections are copied for callers
+    merged['install_tree'] = 'modified'
+    merged['build_stage'].append('modified')
+    assert cfg.get('config:install_tree') == 'install_tree_path'
+    assert 'modified' not in cfg.get('config:build_stage')
+
+    # Updating a scope invalidates the sections merged from it
+    assert cfg.get('config:install_tree', scope='high') is None
+    cfg.set('config:install_tree', 'high_path', scope='high')
+    assert cfg.get('config:install_tree') == 'high_path'
+    assert cfg.get('config:install_tree', scope='high') == 'high_path'
+    assert cfg.get('config:install_tree', scope='low') == 'install_tree_path'
+
+    # and so does adding or removing scopes
+    scope = spack.config.InternalConfigScope(
+        'command_line', {'config': {'install_tree': 'command_line_path'}})
+    cfg.push_scope(scope)
+    assert cfg.get('config:install_tree') == 'command_line_path'
+    cfg.pop_scope()
+    assert cfg.get('config:install_tree') == 'high_path'
+    cfg.push_scope(scope)
+    cfg.remove_scope('command_line')
+    assert cfg.get('config:install_tree') == 'high_path'
+
+    # or replacing scopes
+    cfg.scopes['high'] = spack.config.InternalConfigScope(
+        'high', {'config': {'install_tree': 'replaced_path'}})
+    assert cfg.get('config:install_tree') == 'replaced_path'
+    assert cfg.get('config:install_tree', scope='high') == 'replaced_path'
+
+    # or replacing or clearing the data of scopes
+    cfg.scopes['high'].sections['config'] = {
+        'config': {'install_tree': 'assigned_path'}}
+    assert cfg.get('config:install_tree') == 'assigned_path'
+    cfg.scopes['high'].clear()
+    assert cfg.get('config:install_tree') == 'install_tree_path'
+
+    # Clearing the caches reads the files again
+    write_config_file('config', config_override_key, 'low')
+    assert cfg.get('config:install_tree', scope='low') == 'install_tree_path'
+    cfg.clear_caches()
+    assert cfg.get('config:install_tree', scope='low') == 'override_key'
+
+
+def test_config_files_are_cached(mock_low_high_config, write_config_file,
+                                 monkeypatch, tmpdir):
+    monkeypatch.setattr(spack.config, 'config_cache_path',
+                        str(tmpdir.join('cache')))
+    write_config_file('config', config_override_key, 'low')
+    filename = str(tmpdir.join('low', 'config.yaml'))
+    os.utime(filename, (1000, 1000))
+    schema = spack.config.section_schemas['config']
+    data = spack.config._read_config_file(filename, schema)
+
+    # Unchanged files are neither parsed nor validated again
+    def _fail(*args, **kwargs):
+        assert False, 'the configuration should be read from the cache'
+    load_config, validate = syaml.load_config, spack.config.validate
+    monkeypatch.setattr(syaml, 'load_config', _fail)
+    monkeypatch.setattr(spack.config, 'validate', _fail)
+    cached = spack.config._read_config_file(filename, schema)
+    assert cached == data
+    monkeypatch.setattr(syaml, 'load_config', load_config)
+    monkeypatch.setattr(spack.config, 'validate', validate)
+
+    # Marks (for blame) and overrides are preserved
+    key = list(cached['config'])[0]
+    assert key == 'install_tree' and spack.config._override(key)
+    assert syaml.file_line(key._start_mark) == filename + ':1'
+
+    # Modified files are read again
+    write_config_file('config', config_low, 'low')
+    os.utime(filename, (2000, 2000))
+    assert spack.config._read_config_file(filename, schema) == config_low
+
+    # and so are files validated with another schema
+    with pytest.raises(spack.config.ConfigFormatError):
+        spack.config._read_config_file(
+            filename, spack.config.section_schemas['mirrors'])
+
+
 def test_internal_config_filename(mock_low_high_config, write_config_file):
     write_config_file('config', config_low, 'low')
     mock_low_high_config.push_scope(
@@ -964,3 +1056,13 @@ def test_bad_path_double_override(config):
                        match='Meaningless second override'):
         with spack.config.override('bad::double:override::directive', ''):
             pass
+
+
+def test_cleared_scope_is_merged_again(mutable_config):
+    mutable_config.push_scope(spack.config.InternalConfigScope('command_line'))
+    mutable_config.set('config:build_jobs', 16, scope='user')
+    mutable_config.set('config:build_jobs', 8, scope='command_line')
+    assert mutable_config.get('config:build_jobs') == 8
+
+    mutable_config.scopes['command_line'].clear()
+    assert mutable_config.get('config:build_jobs') == 16
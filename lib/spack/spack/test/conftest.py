@@ -21,6 +21,7 @@
 from llnl.util.filesystem import mkdirp, remove_linked_tree
 
 import spack.architecture
+import spack.compiler
 import spack.compilers
 import spack.config
 import spack.caches
@@ -34,6 +35,7 @@
 import spack.repo
 import spack.stage
 import spack.util.executable
+import spack.util.file_cache
 import spack.util.gpg
 
 from spack.util.pattern import Bunch
@@ -70,6 +72,31 @@ def clean_user_environment():
         ev.activate(active)
 
 
+#
+# Do not cache the configuration files read by tests in the user's home
+#
+@pytest.fixture(scope='session', autouse=True)
+def no_config_file_cache():
+    saved = spack.config.config_cache_path
+    spack.config.config_cache_path = None
+    yield
+    spack.config.config_cache_path = saved
+
+
+#
+# Do not cache the results of probing compilers in the user's home
+#
+@pytest.fixture(scope='session', autouse=True)
+def no_compiler_probe_cache(tmpdir_factory):
+    saved = spack.compiler.probe_cache
+    cache = spack.util.file_cache.FileCache(
+        str(tmpdir_factory.mktemp('compiler_probe_cache')))
+    spack.compiler.probe_cache = spack.compiler.CompilerProbeCache(
+        cache=cache)
+    yield
+    spack.compiler.probe_cache = saved
+
+
 # Hooks to add command line options or set other custom behaviors.
 # They must be placed here to be found by pytest. See:
 #
@@ -588,6 +615,16 @@ def noop(*args):
     )
 
 
+@pytest.fixture()
+def mock_compiler_probe_cache(tmpdir, monkeypatch):
+    """Stores the results of probing compilers in a temporary misc cache."""
+    misc_cache = spack.util.file_cache.FileCache(str(tmpdir.join('cache')))
+    monkeypatch.setattr(spack.caches, 'misc_cache', misc_cache)
+    probe_cache = spack.compiler.CompilerProbeCache()
+    monkeypatch.setattr(spack.compiler, 'probe_cache', probe_cache)
+    yield probe_cache
+
+
 @pytest.fixture(scope='function')
 def install_mockery(tmpdir, config, mock_packages, monkeypatch):
     """Hooks a fake install directory, DB, and stage directory into Spack."""
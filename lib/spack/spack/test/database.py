@@ -888,3 +888,241 @@ def _raise(db, spec):
     with pytest.raises(Exception):
         with spack.store.db.prefix_write_lock(s):
             assert False
+
+
+one_day = datetime.timedelta(days=1)
+
+
+@pytest.mark.parametrize('query_spec,kwargs', [
+    ('mpileaks', {}),
+    ('mpileaks ^mpich', {}),
+    ('mpi', {}),
+    ('mpileaks%gcc', {}),
+    ('%gcc', {}),
+    ('@1.0', {}),
+    ('@:0.8.11', {}),
+    ('externaltool', {}),
+    ('zmpi', {'installed': any}),
+    ('callpath', {'explicit': False}),
+    ('mpileaks', {'explicit': True}),
+    (any, {'explicit': True}),
+    (any, {'start_date': datetime.datetime.now() - one_day}),
+    (any, {'end_date': datetime.datetime.now() - one_day}),
+    (any, {'start_date': datetime.datetime.min,
+           'end_date': datetime.datetime.max}),
+])
+def test_query_with_indexes(database, monkeypatch, query_spec, kwargs):
+    results = database.query_local(query_spec, **kwargs)
+
+    # Compare to testing every record in the database
+    monkeypatch.setattr(spack.database.InstallRecordIndex, 'candidates',
+                        lambda *args, **kwargs: None)
+    assert results == database.query_local(query_spec, **kwargs)
+
+
+def test_query_tests_only_candidates(database, monkeypatch):
+    tested = []
+    satisfies = spack.spec.Spec.satisfies
+
+    def _satisfies(self, *args, **kwargs):
+        tested.append(self.name)
+        return satisfies(self, *args, **kwargs)
+
+    monkeypatch.setattr(spack.spec.Spec, 'satisfies', _satisfies)
+
+    results = database.query_local('callpath')
+    assert len(results) == 3
+    assert set(tested) == set(['callpath'])
+
+
+def test_indexes_follow_changes(mutable_database):
+    def _check_index():
+        index = mutable_database._index
+        expected = spack.database.InstallRecordIndex(mutable_database._data)
+        assert len(index) == len(mutable_database._data)
+        assert index.by_name == expected.by_name
+        assert index.by_version == expected.by_version
+        assert index.by_compiler == expected.by_compiler
+        assert index.explicit == expected.explicit
+        assert index.by_time == expected.by_time
+
+    _check_index()
+
+    spec = mutable_database.query_one('mpileaks ^mpich')
+    mutable_database.remove(spec)
+    _check_index()
+    assert not mutable_database.query_local('mpileaks ^mpich')
+
+    mutable_database.add(spec, spack.store.layout)
+    _check_index()
+    assert mutable_database.query_local('mpileaks ^mpich') == [spec]
+
+    mutable_database.update_explicit(spec, False)
+    _check_index()
+    assert spec not in mutable_database.query_local(explicit=True)
+    assert spec in mutable_database.query_local(explicit=False)
+
+    mutable_database.reindex(spack.store.layout)
+    _check_index()
+
+
+def _journal_entries(database):
+    with open(database._journal_path) as f:
+        return [json.loads(line) for line in f.readlines()[1:]]
+
+
+@pytest.mark.skipif(not _use_uuid, reason='journal requires uuid')
+def test_write_appends_to_journal(mutable_database):
+    with open(mutable_database._index_path) as f:
+        snapshot = f.read()
+    assert not _journal_entries(mutable_database)
+
+    spec = mutable_database.query_one('mpileaks ^mpich')
+    mutable_database.update_explicit(spec, False)
+
+    # Only the changed record is written
+    with open(mutable_database._index_path) as f:
+        assert f.read() == snapshot
+    entries = _journal_entries(mutable_database)
+    assert [e['hash'] for e in entries] == [spec.dag_hash()]
+    assert entries[0]['record']['explicit'] is False
+
+    # A removal is recorded along with the updated reference counts
+    mutable_database.remove(spec)
+    entries = _journal_entries(mutable_database)[1:]
+    changed = set(e['hash'] for e in entries)
+    assert changed == set(
+        s.dag_hash() for s in [spec, spec['callpath'], spec['mpich']])
+    assert [e['record'] for e in entries
+            if e['hash'] == spec.dag_hash()] == [None]
+
+
+@pytest.mark.skipif(not _use_uuid, reason='journal requires uuid')
+def test_journal_is_replayed(mutable_database, monkeypatch):
+    other_db = spack.database.Database(mutable_database.root)
+    assert other_db.query_local(installed=any) == \
+        mutable_database.query_local(installed=any)
+
+    spec = mutable_database.query_one('mpileaks ^mpich')
+    mutable_database.remove(spec)
+    _mock_install('libelf@0.8.12')
+    assert not mutable_database.query_local('mpileaks ^mpich')
+
+    # Another instance only reads the new entries
+    def _fail(*args):
+        raise AssertionError('the index should not be read again')
+
+    monkeypatch.setattr(other_db, '_read_from_file', _fail)
+    assert other_db.query_local(installed=any) == \
+        mutable_database.query_local(installed=any)
+
+    libelf = other_db.query_one('libelf@0.8.12')
+    assert libelf.dag_hash() in other_db._index.by_name['libelf']
+    other_db._check_ref_counts()
+    _check_merkleiness()
+
+    # A new instance reads the snapshot and then the whole journal
+    new_db = spack.database.Database(mutable_database.root)
+    assert new_db.query_local(installed=any) == \
+        mutable_database.query_local(installed=any)
+    new_db._check_ref_counts()
+
+
+@pytest.mark.skipif(not _use_uuid, reason='journal requires uuid')
+def test_journal_compaction(mutable_database):
+    journal_id = mutable_database._journal_id
+
+    # Change every record: the journal is compacted into a snapshot
+    for spec in mutable_database.query_local(installed=any):
+        mutable_database.update_explicit(spec, True)
+
+    assert mutable_database._journal_id != journal_id
+    assert len(_journal_entries(mutable_database)) < \
+        len(mutable_database._data) * spack.database._journal_max_ratio
+
+    new_db = spack.database.Database(mutable_database.root)
+    assert len(new_db.query_local(explicit=True, installed=any)) == \
+        len(mutable_database._data)
+
+
+@pytest.mark.skipif(not _use_uuid, reason='journal requires uuid')
+def test_journal_ignored_for_other_snapshot(mutable_database):
+    spec = mutable_database.query_one('mpileaks ^mpich')
+    mutable_database.remove(spec)
+    assert _journal_entries(mutable_database)
+
+    # An index written without a journal, e.g. by an older Spack
+    with open(mutable_database._index_path) as f:
+        db_obj = json.load(f)
+    del db_obj['database']['journal']
+    with open(mutable_database._index_path, 'w') as f:
+        json.dump(db_obj, f)
+    with open(mutable_database._verifier_path, 'w') as f:
+        f.write(str(uuid.uuid4()))
+
+    assert mutable_database.query_local('mpileaks ^mpich') == [spec]
+
+
+def test_database_versions_with_journal(mutable_database, monkeypatch):
+    def _write_index(version):
+        with open(mutable_database._index_path) as f:
+            db_obj = json.load(f)
+        db_obj['database']['version'] = version
+        db_obj['database'].pop('journal', None)
+        with open(mutable_database._index_path, 'w') as f:
+            json.dump(db_obj, f)
+
+    def _fail(*args):
+        raise AssertionError('the database should not be reindexed')
+
+    # Indexes written before the journal are read as they are
+    monkeypatch.setattr(spack.database.Database, 'reindex', _fail)
+    _write_index('5')
+    assert spack.database.Database(mutable_database.root).query_local()
+
+    # Versions older than the journal refuse indexes that have one
+    _write_index('7')
+    with pytest.raises(spack.database.InvalidDatabaseVersionError):
+        spack.database.Database(mutable_database.root).query_local()
+
+
+def _loaded_specs(database):
+    return set(rec.spec.name for rec in database._data.values()
+               if rec._spec is not None)
+
+
+def test_records_are_read_lazily(database):
+    lazy_db = spack.database.Database(database.root)
+    with lazy_db.read_transaction():
+        assert lazy_db._data
+        assert not _loaded_specs(lazy_db)
+
+    # Queries construct the specs of the candidates and their dependencies
+    assert len(lazy_db.query_local('libdwarf')) == 1
+    assert _loaded_specs(lazy_db) == set(['libdwarf', 'libelf'])
+
+    # Hash lookups only construct the spec found
+    spec = database.query_one('mpileaks ^mpich')
+    assert lazy_db.get_by_hash(spec.dag_hash()[:7]) == [spec]
+    assert 'mpileaks' in _loaded_specs(lazy_db)
+    assert 'zmpi' not in _loaded_specs(lazy_db)
+
+    # Specs are shared among records
+    lazy_spec = lazy_db.get_by_hash(spec.dag_hash())[0]
+    for dep in lazy_spec.traverse(root=False):
+        assert lazy_db._data[dep.dag_hash()].spec is dep
+
+    # Records still unread are written as they were read
+    for rec in database._data.values():
+        lazy_rec = lazy_db._data[rec.spec.dag_hash()]
+        assert lazy_rec.to_dict() == rec.to_dict()
+
+
+def test_installed_relatives_of_lazy_records(database):
+    libelf = database.query_one('libelf')
+    expected = database.installed_relatives(libelf, direction='parents')
+
+    lazy_db = spack.database.Database(database.root)
+    lazy_libelf = lazy_db.get_by_hash(libelf.dag_hash())[0]
+    parents = lazy_db.installed_relatives(lazy_libelf, direction='parents')
+    assert sorted(parents) == sorted(expected)
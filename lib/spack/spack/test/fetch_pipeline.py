@@ -0,0 +1,143 @@
+# Copyright 2013-2020 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+import hashlib
+import os
+import threading
+
+import pytest
+
+from six.moves import BaseHTTPServer, SimpleHTTPServer, socketserver
+
+import spack.caches
+import spack.config
+import spack.fetch_pipeline
+import spack.fetch_strategy as fs
+import spack.installer
+from spack.spec import Spec
+
+pytestmark = pytest.mark.usefixtures('mutable_config', 'mock_packages')
+
+
+class _ThreadingHTTPServer(socketserver.ThreadingMixIn,
+                           BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+@pytest.fixture()
+def http_server(tmpdir):
+    """Serves the files in a directory over HTTP on localhost.
+
+    Yields the URL of the server, the directory it serves and the list of
+    paths requested so far.
+    """
+    root = tmpdir.mkdir('www')
+    requests = []
+
+    class Handler(SimpleHTTPServer.SimpleHTTPRequestHandler):
+        def translate_path(self, path):
+            requests.append(path)
+            return str(root.join(path.lstrip('/')))
+
+        def log_message(self, *args):
+            pass
+
+    server = _ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+
+    yield 'http://127.0.0.1:{0}'.format(server.server_address[1]), \
+        root, requests
+
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture()
+def fetch_cache(tmpdir, monkeypatch):
+    cache = fs.FsCache(str(tmpdir.join('source-cache')))
+    monkeypatch.setattr(spack.caches, 'fetch_cache', cache)
+    return cache
+
+
+def _served_package(name, http_server, digest=None):
+    """Concrete package whose source archive is served by http_server."""
+    url, root, _ = http_server
+    spec = Spec(name).concretized()
+    filename = '{0}-{1}.tar.gz'.format(spec.name, spec.version)
+    data = 'archive of {0}\n'.format(spec.name)
+    root.join(filename).write(data)
+
+    fetcher = fs.FetchStrategyComposite()
+    fetcher.append(fs.URLFetchStrategy(
+        url='{0}/{1}'.format(url, filename),
+        sha256=digest or hashlib.sha256(data.encode('utf-8')).hexdigest()))
+    spec.package.fetcher = fetcher
+    return spec.package
+
+
+def test_fetch_packages(http_server, fetch_cache):
+    pkgs = [_served_package(name, http_server) for name in ('a', 'b', 'c')]
+    external = _served_package('externaltool', http_server)
+
+    fetched = spack.fetch_pipeline.fetch_packages(pkgs + [external], jobs=4)
+    assert fetched == pkgs
+
+    _, _, requests = http_server
+    assert len(requests) == 3
+    for pkg in pkgs:
+        storage_path = pkg.stage[0].mirror_paths.storage_path
+        assert os.path.exists(os.path.join(fetch_cache.root, storage_path))
+
+        # The stages of the packages belong to their builds
+        assert not os.path.exists(pkg.stage.path)
+
+    # Sources that were already downloaded are not fetched again
+    assert spack.fetch_pipeline.fetch_packages(pkgs, jobs=4) == []
+    assert len(requests) == 3
+
+
+@pytest.mark.disable_clean_stage_check
+def test_fetch_packages_checksum_mismatch(http_server, fetch_cache):
+    good = _served_package('a', http_server)
+    bad = _served_package('b', http_server, digest='0' * 64)
+
+    with spack.config.override('config:checksum', True):
+        fetched = spack.fetch_pipeline.fetch_packages([good, bad], jobs=2)
+        assert fetched == [good]
+        storage_path = bad.stage[0].mirror_paths.storage_path
+        assert not os.path.exists(os.path.join(fetch_cache.root, storage_path))
+
+        # The failure is reported when the package is fetched on its own
+        with pytest.raises(fs.ChecksumError):
+            bad.do_fetch()
+
+
+def test_fetch_packages_skips(mock_fetch, fetch_cache, monkeypatch):
+    attempted = []
+    monkeypatch.setattr(spack.fetch_pipeline, '_fetch', attempted.append)
+
+    unchecksummed = Spec('a@9.9').concretized().package
+
+    # Both variants of the package are built from the same archive
+    shared = [Spec(s).concretized().package
+              for s in ('a foobar=baz', 'a foobar=fee')]
+
+    with spack.config.override('config:checksum', True):
+        spack.fetch_pipeline.fetch_packages([unchecksummed] + shared, jobs=4)
+    assert attempted == shared[:1]
+
+
+def test_prefetch_sources_for_install(http_server, fetch_cache):
+    pkgs = [_served_package(name, http_server) for name in ('a', 'b')]
+
+    # The test configuration downloads each source before its build
+    spack.installer.prefetch_sources(pkgs, use_cache=False)
+    assert not http_server[2]
+
+    with spack.config.override('config:fetch_jobs', 2):
+        spack.installer.prefetch_sources(pkgs, use_cache=False)
+    assert len(http_server[2]) == 2
@@ -843,3 +843,54 @@ def test_install_skip_patch(install_mockery, mock_fetch):
     installer.install(fake=False, skip_patch=True)
 
     assert 'b' in installer.installed
+
+
+def test_install_concurrent_builds(install_mockery, mock_fetch):
+    """Test building independent dependencies at the same time."""
+    spec, installer = create_installer('mpileaks')
+
+    installer.install(concurrent_builds=3, fake=True)
+
+    for s in spec.traverse():
+        assert s.package.installed
+        assert inst.package_id(s.package) in installer.installed
+
+
+def test_install_concurrent_builds_share_jobs(install_mockery, mutable_config,
+                                              monkeypatch):
+    """Test concurrent builds split the build jobs budget."""
+    jobs_by_name = {}
+
+    def _fork(pkg, function, dirty, fake, jobs=None):
+        jobs_by_name[pkg.name] = jobs
+
+    monkeypatch.setattr(spack.build_environment, 'fork', _fork)
+    monkeypatch.setattr(inst.PackageInstaller, '_register_build', _noop)
+    monkeypatch.setattr(inst.multiprocessing, 'cpu_count', lambda: 8)
+    spack.config.set('config:build_jobs', 8)
+
+    spec, installer = create_installer('mpileaks')
+    installer.install(concurrent_builds=2, use_cache=False)
+
+    # The two leaves start together so share the budget while the root,
+    # which is built on its own, gets all of the jobs.
+    assert jobs_by_name['mpich'] == jobs_by_name['libelf'] == 4
+    assert jobs_by_name['mpileaks'] == 8
+
+
+def test_install_concurrent_builds_failed_dependency(install_mockery,
+                                                     monkeypatch, capfd):
+    """Test a failed concurrent build skips its dependents."""
+    def _fork(pkg, function, dirty, fake, jobs=None):
+        raise inst.InstallError('Mock build failure')
+
+    monkeypatch.setattr(spack.build_environment, 'fork', _fork)
+
+    spec, installer = create_installer('dependent-install')
+    with pytest.raises(inst.InstallError, match='dependent-install failed'):
+        installer.install(concurrent_builds=2, use_cache=False)
+
+    out = capfd.readouterr()[1]
+    assert 'Mock build failure' in out
+    assert any(pkg_id.startswith('dependency-install')
+               for pkg_id in installer.failed)
@@ -7,7 +7,7 @@
 
 import pytest
 from llnl.util.filesystem import working_dir, mkdirp, touchp
-from llnl.util.link_tree import LinkTree
+from llnl.util.link_tree import LinkTree, MergePlan
 from spack.stage import Stage
 
 
@@ -166,3 +166,55 @@ def test_ignore(stage, link_tree):
 
         assert os.path.isfile('source/.spec')
         assert os.path.isfile('dest/.spec')
+
+
+def test_merge_plan(stage, monkeypatch):
+    monkeypatch.setattr(MergePlan, 'min_parallel', 0)
+    monkeypatch.setattr(MergePlan, 'threads', 3)
+
+    with working_dir(stage.path):
+        os.symlink(os.path.abspath('source/a'), 'source/link-to-a')
+        touchp('dest/x')
+        mkdirp('dest/c/d')
+
+        source = os.path.abspath('source')
+        plan = MergePlan()
+        merge_map = plan.add_tree(source, 'dest')
+        assert merge_map == LinkTree(source).get_file_map(
+            'dest', lambda f: False)
+        assert not plan.conflicts and not plan.existing
+        assert plan.markers == [os.path.join('dest', 'c', 'd', '.spack-empty')]
+        plan.execute()
+
+        check_file_link('dest/1',       'source/1')
+        check_file_link('dest/a/b/2',   'source/a/b/2')
+        check_file_link('dest/c/d/e/7', 'source/c/d/e/7')
+        assert os.path.isfile('dest/x')
+        check_dir('dest/link-to-a')
+        assert not os.listdir('dest/link-to-a')
+
+
+def test_merge_plan_conflicts(stage):
+    with working_dir(stage.path):
+        touchp('other/1')
+        touchp('other/a/9')
+        touchp('other/c/d/e')
+        touchp('dest/c')
+
+        # conflicts between the trees of the plan are found before the
+        # destination is modified
+        plan = MergePlan()
+        plan.add_tree('source', 'dest')
+        plan.add_tree('other', 'dest')
+        assert plan.conflicts[0] == \
+            'File blocks directory: ' + os.path.join('dest', 'c')
+        assert 'Directory blocks directory: ' + \
+            os.path.join('dest', 'c', 'd', 'e') in plan.conflicts
+        assert plan.existing == [os.path.join('dest', '1')]
+        assert sorted(os.listdir('dest')) == ['c']
+
+        # links are only planned for the files of the first tree
+        assert plan.links[os.path.join('dest', '1')] == \
+            os.path.join('source', '1')
+        assert plan.links[os.path.join('dest', 'a', '9')] == \
+            os.path.join('other', 'a', '9')
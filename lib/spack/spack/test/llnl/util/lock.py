@@ -44,14 +44,17 @@
 """
 import collections
 import os
+import signal
 import socket
 import shutil
 import tempfile
+import threading
+import time
 import traceback
 import glob
 import getpass
 from contextlib import contextmanager
-from multiprocessing import Process, Queue
+from multiprocessing import Event, Process, Queue
 
 import pytest
 
@@ -590,6 +593,131 @@ def test_read_lock_no_lockfile(lock_dir, lock_path):
                 pass
 
 
+def hold_write_lock(lock_path, locked, release):
+    lock = lk.Lock(lock_path)
+    lock.acquire_write()
+    locked.set()
+    release.wait(barrier_timeout)
+    lock.release_write()
+
+
+@contextmanager
+def write_lock_held_by_another_process(lock_path):
+    """Yields an event that releases a write lock held by another process.
+    """
+    locked, release = Event(), Event()
+    p = Process(target=hold_write_lock, args=(lock_path, locked, release))
+    p.start()
+    try:
+        assert locked.wait(barrier_timeout)
+        yield release
+    finally:
+        release.set()
+        p.join()
+
+
+def test_contended_lock_is_waited_for_in_kernel(lock_path, monkeypatch):
+    acquired = []
+    monkeypatch.setattr(lk.Lock, '_log_acquired',
+                        lambda self, locktype, wait_time, nattempts:
+                        acquired.append((wait_time, nattempts)))
+
+    with write_lock_held_by_another_process(lock_path) as release:
+        timer = threading.Timer(0.5, release.set)
+        timer.start()
+        lock = lk.Lock(lock_path)
+        lock.acquire_read(timeout=barrier_timeout)
+        lock.release_read()
+        timer.join()
+
+    # A failed attempt, and a successful blocking one as soon as the lock
+    # is released (polling would have taken 5 attempts)
+    (wait_time, nattempts), = acquired
+    assert nattempts == 2
+    assert 0.4 < wait_time < 1
+
+
+def test_blocking_lock_timeout(lock_path):
+    with write_lock_held_by_another_process(lock_path):
+        lock = lk.Lock(lock_path)
+        start = time.time()
+        with pytest.raises(lk.LockTimeoutError):
+            lock.acquire_write(timeout=0.3)
+        assert time.time() - start < 1
+
+    # The alarm is not left behind
+    assert signal.getsignal(signal.SIGALRM) == signal.SIG_DFL
+    assert signal.getitimer(signal.ITIMER_REAL) == (0.0, 0.0)
+
+
+def test_locks_are_polled_in_threads(lock_path, monkeypatch):
+    polled = []
+    poll_lock = lk.Lock._poll_lock
+
+    def _poll_lock(self, op):
+        polled.append(op)
+        return poll_lock(self, op)
+    monkeypatch.setattr(lk.Lock, '_poll_lock', _poll_lock)
+
+    errors = []
+
+    def acquire():
+        try:
+            lock = lk.Lock(lock_path)
+            lock.acquire_read(timeout=0.3)
+        except lk.LockTimeoutError as e:
+            errors.append(e)
+
+    with write_lock_held_by_another_process(lock_path):
+        thread = threading.Thread(target=acquire)
+        thread.start()
+        thread.join()
+
+    assert len(errors) == 1
+    assert len(polled) > 2
+
+
+def test_lock_stats(lock_path, monkeypatch):
+    monkeypatch.setattr(lk, 'lock_stats', {})
+
+    lock = lk.Lock(lock_path, start=3, length=1, desc='test')
+    lock.acquire_read()
+    lock.acquire_write()
+    lock.release_write()
+    lock.release_read()
+    lock.acquire_write()
+    lock.downgrade_write_to_read()
+    time.sleep(0.1)
+    lock.release_read()
+
+    with write_lock_held_by_another_process(lock_path):
+        with pytest.raises(lk.LockTimeoutError):
+            lock.acquire_read(timeout=0.2)
+
+    # Locks on another byte range of the file are counted apart
+    other = lk.Lock(lock_path, start=4, length=1)
+    other.acquire_read()
+    other.release_read()
+
+    stats = lk.get_lock_stats(lock_path, 3, 1)
+    assert stats.desc == '(test)'
+    assert (stats.read_acquisitions, stats.write_acquisitions) == (1, 1)
+    assert (stats.upgrades, stats.downgrades) == (1, 1)
+    assert stats.timeouts == 1
+    assert 0.1 <= stats.max_hold_time <= stats.hold_time
+    assert 0 <= stats.max_wait_time <= stats.wait_time
+
+    other_stats = lk.get_lock_stats(lock_path, 4, 1)
+    assert other_stats.acquisitions == 1
+    assert len(lk.lock_stats) == 2
+
+    total = lk.LockStats.from_dict(stats.to_dict())
+    total.merge(other_stats)
+    assert total.acquisitions == 3
+    assert total.max_hold_time == stats.max_hold_time
+    assert total.hold_time == stats.hold_time + other_stats.hold_time
+
+
 def test_upgrade_read_to_write(private_lock_path):
     """Test that a read lock can be upgraded to a write lock.
 
@@ -0,0 +1,65 @@
+# Copyright 2013-2020 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Tests for the index of package metadata."""
+from six import StringIO
+
+import pytest
+
+import spack.repo
+from spack.metadata_index import MetadataIndex
+from spack.version import Version
+
+
+def test_metadata_index_round_trip(mock_packages):
+    index = MetadataIndex()
+    for name in ('mpich', 'mpileaks', 'conflict'):
+        index.update_package('builtin.mock.' + name)
+
+    ostream = StringIO()
+    index.to_json(ostream)
+    other = MetadataIndex.from_json(StringIO(ostream.getvalue()))
+
+    assert sorted(other) == ['conflict', 'mpich', 'mpileaks']
+    for name in index:
+        assert other[name].metadata == index[name].metadata
+
+
+def test_package_metadata(mock_packages):
+    pkg = spack.repo.path.get_pkg_class('mpich')
+    metadata = spack.repo.path.package_metadata('mpich')
+
+    assert metadata.name == 'mpich'
+    assert metadata.fullname == 'builtin.mock.mpich'
+    assert metadata.homepage == pkg.homepage
+    assert metadata.url == pkg.url
+    assert sorted(metadata.versions) == sorted(pkg.versions)
+    assert Version('3.0.4') in metadata.versions
+    assert metadata.variants['debug']['default'] is False
+    assert metadata.provided == {
+        'mpi@:1': ['mpich@:1'], 'mpi@:3': ['mpich@3:']}
+    assert metadata.format_doc(indent=2) == \
+        spack.repo.get('mpich').format_doc(indent=2)
+
+    metadata = spack.repo.path.package_metadata('builtin.mock.mpileaks')
+    assert sorted(metadata.dependencies_of_type('link')) == \
+        ['callpath', 'mpi']
+    assert not metadata.dependencies_of_type('run')
+
+    metadata = spack.repo.path.package_metadata('conflict')
+    assert metadata.conflicts == {'%clang': [['+foo', None]]}
+
+
+def test_metadata_index_has_all_packages(mock_packages):
+    # packages derived from other packages are indexed under their own name
+    repo = spack.repo.path.get_repo('builtin.mock')
+    assert set(repo.metadata_index) == set(repo.all_package_names())
+    assert repo.package_metadata('multimethod-diamond').fullname == \
+        'builtin.mock.multimethod-diamond'
+
+
+def test_package_metadata_unknown_package(mock_packages):
+    with pytest.raises(spack.repo.UnknownPackageError):
+        spack.repo.path.package_metadata('not-a-package')
@@ -224,3 +224,62 @@ def test_mirror_cache_symlinks(tmpdir):
     assert os.path.exists(link_target)
     assert (os.path.normpath(link_target) ==
             os.path.join(cache.root, reference.storage_path))
+
+
+def test_mirror_create_concurrently(
+        mock_packages, mutable_config, monkeypatch):
+    fetched = []
+
+    def successful_fetch(_class):
+        fetched.append(_class.url)
+        with open(_class.stage.save_filename, 'w'):
+            pass
+
+    monkeypatch.setattr(spack.fetch_strategy.URLFetchStrategy, 'fetch',
+                        successful_fetch)
+
+    # The two libelf specs share their archive
+    specs = [Spec(x).concretized() for x in (
+        'libelf@0.8.13%gcc', 'libelf@0.8.13%clang', 'libelf@0.8.12',
+        'libdwarf', 'trivial-install-test-package')]
+
+    with Stage('spack-mirror-test') as stage:
+        mirror_root = os.path.join(stage.path, 'test-mirror')
+
+        with spack.config.override('config:checksum', False):
+            present, mirrored, error = spack.mirror.create(
+                mirror_root, specs, jobs=4)
+        assert not error
+        assert len(fetched) == len(set(fetched)) == 4
+        assert len(mirrored) == 4
+        assert len(present) == 1
+
+        # Archives already in the mirror are not fetched again
+        with spack.config.override('config:checksum', False):
+            present, mirrored, error = spack.mirror.create(
+                mirror_root, specs, jobs=4)
+        assert len(fetched) == 4
+        assert len(present) == 5
+        assert not mirrored and not error
+
+
+def test_mirror_cache_interrupted_store(tmpdir):
+    class InterruptedFetcher(object):
+        @staticmethod
+        def archive(dst):
+            with open(dst, 'w') as f:
+                f.write('partial')
+            raise KeyboardInterrupt()
+
+    cache = spack.caches.MirrorCache(str(tmpdir), False)
+    reference = spack.mirror.MirrorReference('zlib/zlib-1.2.11.tar.gz')
+    with pytest.raises(KeyboardInterrupt):
+        cache.store(InterruptedFetcher(), reference.storage_path)
+
+    # Nothing is taken for a complete archive when the mirror is updated
+    assert not os.path.exists(
+        os.path.join(cache.root, reference.storage_path))
+
+    # and nothing is left behind
+    assert not os.listdir(os.path.dirname(
+        os.path.join(cache.root, reference.storage_path)))
@@ -10,7 +10,9 @@
 
 import spack.spec
 import spack.modules.tcl
-from spack.modules.common import UpstreamModuleIndex
+import spack.config
+from spack.modules.common import (
+    UpstreamModuleIndex, content_hash, write_module_files)
 from spack.spec import Spec
 
 import spack.error
@@ -77,6 +79,35 @@ def test_modules_written_with_proper_permissions(mock_module_filename,
         mock_module_filename).st_mode == mock_package_perms
 
 
+def test_write_module_files(mutable_config, mock_packages, tmpdir,
+                            monkeypatch):
+    monkeypatch.setattr(spack.modules.common, 'parallel_write_threshold', 0)
+    spack.config.set('config:module_roots', {'tcl': str(tmpdir)})
+    specs = [Spec(x).concretized() for x in ('mpileaks', 'libelf', 'zmpi')]
+    writers = [spack.modules.tcl.TclModulefileWriter(s) for s in specs]
+
+    # Module files are rendered by other processes
+    written, unchanged, errors = write_module_files(writers, jobs=2)
+    assert (written, unchanged, errors) == (writers, [], [])
+    for writer in writers:
+        with open(writer.layout.filename) as f:
+            assert content_hash(f.read()) == content_hash(writer.render())
+
+    # Only module files whose content changed are written again, the time
+    # module files are created is not part of their content
+    with open(writers[1].layout.filename, 'a') as f:
+        f.write('# edited\n')
+    mtime = int(os.stat(writers[0].layout.filename).st_mtime) - 100
+    os.utime(writers[0].layout.filename, (mtime, mtime))
+    written, unchanged, errors = write_module_files(writers, jobs=2)
+    assert written == [writers[1]]
+    assert unchanged == [writers[0], writers[2]]
+    assert os.stat(writers[0].layout.filename).st_mtime == mtime
+
+    writers[0].write(overwrite=True)
+    assert os.stat(writers[0].layout.filename).st_mtime == mtime
+
+
 class MockDb(object):
     def __init__(self, db_ids, spec_hash_to_db):
         self.upstream_dbs = db_ids
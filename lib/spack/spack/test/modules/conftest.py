@@ -43,6 +43,9 @@ def _mock(filename, mode):
             handle.close()
     # Patch 'open' in the appropriate module
     monkeypatch.setattr(spack.modules.common, 'open', _mock, raising=False)
+    # Module files on disk are not compared to those in the registry
+    monkeypatch.setattr(spack.modules.common.BaseModuleFileWriter,
+                        'needs_update', lambda self, text: True)
     return file_registry
 
 
@@ -308,3 +308,63 @@ def test_relocate_elf_binaries_relative_paths(hello_world, tmpdir):
     patchelf = spack.util.executable.which('patchelf')
     output = patchelf('--print-rpath', str(new_binary), output=str)
     assert output.strip() == '/foo/lib:/foo/lib64:/opt/local/lib'
+
+
+@pytest.mark.parametrize('threshold', [64, 1])
+def test_relocate_text_single_pass(tmpdir, monkeypatch, threshold):
+    # A threshold of 1 spreads the files over a pool of processes
+    monkeypatch.setattr(
+        spack.relocate, '_PARALLEL_RELOCATION_THRESHOLD', threshold)
+
+    old_root, new_root = '/old/opt/spack', '/new/opt/spack/old/opt/spack'
+    old_prefix = os.path.join(old_root, 'pkg-abcdef')
+    new_prefix = os.path.join(new_root, 'pkg-abcdef')
+    old_dep, new_dep = os.path.join(old_root, 'dep-123456'), '/usr/dep'
+
+    files = []
+    for i in range(4):
+        f = tmpdir.join('file{0}.txt'.format(i))
+        f.write('-L{0}/lib -I{1}/include {2}/share\n'.format(
+            old_dep, old_prefix, old_root))
+        files.append(str(f))
+    untouched = tmpdir.join('untouched.txt')
+    untouched.write('nothing to see here\n')
+    untouched.setmtime(0)
+    files.append(str(untouched))
+
+    spack.relocate.relocate_text(
+        files, old_root, new_root, old_prefix, new_prefix,
+        '/old/spack', '/new/spack', {old_dep: new_dep}
+    )
+
+    # The new root contains the old one, so replacing prefixes one after
+    # the other would relocate some paths twice
+    for f in files[:-1]:
+        with open(f) as fd:
+            assert fd.read() == '-L/usr/dep/lib -I{0}/include {1}/share\n'\
+                .format(new_prefix, new_root)
+
+    # Files without old prefixes are not rewritten
+    assert untouched.mtime() == 0
+
+
+def test_relocate_text_bin_padding(tmpdir):
+    binary = tmpdir.join('binary')
+    binary.write_binary(
+        b'\x7fELF\x00/old/long/prefix/lib\x00/old/spack/bin\x00'
+        b'/old/dep/lib\x00')
+    original_size = binary.size()
+
+    spack.relocate.relocate_text_bin(
+        [str(binary)], '/old', '/new',
+        '/old/long/prefix', '/new/prefix',
+        '/old/spack', '/new/spack-longer',
+        {'/old/long/prefix': '/new/prefix',
+         '/old/dep': '/much/longer/dep'}
+    )
+
+    # The prefixes that grew are left alone
+    assert binary.size() == original_size
+    assert binary.read_binary() == (
+        b'\x7fELF\x00//////new/prefix/lib\x00/old/spack/bin\x00'
+        b'/old/dep/lib\x00')
@@ -3,11 +3,14 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
+import multiprocessing
 import os
 import pytest
 
+import spack.caches
 import spack.repo
 import spack.paths
+import spack.util.file_cache
 
 
 @pytest.fixture()
@@ -62,3 +65,122 @@ def test_repo_invisibles(mutable_mock_repo, extra_repo):
     with open(os.path.join(extra_repo.root, 'packages', '.invisible'), 'w'):
         pass
     extra_repo.all_package_names()
+
+
+def test_repo_index_in_parallel(mock_packages, monkeypatch, tmpdir):
+    def indexes(repo):
+        tags = dict((tag, sorted(pkgs))
+                    for tag, pkgs in repo.tag_index.items())
+        metadata = dict((name, repo.metadata_index[name].metadata)
+                        for name in repo.metadata_index)
+        return repo.provider_index, tags, repo.patch_index.index, metadata
+
+    monkeypatch.setattr(spack.caches, 'misc_cache',
+                        spack.util.file_cache.FileCache(str(tmpdir.join('a'))))
+    serial = indexes(spack.repo.Repo(spack.paths.mock_packages_path))
+
+    # Index the packages in two processes
+    monkeypatch.setattr(spack.caches, 'misc_cache',
+                        spack.util.file_cache.FileCache(str(tmpdir.join('b'))))
+    monkeypatch.setattr(spack.repo, 'parallel_index_threshold', 1)
+    monkeypatch.setattr(multiprocessing, 'cpu_count', lambda: 2)
+    results = []
+    index_packages = spack.repo.RepoIndex._index_packages
+
+    def _index_packages(self, pkg_names):
+        results.append(index_packages(self, pkg_names))
+        return results[-1]
+
+    monkeypatch.setattr(spack.repo.RepoIndex, '_index_packages',
+                        _index_packages)
+    parallel = indexes(spack.repo.Repo(spack.paths.mock_packages_path))
+
+    # the metadata index is built apart from the other indexes
+    assert len(results) == 2
+    assert sorted(results[0]) == ['patches', 'providers', 'tags']
+    assert sorted(results[1]) == ['metadata']
+    assert parallel == serial
+
+
+def test_metadata_index_is_built_on_demand(mock_packages, monkeypatch,
+                                           tmpdir):
+    monkeypatch.setattr(spack.caches, 'misc_cache',
+                        spack.util.file_cache.FileCache(str(tmpdir)))
+    repo = spack.repo.Repo(spack.paths.mock_packages_path)
+    assert repo.provider_index
+    assert not os.path.exists(str(tmpdir.join('metadata')))
+
+    assert repo.package_metadata('mpich').name == 'mpich'
+    assert os.path.exists(str(tmpdir.join('metadata')))
+
+
+def test_package_checker_persists_names(monkeypatch, tmpdir):
+    monkeypatch.setattr(spack.caches, 'misc_cache',
+                        spack.util.file_cache.FileCache(str(tmpdir.join('c'))))
+    packages = tmpdir.mkdir('packages')
+    for name in ('a', 'b'):
+        packages.mkdir(name).join('package.py').write('')
+    packages.mkdir('not-a-package')
+    os.utime(str(packages), (1000, 1000))
+
+    def checker():
+        monkeypatch.setattr(spack.repo.FastPackageChecker, '_names_cache', {})
+        monkeypatch.setattr(spack.repo.FastPackageChecker, '_paths_cache', {})
+        return spack.repo.FastPackageChecker(str(packages))
+
+    assert sorted(checker()) == ['a', 'b']
+
+    # The names are read from the misc cache, and the package files are
+    # only stat'ed when their stats are needed
+    stat, stats = os.stat, []
+
+    def _stat(path, *args, **kwargs):
+        if str(path).startswith(str(packages)):
+            stats.append(path)
+        return stat(path, *args, **kwargs)
+
+    def _listdir(path):
+        assert False, 'the packages directory should not be listed'
+    monkeypatch.setattr(os, 'stat', _stat)
+    monkeypatch.setattr(os, 'listdir', _listdir)
+    pkgs = checker()
+    assert 'a' in pkgs and 'not-a-package' not in pkgs
+    assert sorted(pkgs) == ['a', 'b']
+    assert stats == [str(packages),
+                     str(packages.join('not-a-package', 'package.py'))]
+    assert pkgs['b'].st_mtime == os.path.getmtime(
+        str(packages.join('b', 'package.py')))
+    monkeypatch.undo()
+
+    # Adding a package file to an existing directory does not modify the
+    # packages directory
+    monkeypatch.setattr(spack.caches, 'misc_cache',
+                        spack.util.file_cache.FileCache(str(tmpdir.join('c'))))
+    packages.join('not-a-package', 'package.py').write('')
+    assert sorted(checker()) == ['a', 'b', 'not-a-package']
+    packages.join('not-a-package', 'package.py').remove()
+
+    # Adding a package modifies the packages directory
+    monkeypatch.setattr(spack.caches, 'misc_cache',
+                        spack.util.file_cache.FileCache(str(tmpdir.join('c'))))
+    packages.mkdir('c').join('package.py').write('')
+    os.utime(str(packages), (2000, 2000))
+    assert sorted(checker()) == ['a', 'b', 'c']
+
+
+def test_package_checker_stats_in_parallel(monkeypatch, tmpdir):
+    packages = tmpdir.mkdir('packages')
+    for i in range(200):
+        packages.mkdir('pkg%d' % i).join('package.py').write('')
+    packages.mkdir('empty')
+
+    monkeypatch.setattr(spack.caches, 'misc_cache',
+                        spack.util.file_cache.FileCache(str(tmpdir.join('c'))))
+    monkeypatch.setattr(spack.repo.FastPackageChecker, '_names_cache', {})
+    monkeypatch.setattr(spack.repo.FastPackageChecker, '_paths_cache', {})
+    monkeypatch.setattr(spack.repo.FastPackageChecker, 'stat_threads', 4)
+    pkgs = spack.repo.FastPackageChecker(str(packages))
+    assert len(pkgs) == 200 and 'empty' not in pkgs
+    assert pkgs.last_mtime() == max(
+        os.path.getmtime(str(packages.join(name, 'package.py')))
+        for name in pkgs)
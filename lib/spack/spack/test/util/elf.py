@@ -0,0 +1,115 @@
+# Copyright 2013-2020 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+import pytest
+
+import spack.relocate
+import spack.util.elf as elf
+import spack.util.executable
+
+
+@pytest.fixture()
+def compile_with_rpaths(tmpdir):
+    source = tmpdir.join('main.c')
+    source.write("""
+int main(){
+    return 0;
+}
+""")
+
+    def _factory(rpaths, dtags='--disable-new-dtags'):
+        gcc = spack.util.executable.which('gcc')
+        executable = source.dirpath('main.x')
+        opts = ['-Wl,{0}'.format(dtags), str(source), '-o', str(executable)]
+        if rpaths:
+            opts.insert(0, '-Wl,-rpath={0}'.format(':'.join(rpaths)))
+        gcc(*opts)
+        return str(executable)
+
+    return _factory
+
+
+@pytest.mark.requires_executables('gcc')
+@pytest.mark.parametrize('dtags,tag', [
+    ('--disable-new-dtags', elf.DT_RPATH),
+    ('--enable-new-dtags', elf.DT_RUNPATH)
+])
+def test_get_rpaths(compile_with_rpaths, dtags, tag):
+    executable = compile_with_rpaths(['/usr/lib', '$ORIGIN/lib'], dtags)
+
+    with open(executable, 'rb') as f:
+        info = elf.parse_dynamic_info(f)
+
+    assert list(info.strings) == [tag]
+    assert elf.get_rpaths(executable) == ['/usr/lib', '$ORIGIN/lib']
+
+
+@pytest.mark.requires_executables('gcc')
+def test_get_rpaths_none(compile_with_rpaths):
+    executable = compile_with_rpaths([])
+    assert elf.get_rpaths(executable) == []
+
+    # Nothing to do if no RPATH is requested, but no room to add one
+    assert elf.set_rpaths(executable, [])
+    assert not elf.set_rpaths(executable, ['/foo'])
+
+
+@pytest.mark.requires_executables('gcc')
+@pytest.mark.parametrize('dtags', [
+    '--disable-new-dtags', '--enable-new-dtags'
+])
+def test_set_rpaths_in_place(compile_with_rpaths, dtags):
+    executable = compile_with_rpaths(['/usr/local/lib', '/usr/lib64'], dtags)
+
+    assert elf.set_rpaths(executable, ['/foo/lib', '/usr/lib64'])
+    assert elf.get_rpaths(executable) == ['/foo/lib', '/usr/lib64']
+
+    # The RPATH is always written as DT_RPATH, as with --force-rpath
+    with open(executable, 'rb') as f:
+        assert list(elf.parse_dynamic_info(f).strings) == [elf.DT_RPATH]
+
+    # The rewritten binary still runs
+    spack.util.executable.Executable(executable)()
+
+
+@pytest.mark.requires_executables('gcc')
+def test_set_rpaths_too_long(compile_with_rpaths):
+    executable = compile_with_rpaths(['/usr/lib'])
+
+    assert not elf.set_rpaths(executable, ['/a/much/longer/path/lib'])
+    assert elf.get_rpaths(executable) == ['/usr/lib']
+
+
+def test_not_elf(tmpdir):
+    script = tmpdir.join('script.sh')
+    script.write('#!/bin/bash\necho hello\n')
+
+    with pytest.raises(elf.ElfParsingError):
+        elf.get_rpaths(str(script))
+
+    with pytest.raises(elf.ElfParsingError):
+        elf.set_rpaths(str(script), ['/usr/lib'])
+
+
+@pytest.mark.requires_executables('gcc')
+def test_relocate_without_patchelf(compile_with_rpaths, monkeypatch):
+    def _no_patchelf():
+        raise AssertionError('patchelf should not be needed')
+
+    monkeypatch.setattr(spack.relocate, '_patchelf', _no_patchelf)
+
+    executable = compile_with_rpaths(['/opt/old/prefix/lib', '/usr/lib64'])
+    spack.relocate.relocate_elf_binaries(
+        binaries=[executable],
+        orig_root='/opt/old',
+        new_root=None,
+        new_prefixes={'/opt/old/prefix': '/new/prefix'},
+        rel=False,
+        orig_prefix=None, new_prefix=None
+    )
+
+    assert spack.relocate._elf_rpaths_for(executable) == [
+        '/new/prefix/lib', '/usr/lib64'
+    ]
@@ -0,0 +1,83 @@
+# Copyright 2013-2020 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+import os
+import sys
+
+import pytest
+
+import spack.util.executable
+import spack.util.file_type as file_type
+
+
+@pytest.mark.parametrize('data,expected', [
+    (b'', ('inode', 'x-empty')),
+    (b'\x7fELF\x02\x01\x01' + b'\x00' * 9 + b'\x02\x00',
+     ('application', 'x-executable')),
+    (b'\x7fELF\x02\x01\x01' + b'\x00' * 9 + b'\x03\x00',
+     ('application', 'x-sharedlib')),
+    (b'\x7fELF\x01\x02\x01' + b'\x00' * 9 + b'\x00\x01',
+     ('application', 'x-object')),
+    (b'\xcf\xfa\xed\xfe\x07\x00\x00\x01', ('application', 'x-mach-binary')),
+    (b'\xca\xfe\xba\xbe\x00\x00\x00\x02', ('application', 'x-mach-binary')),
+    (b'\xca\xfe\xba\xbe\x00\x00\x00\x34', ('application', 'x-java-applet')),
+    (b'!<arch>\nfoo.o/', ('application', 'x-archive')),
+    (b'\x1f\x8b\x08\x00', ('application', 'gzip')),
+    (b'#!/bin/bash\necho hello\n', ('text', 'x-shellscript')),
+    (b'#!/usr/bin/env python\nprint(1)\n', ('text', 'x-python')),
+    (b'#!/usr/bin/perl -w\nprint 1;\n', ('text', 'x-perl')),
+    (b'#!/opt/custom/interpreter\n', ('text', 'plain')),
+    (b'prefix=/usr/local\n\tlibdir=${prefix}/lib\n', ('text', 'plain')),
+    (u'caf\xe9 cr\xe8me\n'.encode('utf-8'), ('text', 'plain')),
+    (b'some text\x00with a NUL', ('application', 'octet-stream')),
+])
+def test_classify(data, expected):
+    assert file_type.classify(data) == expected
+
+
+def test_mime_type_special_files(tmpdir):
+    regular = tmpdir.join('regular.txt')
+    regular.write('hello\n')
+    link = tmpdir.join('link')
+    os.symlink(str(regular), str(link))
+
+    assert file_type.mime_type(str(regular)) == ('text', 'plain')
+    assert file_type.mime_type(str(link)) == ('inode', 'symlink')
+    assert file_type.mime_type(str(tmpdir)) == ('inode', 'directory')
+
+
+def test_mime_types(tmpdir):
+    paths = []
+    for i in range(10):
+        path = tmpdir.join('file{0}'.format(i))
+        path.write('#!/bin/sh\n' if i % 2 else 'text\n')
+        paths.append(str(path))
+
+    types = file_type.mime_types(paths, nthreads=4)
+    for i, path in enumerate(paths):
+        subtype = 'x-shellscript' if i % 2 else 'plain'
+        assert types[path] == ('text', subtype)
+
+
+@pytest.mark.requires_executables('file')
+def test_mime_type_same_as_file(tmpdir):
+    """Compare the results to the ``file`` command on a few real files."""
+    script = tmpdir.join('script.sh')
+    script.write('#!/bin/bash\necho hello\n')
+    text = tmpdir.join('text.txt')
+    text.write('some text\n')
+
+    file_cmd = spack.util.executable.which('file')
+    for path in (sys.executable, str(script), str(text)):
+        path = os.path.realpath(path)
+        output = file_cmd('-b', '-h', '--mime-type', path, output=str)
+        m_type, m_subtype = output.strip().split('/')
+
+        ours = file_type.mime_type(path)
+        assert ours[0] == m_type
+        if m_type == 'text':
+            assert ours[1] in (m_subtype, 'plain')
+        elif m_subtype != 'x-pie-executable':
+            assert ours[1] == m_subtype
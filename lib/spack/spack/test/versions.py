@@ -7,9 +7,12 @@
 We try to maintain compatibility with RPM's version semantics
 where it makes sense.
 """
+import copy
+import pickle
+
 import pytest
 
-from spack.version import Version, VersionList, ver
+from spack.version import Version, VersionList, VersionRange, ver
 
 
 def assert_ver_lt(a, b):
@@ -562,3 +565,41 @@ def test_list_highest():
     assert vl2.highest_numeric() is None
     assert vl2.preferred() == Version('develop')
     assert vl2.lowest() == Version('master')
+
+
+def test_versions_are_interned():
+    v = Version('1.2.3')
+    assert Version('1.2.3') is v
+    assert Version(v) is v
+    assert copy.deepcopy(v) is v
+    assert pickle.loads(pickle.dumps(v)) is v
+
+    # Versions with different strings are different objects, even if equal
+    assert Version('1.02.3') == v
+    assert str(Version('1.02.3')) == '1.02.3'
+
+    with pytest.raises(AttributeError):
+        v.patch = '1'
+
+
+def test_sort_keys_order_versions():
+    versions = ['a', 'b', '0.9', '1', '1.a', '1.0', '1.1', '1.1b', '1.1.1',
+                '1.10', '2', 'trunk', 'head', 'master', 'develop',
+                'develop.1']
+    for i, a in enumerate(versions):
+        for b in versions[i + 1:]:
+            assert_ver_lt(a, b)
+    assert sorted(Version(v) for v in reversed(versions)) == \
+        [Version(v) for v in versions]
+
+
+def test_version_in_range_of_mixed_types():
+    r = VersionRange('1.2', '1.4')
+    assert Version('1.4.5') in r
+    assert Version('1.1') not in r
+    assert VersionRange('1.3', '1.4.2') in r
+    assert VersionRange('1.3', None) not in r
+    assert VersionList(['1.2.1', '1.3:1.4']) in r
+    assert None not in r
+    assert Version('1.0') in VersionRange(None, '1.4')
+    assert VersionRange('1.0', None) in VersionRange('1.0', None)
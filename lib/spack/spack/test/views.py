@@ -41,3 +41,29 @@ def test_remove_extensions_ordered(install_mockery, mock_fetch, tmpdir):
 
     e1 = e2['extension1']
     view.remove_specs(e1, e2)
+
+
+def test_view_manifest_of_conflicting_files(
+        install_mockery, mock_fetch, tmpdir):
+    view_dir = str(tmpdir.join('view'))
+    view = YamlFilesystemView(view_dir, YamlDirectoryLayout(view_dir),
+                              ignore_conflicts=True, manifest=True)
+    specs = [Spec(x).concretized() for x in ('libelf', 'libdwarf')]
+    for spec in specs:
+        spec.package.do_install(fake=True)
+        with open(os.path.join(spec.prefix, 'common.txt'), 'w') as f:
+            f.write(spec.name)
+    view.add_specs(*specs, with_dependencies=False)
+
+    # The file is recorded only for the package it is linked to
+    common = os.path.join(view_dir, 'common.txt')
+    owner = next(s for s in specs
+                 if os.readlink(common).startswith(s.prefix))
+    for spec in specs:
+        recorded = 'common.txt' in view.manifest.files(spec.dag_hash())
+        assert recorded == (spec is owner)
+
+    # and it stays in the view when the other package is removed
+    other = next(s for s in specs if s is not owner)
+    view.remove_specs(other, with_dependents=False)
+    assert os.readlink(common).startswith(owner.prefix)
@@ -3,9 +3,20 @@
 #
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
+import collections
+import contextlib
+import gzip
+import multiprocessing.pool
 import re
 import os
+import shutil
+import signal
+import subprocess
+import threading
+import zlib
 from itertools import product
+
+import spack.error
 from spack.util.executable import which
 
 # Supported archive extensions.
@@ -64,3 +75,172 @@ def extension(path):
         if re.search(suffix, path):
             return t
     return None
+
+
+def _gzip_member(data, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+class ParallelGzipWriter(object):
+    """Write-only file object compressing the data written to it with gzip,
+    in blocks compressed concurrently by a pool of threads.
+
+    Each block is written as a gzip member of its own, in order: the
+    result is a valid gzip file, that ``gzip`` and Python's ``gzip`` module
+    decompress as a whole (but not ``tarfile`` in stream mode, e.g. with
+    ``mode='r|gz'``, which stops after the first member).
+    """
+
+    def __init__(self, fileobj, level=6, threads=None, block_size=1 << 20):
+        self.fileobj = fileobj
+        self.level = level
+        self.block_size = block_size
+        self.threads = threads or multiprocessing.cpu_count()
+        self.pool = multiprocessing.pool.ThreadPool(self.threads)
+        self.buffer = []
+        self.buffered = 0
+        self.pending = collections.deque()
+        self.written = False
+
+    def _compress(self, block):
+        self.pending.append(
+            self.pool.apply_async(_gzip_member, (block, self.level)))
+        # keep a bounded number of blocks in memory
+        while len(self.pending) > 2 * self.threads:
+            self.fileobj.write(self.pending.popleft().get())
+        self.written = True
+
+    def write(self, data):
+        self.buffer.append(data)
+        self.buffered += len(data)
+        if self.buffered < self.block_size:
+            return
+        data = b''.join(self.buffer)
+        start = 0
+        while len(data) - start >= self.block_size:
+            self._compress(data[start:start + self.block_size])
+            start += self.block_size
+        self.buffer = [data[start:]]
+        self.buffered = len(data) - start
+
+    def close(self):
+        if self.pool is None:
+            return
+        try:
+            if self.buffered or not self.written:
+                self._compress(b''.join(self.buffer))
+            while self.pending:
+                self.fileobj.write(self.pending.popleft().get())
+        finally:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+
+def _pipe_command(compression, threads, decompress=False):
+    """Command line of the executable (de)compressing the given format
+    through pipes."""
+    exe = which(compression)
+    if exe is None:
+        raise CompressionError(
+            'Cannot find the {0} executable'.format(compression),
+            'Install it with `spack install {0}` and load it, or add it '
+            'to PATH'.format(compression))
+    args = exe.exe + ['-q', '-c']
+    if decompress:
+        args.append('-d')
+    # both xz and zstd take -T0 for one thread per CPU
+    args.append('-T{0}'.format(threads or 0))
+    return args
+
+
+@contextlib.contextmanager
+def compressed_stream(fileobj, compression='gzip', threads=None):
+    """Context manager returning a write-only file object, compressing the
+    data written to it into ``fileobj``.
+
+    Args:
+        fileobj: file object the compressed data is written to
+        compression (str): one of ``gzip``, ``xz`` or ``zstd``. The latter
+            two are compressed by their executables, which must be in
+            ``PATH``.
+        threads (int or None): number of threads compressing the data
+            (default: one per CPU)
+    """
+    if compression == 'gzip':
+        if threads == 1:
+            stream = gzip.GzipFile(fileobj=fileobj, mode='wb')
+        else:
+            stream = ParallelGzipWriter(fileobj, threads=threads)
+        try:
+            yield stream
+        finally:
+            stream.close()
+        return
+
+    # xz and zstd read the data from a pipe, and their output is copied to
+    # fileobj from another pipe, by a thread
+    process = subprocess.Popen(_pipe_command(compression, threads),
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    errors = []
+
+    def copy_output():
+        try:
+            shutil.copyfileobj(process.stdout, fileobj)
+        except Exception as e:
+            errors.append(e)
+
+    copy = threading.Thread(target=copy_output)
+    copy.daemon = True
+    copy.start()
+    try:
+        yield process.stdin
+    finally:
+        process.stdin.close()
+        copy.join()
+        process.stdout.close()
+        returncode = process.wait()
+
+    if errors:
+        raise errors[0]
+    if returncode != 0:
+        raise CompressionError('{0} exited with status {1}'.format(
+            compression, returncode))
+
+
+@contextlib.contextmanager
+def decompressed_stream(path, compression='gzip', threads=None):
+    """Context manager returning a read-only, non seekable file object
+    with the decompressed data of a file.
+
+    Args:
+        path (str): the compressed file
+        compression (str): one of ``gzip``, ``xz`` or ``zstd``
+        threads (int or None): number of threads decompressing the data,
+            for the formats that support it (default: one per CPU)
+    """
+    if compression == 'gzip':
+        with contextlib.closing(gzip.open(path, 'rb')) as stream:
+            yield stream
+        return
+
+    with open(path, 'rb') as f:
+        process = subprocess.Popen(
+            _pipe_command(compression, threads, decompress=True),
+            stdin=f, stdout=subprocess.PIPE)
+    try:
+        yield process.stdout
+    finally:
+        process.stdout.close()
+        returncode = process.wait()
+
+    # the end of the output may not have been read, e.g. the padding at the
+    # end of a tar archive
+    if returncode not in (0, -signal.SIGPIPE):
+        raise CompressionError('{0} exited with status {1}'.format(
+            compression, returncode))
+
+
+class CompressionError(spack.error.SpackError):
+    """Raised when data cannot be compressed or decompressed."""
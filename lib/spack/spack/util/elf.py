@@ -0,0 +1,252 @@
+# Copyright 2013-2020 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Read and rewrite the RPATH of ELF objects without external tools.
+
+Only the dynamic section is inspected: the ``DT_RPATH``/``DT_RUNPATH``
+entries point into the dynamic string table, whose location is found by
+mapping the ``DT_STRTAB`` address through the ``PT_LOAD`` segments.
+
+A new RPATH is written in place of the old one, padded with NUL bytes, so it
+cannot be longer than the string it replaces. Growing the string table is
+left to ``patchelf``.
+"""
+import struct
+
+import spack.error
+
+#: Magic number at the start of every ELF file
+ELF_MAGIC = b'\x7fELF'
+
+ELFCLASS32 = 1
+ELFCLASS64 = 2
+
+ELFDATA2LSB = 1
+ELFDATA2MSB = 2
+
+PT_LOAD = 1
+PT_DYNAMIC = 2
+
+DT_NULL = 0
+DT_STRTAB = 5
+DT_STRSZ = 10
+DT_RPATH = 15
+DT_RUNPATH = 29
+
+#: struct formats of the ELF header, program header and dynamic entries
+#: (without byte order), keyed by ELF class
+_FORMATS = {
+    ELFCLASS32: ('16sHHIIIIIHHHHHH', 'IIIIIIII', 'iI'),
+    ELFCLASS64: ('16sHHIQQQIHHHHHH', 'IIQQQQQQ', 'qQ'),
+}
+
+
+class ElfParsingError(spack.error.SpackError):
+    """Raised when a file is not an ELF object that can be handled."""
+
+
+class ElfDynamicInfo(object):
+    """Location of the RPATH related data of an ELF object.
+
+    Attributes:
+        entries (dict): file offsets of the dynamic entries of the rpath
+            tags (``DT_RPATH``/``DT_RUNPATH``) present in the file
+        strings (dict): the (file offset, value) of the string of each
+            rpath tag present in the file
+        dyn_format (str): struct format of a dynamic entry
+    """
+
+    def __init__(self, dyn_format):
+        self.entries = {}
+        self.strings = {}
+        self.dyn_format = dyn_format
+
+    @property
+    def rpath_tag(self):
+        """The tag honored by the dynamic loader (``DT_RUNPATH`` takes
+        precedence over ``DT_RPATH``) or None if the object has no rpath."""
+        for tag in (DT_RUNPATH, DT_RPATH):
+            if tag in self.strings:
+                return tag
+        return None
+
+
+def _unpack(fmt, data, offset=0):
+    try:
+        return struct.unpack_from(fmt, data, offset)
+    except struct.error as e:
+        raise ElfParsingError('Truncated ELF object: {0}'.format(str(e)))
+
+
+def parse_dynamic_info(f):
+    """Locate the rpath entries of an ELF object.
+
+    Args:
+        f (file): ELF object opened in binary mode
+
+    Returns:
+        (ElfDynamicInfo) the locations of the rpath entries and strings
+
+    Raises:
+        ElfParsingError: if the file is not a valid ELF object
+    """
+    f.seek(0)
+    ident = f.read(16)
+    if len(ident) < 16 or ident[:4] != ELF_MAGIC:
+        raise ElfParsingError('Not an ELF object')
+
+    elf_class, elf_data = bytearray(ident[4:6])
+    if elf_class not in _FORMATS or \
+            elf_data not in (ELFDATA2LSB, ELFDATA2MSB):
+        raise ElfParsingError('Unsupported ELF class or byte order')
+
+    order = '<' if elf_data == ELFDATA2LSB else '>'
+    hdr_fmt, phdr_fmt, dyn_fmt = [order + fmt for fmt in _FORMATS[elf_class]]
+
+    f.seek(0)
+    header = _unpack(hdr_fmt, f.read(struct.calcsize(hdr_fmt)))
+    phoff, phentsize, phnum = header[5], header[9], header[10]
+    info = ElfDynamicInfo(dyn_fmt)
+    if phnum == 0:
+        # Relocatable object: there is no dynamic section
+        return info
+
+    f.seek(phoff)
+    phdrs_data = f.read(phentsize * phnum)
+    loads, dynamic = [], None
+    for i in range(phnum):
+        phdr = _unpack(phdr_fmt, phdrs_data, i * phentsize)
+        if elf_class == ELFCLASS32:
+            p_type, p_offset, p_vaddr, _, p_filesz = phdr[:5]
+        else:
+            p_type, _, p_offset, p_vaddr, _, p_filesz = phdr[:6]
+        if p_type == PT_LOAD:
+            loads.append((p_vaddr, p_offset, p_filesz))
+        elif p_type == PT_DYNAMIC:
+            dynamic = (p_offset, p_filesz)
+
+    if dynamic is None:
+        # Statically linked
+        return info
+
+    # Read the dynamic section up to its DT_NULL terminator
+    dyn_offset, dyn_size = dynamic
+    dyn_entsize = struct.calcsize(dyn_fmt)
+    f.seek(dyn_offset)
+    dyn_data = f.read(dyn_size)
+    values = {}
+    for i in range(len(dyn_data) // dyn_entsize):
+        tag, value = _unpack(dyn_fmt, dyn_data, i * dyn_entsize)
+        if tag == DT_NULL:
+            break
+        if tag in (DT_RPATH, DT_RUNPATH):
+            info.entries[tag] = dyn_offset + i * dyn_entsize
+        values.setdefault(tag, value)
+
+    if not info.entries:
+        return info
+
+    if DT_STRTAB not in values:
+        raise ElfParsingError('Missing dynamic string table')
+
+    # Map the virtual address of the string table to a file offset
+    strtab_addr = values[DT_STRTAB]
+    for vaddr, offset, filesz in loads:
+        if vaddr <= strtab_addr < vaddr + filesz:
+            strtab_offset = strtab_addr - vaddr + offset
+            break
+    else:
+        raise ElfParsingError('Dynamic string table is not loaded')
+
+    strtab_size = values.get(DT_STRSZ)
+    for tag, entry_offset in info.entries.items():
+        str_offset = values[tag]
+        if strtab_size is not None and str_offset >= strtab_size:
+            raise ElfParsingError('RPATH outside of the string table')
+
+        f.seek(strtab_offset + str_offset)
+        data = b''
+        while True:
+            chunk = f.read(256)
+            if not chunk:
+                raise ElfParsingError('Unterminated RPATH string')
+            end = chunk.find(b'\0')
+            if end >= 0:
+                data += chunk[:end]
+                break
+            data += chunk
+        info.strings[tag] = (strtab_offset + str_offset, data)
+
+    return info
+
+
+def get_rpaths(path):
+    """Return the RPATHs of an ELF executable or library.
+
+    As for the dynamic loader, ``DT_RUNPATH`` takes precedence over
+    ``DT_RPATH``.
+
+    Args:
+        path (str): path to the ELF object
+
+    Returns:
+        (list) the RPATHs, possibly empty
+
+    Raises:
+        ElfParsingError: if the file is not a valid ELF object
+    """
+    with open(path, 'rb') as f:
+        info = parse_dynamic_info(f)
+
+    tag = info.rpath_tag
+    if tag is None:
+        return []
+
+    value = info.strings[tag][1].decode('utf-8')
+    return value.split(':') if value else []
+
+
+def set_rpaths(path, rpaths):
+    """Replace the RPATH of an ELF executable or library in place.
+
+    The new value is written as ``DT_RPATH`` (as ``patchelf --force-rpath``
+    would) over the existing string. This is only possible if it is not
+    longer than the current RPATH and the object has a single rpath entry.
+
+    Args:
+        path (str): path to the ELF object
+        rpaths (list): the new RPATHs
+
+    Returns:
+        (bool) True if the RPATH was rewritten (or already empty when no
+            RPATH was requested), False if the new value does not fit
+
+    Raises:
+        ElfParsingError: if the file is not a valid ELF object
+    """
+    new_value = ':'.join(rpaths).encode('utf-8')
+    with open(path, 'rb+') as f:
+        info = parse_dynamic_info(f)
+
+        tag = info.rpath_tag
+        if tag is None:
+            return not new_value
+
+        if len(info.entries) > 1:
+            return False
+
+        str_offset, old_value = info.strings[tag]
+        if len(new_value) > len(old_value):
+            return False
+
+        if new_value != old_value:
+            f.seek(str_offset)
+            f.write(new_value + b'\0' * (len(old_value) - len(new_value)))
+
+        if tag != DT_RPATH:
+            f.seek(info.entries[tag])
+            f.write(struct.pack(info.dyn_format[:2], DT_RPATH))
+
+    return True
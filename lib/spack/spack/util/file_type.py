@@ -0,0 +1,163 @@
+# Copyright 2013-2020 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Classify files by MIME type from their first few KB, in process.
+
+The results follow ``file -b -h --mime-type`` for the types Spack cares
+about when relocating binary packages: ELF and Mach-O objects, scripts and
+text files. Anything else is reported as generic binary data.
+"""
+import multiprocessing.pool
+import os
+import stat
+import struct
+
+#: Number of bytes read from the start of a file to classify it
+SNIFF_SIZE = 8192
+
+#: ELF object types (``e_type``) mapped to their MIME subtype
+_ELF_SUBTYPES = {
+    1: 'x-object',
+    2: 'x-executable',
+    3: 'x-sharedlib',
+    4: 'x-coredump',
+}
+
+#: Magic numbers of Mach-O objects (32/64 bits, both byte orders)
+_MACHO_MAGICS = (
+    b'\xfe\xed\xfa\xce', b'\xce\xfa\xed\xfe',
+    b'\xfe\xed\xfa\xcf', b'\xcf\xfa\xed\xfe',
+)
+
+#: Magic numbers of other common binary formats
+_BINARY_MAGICS = (
+    (b'!<arch>\n', 'x-archive'),
+    (b'\x1f\x8b', 'gzip'),
+    (b'BZh', 'x-bzip2'),
+    (b'\xfd7zXZ\x00', 'x-xz'),
+    (b'PK\x03\x04', 'zip'),
+)
+
+#: Script interpreters mapped to the MIME subtype of their scripts
+_SCRIPT_SUBTYPES = (
+    ('python', 'x-python'),
+    ('perl', 'x-perl'),
+    ('ruby', 'x-ruby'),
+    ('bash', 'x-shellscript'),
+    ('zsh', 'x-shellscript'),
+    ('ksh', 'x-shellscript'),
+    ('csh', 'x-shellscript'),
+    ('sh', 'x-shellscript'),
+)
+
+#: Bytes found in text files: printable ASCII, any byte with the high bit
+#: set (e.g., UTF-8 or Latin-1) and the usual control characters
+_TEXT_BYTES = bytes(bytearray(
+    sorted(set(range(0x20, 0x100)) - set([0x7f]) |
+           set([0x07, 0x08, 0x09, 0x0a, 0x0b, 0x0c, 0x0d, 0x1b]))))
+
+
+def _elf_subtype(data):
+    if len(data) < 18:
+        return 'octet-stream'
+    byte_order = '<' if data[5:6] == b'\x01' else '>'
+    e_type, = struct.unpack_from(byte_order + 'H', data, 16)
+    return _ELF_SUBTYPES.get(e_type, 'octet-stream')
+
+
+def _script_subtype(first_line):
+    interpreter = first_line[2:].strip().split(b' ')
+    # Look through /usr/bin/env and similar launchers
+    names = [os.path.basename(word) for word in interpreter if word]
+    for name in names:
+        for pattern, subtype in _SCRIPT_SUBTYPES:
+            if name.startswith(pattern.encode('ascii')):
+                return subtype
+    return 'plain'
+
+
+def classify(data):
+    """Return the MIME type and subtype of a file from its first bytes.
+
+    Args:
+        data (bytes): the first bytes of the file (see ``SNIFF_SIZE``)
+
+    Returns:
+        Tuple containing the MIME type and subtype
+    """
+    if not data:
+        return 'inode', 'x-empty'
+
+    if data.startswith(b'\x7fELF'):
+        return 'application', _elf_subtype(data)
+
+    if data[:4] in _MACHO_MAGICS:
+        return 'application', 'x-mach-binary'
+
+    # Universal Mach-O binaries share their magic with Java classes, which
+    # have a much larger version number in place of the number of archs
+    if data.startswith(b'\xca\xfe\xba\xbe') and len(data) >= 8:
+        n_archs, = struct.unpack_from('>I', data, 4)
+        if 0 < n_archs < 20:
+            return 'application', 'x-mach-binary'
+        return 'application', 'x-java-applet'
+
+    for magic, subtype in _BINARY_MAGICS:
+        if data.startswith(magic):
+            return 'application', subtype
+
+    if bytearray(data).translate(None, _TEXT_BYTES):
+        return 'application', 'octet-stream'
+
+    if data.startswith(b'#!'):
+        return 'text', _script_subtype(data.split(b'\n', 1)[0])
+
+    return 'text', 'plain'
+
+
+def mime_type(path):
+    """Returns the MIME type and subtype of a file, without following
+    symbolic links.
+
+    Args:
+        path (str): file to be analyzed
+
+    Returns:
+        Tuple containing the MIME type and subtype
+    """
+    mode = os.lstat(path).st_mode
+    if stat.S_ISLNK(mode):
+        return 'inode', 'symlink'
+    if stat.S_ISDIR(mode):
+        return 'inode', 'directory'
+    if not stat.S_ISREG(mode):
+        return 'inode', 'x-special'
+
+    with open(path, 'rb') as f:
+        return classify(f.read(SNIFF_SIZE))
+
+
+def mime_types(paths, nthreads=None):
+    """Returns the MIME types of many files, classifying them concurrently.
+
+    Args:
+        paths (list): files to be analyzed
+        nthreads (int or None): number of threads to use (default: one
+            per CPU)
+
+    Returns:
+        Dictionary mapping each path to its (type, subtype) tuple
+    """
+    paths = list(paths)
+    if len(paths) < 2:
+        return dict((p, mime_type(p)) for p in paths)
+
+    tp = multiprocessing.pool.ThreadPool(nthreads)
+    try:
+        types = tp.map(mime_type, paths)
+    finally:
+        tp.close()
+        tp.join()
+    return dict(zip(paths, types))
@@ -4,15 +4,23 @@
 # SPDX-License-Identifier: (Apache-2.0 OR MIT)
 
 """Wrapper for ``llnl.util.lock`` allows locking to be enabled/disabled."""
+import glob
 import os
+import socket
 import stat
+import sys
+import tempfile
+import time
 
 import llnl.util.lock
+from llnl.util.filesystem import mkdirp
 from llnl.util.lock import *  # noqa
 
 import spack.config
 import spack.error
 import spack.paths
+import spack.util.path
+import spack.util.spack_json as sjson
 
 
 class Lock(llnl.util.lock.Lock):
@@ -72,3 +80,76 @@ def check_lock_safety(path):
                 "Running a shared spack without locks is unsafe. You must "
                 "restrict permissions on {0} or enable locks.").format(path)
             raise spack.error.SpackError(msg, long_msg)
+
+
+def lock_stats_dir():
+    """Directory with the lock statistics of Spack processes, or None if
+    they are not recorded (``config:lock_stats_dir``)."""
+    path = spack.config.get('config:lock_stats_dir')
+    return spack.util.path.canonicalize_path(path) if path else None
+
+
+def write_lock_stats(directory):
+    """Write the statistics of the locks taken by this process to a new
+    JSON file in ``directory``, named after the host and the process id.
+
+    Returns:
+        (str or None) path of the file, or None if no lock was taken
+    """
+    if not llnl.util.lock.lock_stats:
+        return None
+
+    host = socket.getfqdn()
+    now = time.time()
+    locks = []
+    for (path, start, length), stats in llnl.util.lock.lock_stats.items():
+        entry = stats.to_dict()
+        entry.update(path=path, start=start, length=length)
+        locks.append(entry)
+
+    data = {'host': host, 'pid': os.getpid(), 'time': now,
+            'command': ' '.join(sys.argv), 'locks': locks}
+
+    # Write to a temporary file, so that partial files are never read
+    mkdirp(directory)
+    fd, tmp = tempfile.mkstemp(
+        prefix='{0}-{1}-'.format(host, os.getpid()), suffix='.tmp',
+        dir=directory)
+    with os.fdopen(fd, 'w') as f:
+        sjson.dump(data, f)
+    filename = tmp[:-len('.tmp')] + '.json'
+    os.rename(tmp, filename)
+    return filename
+
+
+def read_lock_stats(paths):
+    """Read and aggregate the lock statistics written by Spack processes.
+
+    Args:
+        paths (list): JSON files written by ``write_lock_stats()``, or
+            directories containing them
+
+    Returns:
+        (tuple) number of processes read and a dictionary mapping
+            (path, start, length) of the locks to their ``LockStats``,
+            summed over the processes
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, '*.json'))))
+        else:
+            files.append(path)
+
+    totals = {}
+    for filename in files:
+        with open(filename) as f:
+            data = sjson.load(f)
+        for entry in data['locks']:
+            key = (entry['path'], entry['start'], entry['length'])
+            stats = llnl.util.lock.LockStats.from_dict(entry)
+            if key in totals:
+                totals[key].merge(stats)
+            else:
+                totals[key] = stats
+    return len(files), totals
@@ -43,6 +43,27 @@
 infinity_versions = ['develop', 'master', 'head', 'trunk']
 
 
+#: Regular expression for the segments of a version
+_segment_regex = re.compile(r'[a-zA-Z]+|[0-9]+')
+
+_valid_version = re.compile(VALID_VERSION)
+
+
+def _segment_key(segment):
+    """Sort key of a segment of a version.
+
+    Version comparison is designed for consistency with the way RPM does
+    things: numbers are always "newer" than letters, except for the
+    infinity-like versions, which are newer than anything else, in the
+    order of ``infinity_versions``.
+    """
+    if segment in infinity_versions:
+        return (2, -infinity_versions.index(segment))
+    if isinstance(segment, numbers.Integral):
+        return (1, segment)
+    return (0, segment)
+
+
 def int_if_int(string):
     """Convert a string to int if possible.  Otherwise, return a string."""
     try:
@@ -94,25 +115,48 @@ def coercing_method(a, b, *args, **kwargs):
 
 
 class Version(object):
-    """Class to represent versions"""
+    """Class to represent versions.
+
+    Versions are immutable and interned: constructing a version from a
+    string that was already parsed returns the same object. Each version
+    has a sort key, a tuple whose ordering is the ordering of versions
+    (see ``_segment_key``), so that comparisons are tuple comparisons.
+    """
+    __slots__ = ['string', 'version', 'separators', '_key', '_hash']
 
-    def __init__(self, string):
+    #: Versions already parsed, by class and string
+    _versions = {}
+
+    def __new__(cls, string):
         string = str(string)
+        try:
+            return cls._versions[cls, string]
+        except KeyError:
+            pass
 
-        if not re.match(VALID_VERSION, string):
+        if not _valid_version.match(string):
             raise ValueError("Bad characters in version string: %s" % string)
 
+        self = super(Version, cls).__new__(cls)
+
         # preserve the original string, but trimmed.
-        string = string.strip()
-        self.string = string
+        self.string = string.strip()
 
         # Split version into alphabetical and numeric segments
-        segment_regex = r'[a-zA-Z]+|[0-9]+'
-        segments = re.findall(segment_regex, string)
+        segments = _segment_regex.findall(self.string)
         self.version = tuple(int_if_int(seg) for seg in segments)
 
         # Store the separators from the original version string as well.
-        self.separators = tuple(re.split(segment_regex, string)[1:])
+        self.separators = tuple(_segment_regex.split(self.string)[1:])
+
+        self._key = tuple(_segment_key(seg) for seg in self.version)
+        self._hash = hash(self.version)
+
+        cls._versions[cls, string] = self
+        return self
+
+    def __reduce__(self):
+        return type(self), (self.string,)
 
     @property
     def dotted(self):
@@ -219,10 +263,7 @@ def satisfies(self, other):
         gcc@4.7 so that when a user asks to build with gcc@4.7, we can find
         a suitable compiler.
         """
-
-        nself = len(self.version)
-        nother = len(other.version)
-        return nother <= nself and self.version[:nother] == other.version
+        return self._key[:len(other._key)] == other._key
 
     def __iter__(self):
         return iter(self.version)
@@ -270,49 +311,19 @@ def __lt__(self, other):
            does things.  If you need more complicated versions in installed
            packages, you should override your package's version string to
            express it more sensibly.
-        """
-        if other is None:
-            return False
-
-        # Coerce if other is not a Version
-        # simple equality test first.
-        if self.version == other.version:
-            return False
-
-        # Standard comparison of two numeric versions
-        for a, b in zip(self.version, other.version):
-            if a == b:
-                continue
-            else:
-                if a in infinity_versions:
-                    if b in infinity_versions:
-                        return (infinity_versions.index(a) >
-                                infinity_versions.index(b))
-                    else:
-                        return False
-                if b in infinity_versions:
-                    return True
-
-                # Neither a nor b is infinity
-                # Numbers are always "newer" than letters.
-                # This is for consistency with RPM.  See patch
-                # #60884 (and details) from bugzilla #50977 in
-                # the RPM project at rpm.org.  Or look at
-                # rpmvercmp.c if you want to see how this is
-                # implemented there.
-                if type(a) != type(b):
-                    return type(b) == int
-                else:
-                    return a < b
 
-        # If the common prefix is equal, the one
-        # with more segments is bigger.
-        return len(self.version) < len(other.version)
+           Numbers are always "newer" than letters. This is for consistency
+           with RPM.  See patch #60884 (and details) from bugzilla #50977 in
+           the RPM project at rpm.org.  Or look at rpmvercmp.c if you want
+           to see how this is implemented there. If the common prefix is
+           equal, the one with more segments is bigger.
+        """
+        return other is not None and self._key < other._key
 
     @coerced
     def __eq__(self, other):
         return (other is not None and
-                type(other) == Version and self.version == other.version)
+                type(other) == Version and self._key == other._key)
 
     @coerced
     def __ne__(self, other):
@@ -320,24 +331,24 @@ def __ne__(self, other):
 
     @coerced
     def __le__(self, other):
-        return self == other or self < other
+        return other is not None and self._key <= other._key
 
     @coerced
     def __ge__(self, other):
-        return not (self < other)
+        return other is None or self._key >= other._key
 
     @coerced
     def __gt__(self, other):
-        return not (self == other) and not (self < other)
+        return other is None or self._key > other._key
 
     def __hash__(self):
-        return hash(self.version)
+        return self._hash
 
     @coerced
     def __contains__(self, other):
         if other is None:
             return False
-        return other.version[:len(self.version)] == self.version
+        return other._key[:len(self._key)] == self._key
 
     def is_predecessor(self, other):
         """True if the other version is the immediate predecessor of this one.
@@ -437,25 +448,29 @@ def __gt__(self, other):
     def concrete(self):
         return self.start if self.start == self.end else None
 
-    @coerced
     def __contains__(self, other):
-        if other is None:
+        # Versions are not coerced to ranges here, as this is called for
+        # every version of a package when concretizing
+        if type(other) == Version:
+            start = end = other
+        elif type(other) == VersionRange:
+            start, end = other.start, other.end
+        elif other is None:
             return False
+        else:
+            return other in VersionList([self])
 
-        in_lower = (self.start == other.start or
-                    self.start is None or
-                    (other.start is not None and (
-                        self.start < other.start or
-                        other.start in self.start)))
-        if not in_lower:
+        # A version prefixed by the start of the range sorts after it
+        if self.start is not None and (
+                start is None or self.start._key > start._key):
             return False
 
-        in_upper = (self.end == other.end or
-                    self.end is None or
-                    (other.end is not None and (
-                        self.end > other.end or
-                        other.end in self.end)))
-        return in_upper
+        if self.end is None:
+            return True
+        if end is None:
+            return False
+        return (self.end._key >= end._key or
+                end._key[:len(self.end._key)] == self.end._key)
 
     @coerced
     def satisfies(self, other):
@@ -0,0 +1,25 @@
+-- -*- lua -*-
+-- Module file created by spack (https://github.com/spack/spack) on 2026-10-18 06:51:05.836885
+--
+-- a@1.0%gcc@4.5.0+bvv foo=bar foobar=bar arch=test-debian6-x86_64/6pxjgfy
+--
+
+whatis([[Name : a]])
+whatis([[Version : 1.0]])
+whatis([[Target : x86_64]])
+whatis([[Short description : Simple package with one optional dependency]])
+
+help([[Simple package with one optional dependency]])
+
+
+if not isloaded("b/1.0-aosqxaa") then
+    load("b/1.0-aosqxaa")
+end
+
+prepend_path("PATH", "/tmp/pytest-of-root/pytest-271/mock_store0/test-debian6-x86_64/gcc-4.5.0/a-1.0-6pxjgfyjhb4msd6lmu6whcl54beqgnhs/bin", ":")
+prepend_path("MANPATH", "/tmp/pytest-of-root/pytest-271/mock_store0/test-debian6-x86_64/gcc-4.5.0/a-1.0-6pxjgfyjhb4msd6lmu6whcl54beqgnhs/man", ":")
+prepend_path("LIBRARY_PATH", "/tmp/pytest-of-root/pytest-271/mock_store0/test-debian6-x86_64/gcc-4.5.0/a-1.0-6pxjgfyjhb4msd6lmu6whcl54beqgnhs/lib", ":")
+prepend_path("LD_LIBRARY_PATH", "/tmp/pytest-of-root/pytest-271/mock_store0/test-debian6-x86_64/gcc-4.5.0/a-1.0-6pxjgfyjhb4msd6lmu6whcl54beqgnhs/lib", ":")
+prepend_path("CPATH", "/tmp/pytest-of-root/pytest-271/mock_store0/test-debian6-x86_64/gcc-4.5.0/a-1.0-6pxjgfyjhb4msd6lmu6whcl54beqgnhs/include", ":")
+prepend_path("CMAKE_PREFIX_PATH", "/tmp/pytest-of-root/pytest-271/mock_store0/test-debian6-x86_64/gcc-4.5.0/a-1.0-6pxjgfyjhb4msd6lmu6whcl54beqgnhs/", ":")
+
@@ -0,0 +1,91 @@
+# Copyright 2013-2020 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Compare the single pass text relocation to one pass per prefix.
+
+Run with ``spack python share/spack/qa/relocation-benchmark.py [NFILES]``.
+
+A synthetic install prefix with NFILES text files (10,000 by default),
+referencing 40 dependency prefixes, is relocated twice: once replacing
+each prefix in turn over every file, as Spack used to, and once with
+``spack.relocate.relocate_text``.
+"""
+from __future__ import print_function
+
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+
+import spack.relocate
+
+NDEPS = 40
+
+
+def replace_one_prefix_at_a_time(filename, prefix_to_prefix):
+    """The previous implementation: read and rewrite the whole file once
+    per old prefix."""
+    for old_dir, new_dir in prefix_to_prefix.items():
+        with open(filename, 'rb+') as f:
+            data = f.read()
+            f.seek(0)
+            pat = b'(?<![\\w\\-_/])([\\w\\-_]*?)%s([\\w\\-_/]*)' % \
+                old_dir.encode('utf-8')
+            repl = b'\\1%s\\2' % new_dir.encode('utf-8')
+            f.write(re.sub(pat, repl, data))
+            f.truncate()
+
+
+def make_prefix(root, nfiles, old_root):
+    deps = [os.path.join(old_root, 'dep{0}-{1:032x}'.format(i, i))
+            for i in range(NDEPS)]
+    paths = []
+    for i in range(nfiles):
+        path = os.path.join(root, 'd{0}'.format(i % 100), 'f{0}.txt'.format(i))
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as f:
+            # Only a third of the files reference prefixes at all
+            if i % 3 == 0:
+                for dep in deps[i % NDEPS:] + deps[:i % NDEPS]:
+                    f.write('-L{0}/lib -Wl,-rpath,{0}/lib\n'.format(dep))
+            f.write('some unrelated text\n' * 50)
+        paths.append(path)
+    return deps, paths
+
+
+def main(nfiles):
+    old_root, new_root = '/old/opt/spack', '/new/opt/spack'
+    tmp = tempfile.mkdtemp()
+    try:
+        deps, paths = make_prefix(tmp, nfiles, old_root)
+        prefix_to_prefix = dict(
+            (dep, dep.replace(old_root, new_root)) for dep in deps)
+        prefix_to_prefix[old_root] = new_root
+
+        start = time.time()
+        for path in paths:
+            replace_one_prefix_at_a_time(path, prefix_to_prefix)
+        per_prefix = time.time() - start
+
+        # Relocate back, in a single pass
+        back = dict((new, old) for old, new in prefix_to_prefix.items())
+        start = time.time()
+        spack.relocate.relocate_text(
+            paths, new_root, old_root, new_root, old_root,
+            '/new/spack', '/old/spack', back)
+        single_pass = time.time() - start
+    finally:
+        shutil.rmtree(tmp)
+
+    print('{0} files, {1} prefixes'.format(nfiles, len(prefix_to_prefix)))
+    print('  one pass per prefix: {0:8.2f}s'.format(per_prefix))
+    print('  single pass:         {0:8.2f}s'.format(single_pass))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -0,0 +1,99 @@
+# Copyright 2013-2020 Lawrence Livermore National Security, LLC and other
+# Spack Project Developers. See the top-level COPYRIGHT file for details.
+#
+# SPDX-License-Identifier: (Apache-2.0 OR MIT)
+
+"""Time version parsing and comparisons over the versions of all the
+packages in the builtin repository.
+
+Run with ``spack python share/spack/qa/version-benchmark.py``.
+
+Versions are parsed (the first time, and then from the interned
+versions), sorted with the segment by segment comparison Spack used to
+do and with the sort keys of versions, checked against version ranges
+and matched against version lists.
+"""
+from __future__ import print_function
+
+import functools
+import time
+
+import spack.repo
+from spack.version import Version, VersionList, VersionRange, \
+    infinity_versions
+
+
+def segment_by_segment_lt(a, b):
+    """The previous implementation of ``Version.__lt__``."""
+    if a == b:
+        return False
+
+    for x, y in zip(a, b):
+        if x == y:
+            continue
+        if x in infinity_versions:
+            if y in infinity_versions:
+                return (infinity_versions.index(x) >
+                        infinity_versions.index(y))
+            return False
+        if y in infinity_versions:
+            return True
+        if type(x) is not type(y):
+            return type(y) is int
+        return x < y
+
+    return len(a) < len(b)
+
+
+def compare(a, b):
+    if segment_by_segment_lt(a.version, b.version):
+        return -1
+    return 1 if segment_by_segment_lt(b.version, a.version) else 0
+
+
+def timed(name, function, *args):
+    start = time.time()
+    result = function(*args)
+    print('{0:<40} {1:8.3f}s'.format(name, time.time() - start))
+    return result
+
+
+def all_version_strings():
+    strings = []
+    for name in spack.repo.path.all_package_names():
+        metadata = spack.repo.path.package_metadata(name)
+        strings.extend(metadata.metadata['versions'])
+    return strings
+
+
+def main():
+    strings = timed('read versions from the metadata index',
+                    all_version_strings)
+    print('{0} versions, {1} distinct'.format(
+        len(strings), len(set(strings))))
+
+    Version._versions.clear()
+    versions = timed('parse versions',
+                     lambda: [Version(s) for s in strings])
+    timed('parse interned versions', lambda: [Version(s) for s in strings])
+
+    by_segment = timed(
+        'sort segment by segment',
+        lambda: sorted(versions, key=functools.cmp_to_key(compare)))
+    by_key = timed('sort with sort keys', lambda: sorted(versions))
+    assert [v.version for v in by_segment] == [v.version for v in by_key]
+
+    # Ranges between versions 1/8th of the sorted versions apart
+    step = len(by_key) // 8
+    ranges = [VersionRange(by_key[i], by_key[i + step])
+              for i in range(0, len(by_key) - step, step // 8 or 1)]
+    timed('check versions in {0} ranges'.format(len(ranges)),
+          lambda: [v in r for r in ranges for v in by_key])
+
+    lists = [VersionList([r, r.end]) for r in ranges]
+    timed('match version lists',
+          lambda: [a.satisfies(b) for a in lists for b in lists])
+
+
+if __name__ == '__main__':
+    main()